@@ -1,15 +1,17 @@
 import json
 from appium import webdriver
 from appium.options.android import UiAutomator2Options
-from appium.webdriver.common.appiumby import AppiumBy
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import openpyxl
-from openpyxl.styles import Font
 import logging
 import time
-import os
 from datetime import datetime
+from locator_registry import default_registry
+from command_metrics import maybe_instrument
+from results_store import open_results
+from speed_test_stats import AdaptiveTrialPlan
+from campaign_scheduler import run_campaign
+from aggregate_capacity import run_aggregate_capacity
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,9 +20,25 @@ logging.basicConfig(level=logging.INFO)
 with open('device_configs.json') as config_file:
     config_data = json.load(config_file)
 
-# Define the number of trials
+# Shared locator registry (locators.json)
+locators = default_registry()
+
+# Define the number of trials (used when adaptive_trials is off)
 num_trials = 4
 
+# Adaptive trial count (opt-in): run between min_trials and max_trials, stopping once the 95%
+# confidence interval of the download and upload speeds is within ci_tolerance of the mean.
+# Capped at num_trials so it can only shorten a run; 15% stops at 3 trials when the speeds
+# vary by up to about 6% and at 4 trials by up to about 9%
+adaptive_trials = False
+min_trials = 3
+max_trials = num_trials
+ci_tolerance = 0.15
+
+# Aggregate-capacity mode: start every device at the same instant and sum their throughputs
+aggregate_capacity_mode = False
+aggregate_rounds = 3
+
 
 # Function to run tests on a device
 def run_device_tests(device_config):
@@ -29,24 +47,12 @@ def run_device_tests(device_config):
     # Excel file setup
     excel_file = f"C:\\Users\\actio\\Documents\\Fast_automation_results_andriod\\{device_config['deviceUniqueId']}_results.xlsx"
 
-    # Load or create workbook and select the active sheet
-    if os.path.exists(excel_file):
-        workbook = openpyxl.load_workbook(excel_file)
-        sheet = workbook.active
-    else:
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        sheet.title = 'Speed Test Results'
-        sheet.append(
-            ["Timestamp", "Download Speed (Mbps)", "Upload Speed (Mbps)", "Avg Download Speed", "Avg Upload Speed",
-             "Test Run ID"])
-
-    # Determine the next Test Run ID
-    last_run_id = 0
-    for value in sheet['F']:
-        if value.value and value.value.startswith("TR-"):
-            last_run_id = max(last_run_id, int(value.value.split('-')[1]))
-    test_run_id = f"TR-{last_run_id + 1}"
+    # Results database next to the workbook (existing workbook history is imported on first use)
+    device_id = device_config['deviceUniqueId']
+    results = open_results(excel_file, device_id, "fast")
+
+    # Allocate the next Test Run ID
+    test_run_id = results.next_run_id(device_id, "fast")
 
     # Initialize the driver using UiAutomator2Options
     options = UiAutomator2Options()
@@ -59,64 +65,59 @@ def run_device_tests(device_config):
     options.full_reset = False
 
     driver = webdriver.Remote("http://localhost:4723/wd/hub", options=options)
+    maybe_instrument(driver)
     logging.info(f"Driver initialized successfully for {device_config['deviceName']}.")
 
     try:
-        for i in range(num_trials):  # Use the defined number of trials
+        trials = AdaptiveTrialPlan(min_trials, max_trials if adaptive_trials else num_trials, ci_tolerance,
+                                   adaptive=adaptive_trials)
+        for i in trials:
             logging.info(f"Starting trial {i + 1} for {device_config['deviceName']}...")
             trial_start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
             # Wait for the "Refresh/Start Test" button and click it
             WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located(
-                    (AppiumBy.XPATH, "//android.widget.TextView[@resource-id='speed-progress-indicator-icon']"))
+                EC.presence_of_element_located(locators["fastStartButton"])
             )
-            start_button = driver.find_element(AppiumBy.XPATH, "//android.widget.TextView[@resource-id='speed-progress-indicator-icon']")
+            start_button = driver.find_element(*locators["fastStartButton"])
             start_button.click()
 
             # Sleep to allow the download speed test to complete
             time.sleep(10)  # Adjust the sleep time as necessary based on test duration
 
             # Wait for the download speed to be displayed and extract the value
-            download_speed_element = driver.find_element(AppiumBy.XPATH, "//android.widget.TextView[@resource-id='speed-value']")
+            download_speed_element = driver.find_element(*locators["fastDownloadSpeed"])
             download_speed = float(download_speed_element.text)
 
             # Sleep to allow the upload speed test to complete
             time.sleep(45)  # Adjust the sleep time as necessary based on test duration
 
             # Wait for the upload speed to be displayed and extract the value
-            upload_speed_element = driver.find_element(AppiumBy.XPATH, "//android.widget.TextView[@resource-id='upload-value']")
+            upload_speed_element = driver.find_element(*locators["fastUploadSpeed"])
             upload_speed = float(upload_speed_element.text)
 
             # Log the extracted speeds
             logging.info(f"Download Speed: {download_speed} Mbps")
             logging.info(f"Upload Speed: {upload_speed} Mbps")
 
-            # Save the results to the Excel sheet
-            sheet.append([trial_start_time, download_speed, upload_speed, None, None, test_run_id])
+            # Save the results to the results database
+            results.add_trial(device_id, "fast", test_run_id, trial_start_time, download_speed, upload_speed)
+            trials.record(download_speed, upload_speed)
 
             # Short delay before starting the next trial
             time.sleep(5)
 
-        # Calculate averages at the end of the sheet for each run
-        last_row = sheet.max_row
-        avg_download_formula = f"=AVERAGE(B{last_row - num_trials + 1}:B{last_row})"
-        avg_upload_formula = f"=AVERAGE(C{last_row - num_trials + 1}:C{last_row})"
-        sheet.append([None, None, None, avg_download_formula, avg_upload_formula, f"Average for {test_run_id}"])
-        for col in range(4, 6):  # Apply bold formatting to average cells
-            cell = sheet.cell(row=sheet.max_row, column=col)
-            cell.font = Font(bold=True)
-
-        # Leave a space after each test run
-        sheet.append([None] * 6)
-
-        workbook.save(excel_file)
-        logging.info(f"Results saved to {excel_file}")
+        # Export the workbook view (with per-run averages) from the database
+        results.export_excel(excel_file, device_id, "fast")
+        results.log_run_statistics(device_id, "fast", test_run_id)
 
     finally:
         driver.quit()
+        results.close()
 
 
-# Iterate over each device configuration and run tests
-for device in config_data['devices']:
-    run_device_tests(device)
+if aggregate_capacity_mode:
+    run_aggregate_capacity(config_data['devices'], "fast", aggregate_rounds)
+else:
+    # Run every device, serializing those that share an access point
+    run_campaign(config_data['devices'], run_device_tests)
@@ -1,9 +1,9 @@
 import subprocess
 import re
-import time
 from datetime import datetime
 from collections import defaultdict
 from openpyxl import Workbook
+from fixed_rate import FixedRateSampler
 
 # Configuration
 RG_IP = "192.168.1.1"
@@ -165,8 +165,10 @@ def main():
                     }
                     print(f"Initial state for {mac}: {initial_state}")
 
-    while True:
-        try:
+    # Polls start every POLLING_INTERVAL seconds, however long the SSH round trips take
+    sampler = FixedRateSampler(POLLING_INTERVAL, name="roaming")
+    try:
+        for tick in sampler:
             current_states = {}
             for device_ip, device_name in [(RG_IP, "RG"), (EXT_IP, "EXT")]:
                 for radio in RADIOS:
@@ -190,7 +192,7 @@ def main():
                 if curr and prev:
                     if curr["device"] != prev["device"] or curr["radio"] != prev["radio"]:
                         roaming_event = {
-                            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                            "timestamp": datetime.fromtimestamp(tick).strftime("%Y-%m-%d %H:%M:%S"),
                             "mac": mac,
                             "from_device": prev["device"],
                             "to_device": curr["device"],
@@ -222,12 +224,10 @@ def main():
                 # Delay updating previous_states until after processing all transitions
                 previous_states[mac] = curr
 
-            time.sleep(POLLING_INTERVAL)
-
-        except KeyboardInterrupt:
-            print("Stopping roaming detection...")
-            save_to_excel(roaming_events, roaming_counts, initial_states)
-            break
+    except KeyboardInterrupt:
+        print("Stopping roaming detection...")
+        print(sampler.summary())
+        save_to_excel(roaming_events, roaming_counts, initial_states)
 
 if __name__ == "__main__":
     main()
@@ -3,10 +3,13 @@ import logging
 import os
 import time
 from datetime import datetime
-import openpyxl
 from appium import webdriver
 from appium.options.android import UiAutomator2Options
 from appium.webdriver.common.appiumby import AppiumBy
+from command_metrics import maybe_instrument
+from result_sinks import open_sink
+from bounds_cache import BoundsCache
+from fixed_rate import FixedRateSampler
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -21,16 +24,23 @@ def record_rssi(device_config, interval):
 
     # Set up the Excel file for storing RSSI values
     excel_file_path = f"C:\\Users\\QAthinkpad\\Documents\\RSSI_VALUES_Client\\{device_config['deviceUniqueId']}_rssi_stats.xlsx"
-    workbook, sheet = prepare_excel_file(excel_file_path)
+    sink = prepare_results_sink(excel_file_path)
 
     # Initialize the Appium driver with device configurations
     driver = initialize_driver(device_config)
 
+    # Window metrics are learned once per model instead of queried on every sample
+    bounds_cache = BoundsCache(driver, device_config.get('appPackage', "com.android.settings"))
+
+    # Samples start every interval seconds, however long the refresh and fetch take
+    sampler = FixedRateSampler(interval, name=device_config['deviceName'])
+
     try:
-        while True:
+        for tick in sampler:
+            timestamp = datetime.fromtimestamp(tick).strftime("%Y-%m-%d %H:%M:%S")
             try:
                 # Refresh the screen by scrolling downward
-                refresh_screen(driver)
+                refresh_screen(driver, bounds_cache)
 
                 # Wait 1 second for the screen to refresh
                 time.sleep(1)
@@ -40,40 +50,36 @@ def record_rssi(device_config, interval):
 
                 # Extract and log only the RSSI value
                 rssi = extract_rssi(visible_data)
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 logging.info(f"Timestamp: {timestamp}, RSSI: {rssi}")
 
                 # Write only the RSSI value to the Excel file (append "N/A" if not found)
-                sheet.append([timestamp, rssi])
-
-                # Wait for the specified interval
-                time.sleep(max(0, interval - 1))  # Adjust for the 1-second delay after refresh
+                sink.write([timestamp, rssi])
 
             except Exception as e:
                 # Handle errors gracefully and continue
                 logging.warning(f"Error encountered: {e}. Skipping this trial.")
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                sheet.append([timestamp, "N/A"])  # Append N/A for failed trials
-                time.sleep(interval)  # Wait for the interval before retrying
+                # The device may have rotated; re-read the orientation before the next swipe
+                bounds_cache.check_orientation()
+                sink.write([timestamp, "N/A"])  # Append N/A for failed trials
 
-            except KeyboardInterrupt:
-                # Stop the script manually
-                logging.info("Manual stop detected. Saving results and exiting...")
-                break
+    except KeyboardInterrupt:
+        # Stop the script manually
+        logging.info("Manual stop detected. Saving results and exiting...")
 
     finally:
-        workbook.save(excel_file_path)
-        logging.info(f"RSSI values saved to {excel_file_path}")
-        driver.quit()
+        try:
+            driver.quit()
+        finally:
+            sampler.log_stats()
+            sink.close()
+            sink.export_excel(excel_file_path)
+            logging.info(f"RSSI values saved to {excel_file_path}")
 
 
-def prepare_excel_file(path):
-    if os.path.exists(path):
-        workbook = openpyxl.load_workbook(path)
-    else:
-        workbook = openpyxl.Workbook()
-        workbook.active.append(["Timestamp", "RSSI"])  # Only two columns: Timestamp and RSSI
-    return workbook, workbook.active
+def prepare_results_sink(path):
+    # Rows are checkpointed to a CSV next to the workbook, which is exported at the end
+    csv_path = os.path.splitext(path)[0] + ".csv"
+    return open_sink(csv_path, ["Timestamp", "RSSI"], excel_path=path)  # Only two columns: Timestamp and RSSI
 
 
 def initialize_driver(config):
@@ -83,12 +89,14 @@ def initialize_driver(config):
     options.udid = config['deviceUID']
     options.automation_name = 'UiAutomator2'
     options.no_reset = True
-    return webdriver.Remote("http://localhost:4723/wd/hub", options=options)
+    driver = webdriver.Remote("http://localhost:4723/wd/hub", options=options)
+    maybe_instrument(driver)
+    return driver
 
 
-def refresh_screen(driver):
+def refresh_screen(driver, bounds_cache=None):
     # Perform a downward swipe on the top half of the screen
-    screen_size = driver.get_window_size()
+    screen_size = bounds_cache.window_size() if bounds_cache else driver.get_window_size()
     start_x = screen_size['width'] // 2
     start_y = screen_size['height'] // 4  # Start from the top quarter
     end_y = screen_size['height'] // 2    # Swipe to the middle
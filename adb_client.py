@@ -0,0 +1,268 @@
+import argparse
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import threading
+import time
+import uuid
+
+# adb executable (point ADB_PATH at a fake adb to run without a device)
+ADB = os.environ.get("ADB_PATH", "adb")
+
+# Local adb server
+ADB_SERVER_HOST = "127.0.0.1"
+ADB_SERVER_PORT = int(os.environ.get("ANDROID_ADB_SERVER_PORT", 5037))
+
+
+class AdbError(Exception):
+    """Raised when the adb server answers FAIL or the connection breaks."""
+
+
+class ShellClosedError(AdbError):
+    """Raised when a persistent shell was already broken before the command was sent, so it is safe to retry."""
+
+
+def _recv_exactly(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise AdbError("adb server closed the connection")
+        data += chunk
+    return data
+
+
+def _parse_devices(text):
+    return dict(line.split("\t", 1) for line in text.splitlines() if "\t" in line)
+
+
+def read_device_list(sock):
+    """Reads the next length-prefixed device list from a host:track-devices socket as {serial: state}."""
+    length = int(_recv_exactly(sock, 4), 16)
+    return _parse_devices(_recv_exactly(sock, length).decode(errors="replace"))
+
+
+def _recv_all(sock):
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+
+class AdbClient:
+    """Talks to the adb server socket directly instead of spawning adb for every call."""
+
+    def __init__(self, host=ADB_SERVER_HOST, port=ADB_SERVER_PORT, timeout=10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._shells = {}
+        self._shells_lock = threading.Lock()
+
+    def _connect(self):
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except ConnectionRefusedError:
+            logging.info("adb server not running, starting it...")
+            subprocess.run([ADB, "start-server"], capture_output=True, timeout=30)
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        # Commands are small writes; don't let Nagle hold them back waiting for an ACK
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def _request(self, sock, service):
+        """Sends one length-prefixed request and checks for OKAY."""
+        payload = service.encode()
+        sock.sendall(f"{len(payload):04x}".encode() + payload)
+        status = _recv_exactly(sock, 4)
+        if status != b"OKAY":
+            length = int(_recv_exactly(sock, 4), 16)
+            raise AdbError(f"{service}: {_recv_exactly(sock, length).decode(errors='replace')}")
+
+    def _host_query(self, service):
+        """Runs a host: service and returns its length-prefixed reply."""
+        with self._connect() as sock:
+            self._request(sock, service)
+            length = int(_recv_exactly(sock, 4), 16)
+            return _recv_exactly(sock, length).decode(errors="replace")
+
+    def open_service(self, serial, service):
+        """Returns a socket connected to a device service (serial None means the only device)."""
+        sock = self._connect()
+        try:
+            self._request(sock, f"host:transport:{serial}" if serial else "host:transport-any")
+            self._request(sock, service)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def version(self):
+        return int(self._host_query("host:version"), 16)
+
+    def devices(self):
+        """Returns {serial: state} for every device the server knows about."""
+        return _parse_devices(self._host_query("host:devices"))
+
+    def track_devices(self):
+        """Returns a socket on which the server pushes the device list (see read_device_list) on every change."""
+        sock = self._connect()
+        try:
+            self._request(sock, "host:track-devices")
+        except Exception:
+            sock.close()
+            raise
+        sock.settimeout(None)
+        return sock
+
+    def connect(self, address):
+        """Connects to a device over wireless adb (address is host:port) and returns the server message."""
+        message = self._host_query(f"host:connect:{address}")
+        logging.info(message)
+        if "connected" not in message:
+            raise AdbError(message)
+        return message
+
+    def disconnect(self, address):
+        return self._host_query(f"host:disconnect:{address}")
+
+    def shell(self, serial, command):
+        """Runs command over a one-shot shell: stream and returns its output."""
+        with self.open_service(serial, f"shell:{command}") as sock:
+            sock.settimeout(None)
+            return _recv_all(sock).decode(errors="replace").replace("\r\n", "\n")
+
+    def persistent_shell(self, serial):
+        """Returns the cached PersistentShell for serial, opening it on first use."""
+        with self._shells_lock:
+            shell = self._shells.get(serial)
+            if shell is None or shell.closed:
+                shell = self._shells[serial] = PersistentShell(self, serial)
+            return shell
+
+    def run(self, serial, command, timeout=30):
+        """Runs command on the device's persistent shell, reopening it once if it broke before the command was sent.
+
+        A failure after the command was sent (e.g. a read timeout) is raised, never retried, since
+        commands like pm uninstall or cmd wifi must not run twice.
+        """
+        try:
+            return self.persistent_shell(serial).run(command, timeout)
+        except ShellClosedError as e:
+            logging.warning(f"Persistent shell for {serial or 'device'} failed ({e}), reopening.")
+            return self.persistent_shell(serial).run(command, timeout)
+
+    def close(self):
+        with self._shells_lock:
+            for shell in self._shells.values():
+                shell.close()
+            self._shells.clear()
+
+
+class PersistentShell:
+    """One long-lived sh on the device (exec:sh) that runs commands one after another."""
+
+    def __init__(self, client, serial):
+        self.serial = serial
+        self.closed = False
+        self.last_status = None
+        self._lock = threading.Lock()
+        self._sock = client.open_service(serial, "exec:sh")
+        self._reader = self._sock.makefile("rb")
+
+    def _stream_ended(self):
+        """Returns True if the device already closed the shell (peeks without consuming output)."""
+        self._sock.setblocking(False)
+        try:
+            return self._sock.recv(1, socket.MSG_PEEK) == b""
+        except (BlockingIOError, InterruptedError):
+            return False
+        except OSError:
+            return True
+
+    def run(self, command, timeout=30):
+        """Runs command (stderr merged into stdout, stdin from /dev/null) and returns its output.
+
+        The exit code is last_status. The end marker is printed on a line of its own, so output
+        without a trailing newline is still delimited; the newline added before it is stripped.
+        """
+        marker = f"__adb_done_{uuid.uuid4().hex}__"
+        with self._lock:
+            if self.closed:
+                raise ShellClosedError(f"Shell for {self.serial} is closed")
+            if self._stream_ended():
+                self.close()
+                raise ShellClosedError(f"Shell for {self.serial} closed")
+            self._sock.settimeout(timeout)
+            try:
+                self._sock.sendall(f"{{ {command}\n}} </dev/null 2>&1; printf '\\n%s %d\\n' {marker} $?\n".encode())
+            except OSError as e:
+                self.close()
+                raise ShellClosedError(f"Shell for {self.serial} broke: {e}") from e
+            try:
+                lines = []
+                while True:
+                    line = self._reader.readline()
+                    if not line:
+                        raise AdbError(f"Shell for {self.serial} closed")
+                    text = line.decode(errors="replace")
+                    if text.startswith(marker):
+                        self.last_status = int(text.split()[1])
+                        output = "".join(lines)
+                        return output[:-1] if output.endswith("\n") else output
+                    lines.append(text)
+            except (OSError, AdbError):
+                self.close()
+                raise
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._reader.close()
+            self._sock.close()
+
+
+def benchmark(serial, command="cat /proc/net/dev", repeat=20, client=None):
+    """Returns the median milliseconds per call for subprocess adb, one-shot socket shell and persistent shell."""
+    client = client or AdbClient()
+    adb_args = [ADB] + (["-s", serial] if serial else []) + ["shell", command]
+    methods = {
+        "subprocess adb shell": lambda: subprocess.run(adb_args, capture_output=True, check=True),
+        "socket shell:": lambda: client.shell(serial, command),
+        "persistent exec:sh": lambda: client.run(serial, command),
+    }
+    client.run(serial, "true")  # Open the persistent shell outside the timing
+    results = {}
+    for name, method in methods.items():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            method()
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = round(statistics.median(timings), 2)
+    return results
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Benchmark adb server socket calls against adb subprocesses.")
+    parser.add_argument("--serial", help="Device serial (default: the only connected device)")
+    parser.add_argument("--command", default="cat /proc/net/dev")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    client = AdbClient()
+    logging.info(f"adb server version {client.version()}, devices: {client.devices()}")
+    try:
+        for name, median_ms in benchmark(args.serial, args.command, args.repeat, client).items():
+            print(f"{name:<24} {median_ms:>8.2f} ms")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
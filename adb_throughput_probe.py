@@ -0,0 +1,264 @@
+import argparse
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+from adb_client import AdbClient, AdbError
+from appium_session import device_name, device_udid, load_devices
+from net_timeline import counter_deltas, parse_proc_net_dev
+from result_sinks import open_sink
+from results_store import open_results
+
+# Interface whose counters are sampled on the device
+DEFAULT_INTERFACE = "wlan0"
+# Bytes transferred in each direction per trial
+DEFAULT_TRANSFER_BYTES = 50 * 1024 * 1024
+# Seconds between /proc/net/dev samples
+DEFAULT_SAMPLE_INTERVAL = 1.0
+# Seconds before a transfer is abandoned
+TRANSFER_TIMEOUT = 120
+
+# Device-side commands; toybox nc ships with Android, so no extra binaries are needed
+DOWNLOAD_COMMAND = "printf 'GET /download?bytes={bytes} HTTP/1.0\\r\\n\\r\\n' | nc {host} {port} > /dev/null"
+UPLOAD_COMMAND = ("(printf 'POST /upload HTTP/1.0\\r\\nContent-Length: {bytes}\\r\\n\\r\\n'; "
+                  "head -c {bytes} /dev/zero) | nc {host} {port} > /dev/null")
+SAMPLER_COMMAND = "while :; do cat /proc/net/dev; sleep {interval}; done"
+
+SAMPLE_HEADERS = ["Timestamp", "Test Run ID", "Trial", "Direction", "Elapsed (s)", "Throughput (Mbps)"]
+
+# Chunk size used by the LAN endpoint
+CHUNK_SIZE = 64 * 1024
+
+
+class NetDevSampler:
+    """Streams /proc/net/dev from one long-lived shell: stream on the adb server and keeps (time, rx, tx) samples."""
+
+    def __init__(self, serial, interface=DEFAULT_INTERFACE, interval=DEFAULT_SAMPLE_INTERVAL, client=None):
+        self.serial = serial
+        self.interface = interface
+        self.client = client or AdbClient()
+        self.samples = []
+        self._lock = threading.Lock()
+        self._sock = self.client.open_service(serial, f"shell:{SAMPLER_COMMAND.format(interval=interval)}")
+        self._sock.settimeout(None)
+        self._thread = threading.Thread(target=self._read, name=f"netdev-{serial}", daemon=True)
+        self._thread.start()
+
+    def _read(self):
+        try:
+            with self._sock.makefile("rb") as stream:
+                for line in stream:
+                    counters = parse_proc_net_dev(line.decode(errors="replace"))
+                    if self.interface in counters:
+                        with self._lock:
+                            self.samples.append((time.monotonic(),) + counters[self.interface])
+        except (OSError, ValueError):
+            pass  # stop() closed the stream
+
+    def wait_for_sample_after(self, moment=0.0, timeout=10):
+        """Blocks until a sample taken after moment (monotonic time) has arrived."""
+        deadline = time.monotonic() + timeout
+        while not self.samples or self.samples[-1][0] < moment:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError(f"No /proc/net/dev samples for {self.interface} on {self.serial}")
+            time.sleep(0.05)
+
+    def window(self, start, end):
+        """Returns the samples bracketing [start, end]: the last one before start through the first after end."""
+        with self._lock:
+            samples = list(self.samples)
+        before = [i for i, sample in enumerate(samples) if sample[0] <= start]
+        after = [i for i, sample in enumerate(samples) if sample[0] >= end]
+        first = before[-1] if before else 0
+        last = after[0] if after else len(samples) - 1
+        return samples[first:last + 1]
+
+    def stop(self):
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)  # Wakes the reader blocked in recv
+        except OSError:
+            pass
+        self._sock.close()
+        self._thread.join(timeout=5)
+
+
+def _byte_deltas(samples, column):
+    """Returns (sample times, per-interval byte deltas) with net_timeline's wrap/reset handling."""
+    times = np.array([sample[0] for sample in samples], dtype=np.float64)
+    return times, counter_deltas([sample[column] for sample in samples], np.diff(times))
+
+
+def throughput_series(samples, column):
+    """Returns (seconds since the first sample, Mbps) per sample interval; column 1 is rx, 2 is tx."""
+    if len(samples) < 2:
+        return []
+    times, deltas = _byte_deltas(samples, column)
+    return [(round(float(end - times[0]), 2), float(delta) * 8 / float(end - begin) / 1e6)
+            for begin, end, delta in zip(times, times[1:], deltas) if end > begin]
+
+
+def run_transfer(client, serial, command, timeout=TRANSFER_TIMEOUT):
+    """Runs a transfer command on the device's persistent shell and returns its (start, end) monotonic times."""
+    start = time.monotonic()
+    output = client.run(serial, command, timeout=timeout)
+    end = time.monotonic()
+    if client.persistent_shell(serial).last_status != 0:
+        raise AdbError(f"Transfer failed on {serial}: {output.strip()}")
+    return start, end
+
+
+def measure(sampler, serial, command, column, interval, transfer_bytes):
+    """Runs one transfer and returns (average Mbps, peak Mbps, per-interval series).
+
+    The average is transfer_bytes over the transfer's own duration on the persistent shell;
+    the samples bracketing it can add up to an idle interval on each side, so they only
+    feed the per-interval series and its peak.
+    """
+    start, end = run_transfer(sampler.client, serial, command)
+    # Let the first sample after the transfer arrive so the window is closed
+    sampler.wait_for_sample_after(end, timeout=interval * 3 + 5)
+    series = throughput_series(sampler.window(start, end), column)
+    average = transfer_bytes * 8 / (end - start) / 1e6 if end > start else 0.0
+    peak = max((mbps for _, mbps in series), default=0.0)
+    return round(average, 2), round(peak, 2), series
+
+
+def probe_device(device_config, endpoint, trials=5, transfer_bytes=DEFAULT_TRANSFER_BYTES,
+                 interface=DEFAULT_INTERFACE, interval=DEFAULT_SAMPLE_INTERVAL, results_dir="."):
+    """Runs UI-free download/upload trials on one device and records them like run_device_tests."""
+    serial = device_udid(device_config)
+    device_id = device_config.get('deviceUniqueId', device_name(device_config))
+    parsed = urlparse(endpoint)
+    substitutions = {"host": parsed.hostname, "port": parsed.port or 80, "bytes": transfer_bytes}
+    download_command = device_config.get('downloadCommand', DOWNLOAD_COMMAND).format(**substitutions)
+    upload_command = device_config.get('uploadCommand', UPLOAD_COMMAND).format(**substitutions)
+
+    excel_file = os.path.join(results_dir, f"{device_id}_probe_results.xlsx")
+    results = open_results(excel_file, device_id, "adb_probe")
+    test_run_id = results.next_run_id(device_id, "adb_probe")
+    sample_sink = open_sink(os.path.join(results_dir, f"{device_id}_probe_samples.csv"), SAMPLE_HEADERS)
+    client = AdbClient()
+    sampler = NetDevSampler(serial, interface, interval, client)
+    logging.info(f"Probing {device_name(device_config)} ({serial}) against {endpoint}, run {test_run_id}")
+
+    try:
+        sampler.wait_for_sample_after()
+        for i in range(trials):
+            trial_start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            download_speed, download_peak, download_series = measure(
+                sampler, serial, download_command, 1, interval, transfer_bytes)
+            upload_speed, upload_peak, upload_series = measure(
+                sampler, serial, upload_command, 2, interval, transfer_bytes)
+            logging.info(f"Trial {i + 1}: download {download_speed} Mbps (peak {download_peak}), "
+                         f"upload {upload_speed} Mbps (peak {upload_peak})")
+
+            results.add_trial(device_id, "adb_probe", test_run_id, trial_start_time, download_speed, upload_speed)
+            for direction, series in (("download", download_series), ("upload", upload_series)):
+                for elapsed, mbps in series:
+                    sample_sink.write([trial_start_time, test_run_id, i + 1, direction, elapsed, round(mbps, 2)])
+
+        results.export_excel(excel_file, device_id, "adb_probe")
+        results.log_run_statistics(device_id, "adb_probe", test_run_id)
+    finally:
+        sampler.stop()
+        client.close()
+        sample_sink.close()
+        results.close()
+    return test_run_id
+
+
+class ThroughputRequestHandler(BaseHTTPRequestHandler):
+    """GET /download?bytes=N streams N zero bytes; POST /upload discards the request body."""
+
+    protocol_version = "HTTP/1.0"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/download":
+            self.send_error(404)
+            return
+        remaining = int(parse_qs(url.query).get("bytes", [DEFAULT_TRANSFER_BYTES])[0])
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(remaining))
+        self.end_headers()
+        chunk = bytes(CHUNK_SIZE)
+        while remaining > 0:
+            self.wfile.write(chunk[:min(remaining, CHUNK_SIZE)])
+            remaining -= CHUNK_SIZE
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/upload":
+            self.send_error(404)
+            return
+        remaining = int(self.headers.get("Content-Length", 0))
+        start = time.monotonic()
+        received = 0
+        while received < remaining:
+            chunk = self.rfile.read(min(CHUNK_SIZE, remaining - received))
+            if not chunk:
+                break
+            received += len(chunk)
+        body = json.dumps({"bytes": received, "seconds": round(time.monotonic() - start, 3)}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+
+def start_endpoint(host="0.0.0.0", port=8080):
+    """Starts the LAN throughput endpoint on a background thread."""
+    server = ThreadingHTTPServer((host, port), ThroughputRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"Throughput endpoint listening on {host}:{server.server_address[1]}")
+    return server
+
+
+def serve_forever():
+    """Keeps the process alive while the endpoint serves probes from other hosts."""
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="UI-free throughput probe over adb against a LAN HTTP endpoint.")
+    parser.add_argument("--config", default="adb_devices.json", help="Device config JSON file")
+    parser.add_argument("--device", help="Only probe this deviceName")
+    parser.add_argument("--endpoint", help="http://host:port of the LAN endpoint")
+    parser.add_argument("--serve", type=int, metavar="PORT", help="Run the endpoint on this host at PORT")
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--bytes", type=int, default=DEFAULT_TRANSFER_BYTES, help="Bytes per direction")
+    parser.add_argument("--interface", default=DEFAULT_INTERFACE)
+    parser.add_argument("--interval", type=float, default=DEFAULT_SAMPLE_INTERVAL, help="Sample interval (s)")
+    parser.add_argument("--results-dir", default=".", help="Where the workbook, database and samples go")
+    args = parser.parse_args()
+
+    if not args.endpoint and not args.serve:
+        parser.error("--endpoint or --serve is required")
+    if args.serve:
+        start_endpoint(port=args.serve)
+        if not args.endpoint:
+            serve_forever()
+            return
+
+    for device in load_devices(args.config):
+        if args.device in (None, device_name(device)):
+            probe_device(device, args.endpoint, args.trials, args.bytes, args.interface, args.interval,
+                         args.results_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import argparse
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from appium_session import APPIUM_SERVER_URL, create_driver, device_name, load_devices
+from locator_registry import default_registry
+from result_sinks import open_sink
+
+# Shared locator registry (locators.json)
+locators = default_registry()
+
+# Seconds to wait for every device to reach the pre-GO state
+PREPARE_TIMEOUT = 120
+
+AGGREGATE_HEADERS = ["Timestamp", "Round", "Device", "Start Skew (ms)", "Click Latency (ms)",
+                     "Download Speed (Mbps)", "Upload Speed (Mbps)", "Error"]
+
+
+def ookla_start_button(driver):
+    """Waits for the Ookla GO button (the pre-GO state) and returns it."""
+    return WebDriverWait(driver, 20).until(EC.presence_of_element_located(locators["ooklaGoButton"]))
+
+
+def ookla_read_speeds(driver):
+    """Waits for the Ookla result panel, reads both speeds and closes the result."""
+    WebDriverWait(driver, 60).until(EC.presence_of_element_located(locators["ooklaDownloadPanel"]))
+    download_speed_element = WebDriverWait(driver, 45).until(
+        EC.presence_of_element_located(locators["ooklaDownloadSpeed"]))
+    upload_speed_element = WebDriverWait(driver, 45).until(
+        EC.presence_of_element_located(locators["ooklaUploadSpeed"]))
+    speeds = float(download_speed_element.text.split()[0]), float(upload_speed_element.text.split()[0])
+    time.sleep(2)
+    WebDriverWait(driver, 10).until(EC.element_to_be_clickable(locators["ooklaCloseIcon"])).click()
+    return speeds
+
+
+def fast_start_button(driver):
+    """Waits for the FAST "Refresh/Start Test" button and returns it."""
+    return WebDriverWait(driver, 20).until(EC.presence_of_element_located(locators["fastStartButton"]))
+
+
+def fast_read_speeds(driver):
+    """Reads the FAST download speed, then the upload speed once it has finished."""
+    time.sleep(10)
+    download_speed = float(driver.find_element(*locators["fastDownloadSpeed"]).text)
+    time.sleep(45)
+    upload_speed = float(driver.find_element(*locators["fastUploadSpeed"]).text)
+    return download_speed, upload_speed
+
+
+# Per-suite (find the start button, read the speeds) steps
+SUITES = {
+    "ookla": (ookla_start_button, ookla_read_speeds),
+    "fast": (fast_start_button, fast_read_speeds),
+}
+
+
+def _run_device(driver, config, suite, barrier, round_number):
+    """Prepares one device, waits at the barrier with the others, then starts and reads its test."""
+    find_start_button, read_speeds = SUITES[suite]
+    result = {"device": device_name(config), "round": round_number, "start": None, "click_ms": None,
+              "download": None, "upload": None, "error": None}
+    start_button = None
+    try:
+        start_button = find_start_button(driver)
+    except Exception as e:
+        result["error"] = f"Not ready: {e}"
+        logging.error(f"[{result['device']}] Could not reach the start state: {e}")
+
+    # Every device arrives at the barrier, ready or not, so the others are never held up
+    try:
+        barrier.wait(timeout=PREPARE_TIMEOUT)
+    except threading.BrokenBarrierError:
+        result["error"] = result["error"] or "Barrier broken before release"
+        return result
+    if start_button is None:
+        return result
+
+    try:
+        click_sent = time.perf_counter()
+        start_button.click()
+        click_returned = time.perf_counter()
+        # The device acted on the click somewhere inside the round trip; its midpoint is the
+        # best host-side estimate of the test start, uncertain by +/- half the click latency
+        result["start"] = (click_sent + click_returned) / 2
+        result["click_ms"] = (click_returned - click_sent) * 1000
+        result["download"], result["upload"] = read_speeds(driver)
+        logging.info(f"[{result['device']}] Download {result['download']} Mbps, upload {result['upload']} Mbps")
+    except Exception as e:
+        result["error"] = str(e)
+        logging.error(f"[{result['device']}] Trial failed: {e}")
+    return result
+
+
+def _rounded(value, digits=1):
+    return None if value is None else round(value, digits)
+
+
+def summarize_round(results):
+    """Adds start skew (from each click's round-trip midpoint) to each result and returns the round aggregate."""
+    starts = [result["start"] for result in results if result["start"] is not None]
+    first_start = min(starts) if starts else None
+    for result in results:
+        result["skew_ms"] = (result["start"] - first_start) * 1000 if result["start"] is not None else None
+    completed = [result for result in results if result["error"] is None]
+    return {
+        "devices": len(completed),
+        "download": round(sum(result["download"] for result in completed), 2),
+        "upload": round(sum(result["upload"] for result in completed), 2),
+        "max_skew_ms": max((result["skew_ms"] for result in results if result["skew_ms"] is not None), default=None),
+    }
+
+
+def run_aggregate_capacity(devices, suite="ookla", rounds=1, server_url=APPIUM_SERVER_URL,
+                           output="aggregate_capacity_results.csv", interval=10):
+    """Starts the speed test on every device at the same instant and sums their throughputs.
+
+    Sessions are created once; each round prepares every device to the pre-GO state,
+    releases them together through a barrier and records per-device start skew, measured
+    at the midpoint of each device's start click round trip (see the click latency column
+    for its uncertainty).
+    """
+    if suite not in SUITES:
+        raise ValueError(f"Unknown suite '{suite}'. Available: {', '.join(SUITES)}")
+    with ThreadPoolExecutor(max_workers=len(devices)) as executor:
+        sessions = [executor.submit(create_driver, config, server_url, "speed_test") for config in devices]
+    errors = [session.exception() for session in sessions if session.exception()]
+    if errors:
+        for session in sessions:
+            if not session.exception():
+                session.result().quit()
+        raise errors[0]
+    drivers = [session.result() for session in sessions]
+
+    sink = open_sink(output, AGGREGATE_HEADERS)
+    summaries = []
+    try:
+        with ThreadPoolExecutor(max_workers=len(devices)) as executor:
+            for round_number in range(1, rounds + 1):
+                barrier = threading.Barrier(len(devices))
+                logging.info(f"Round {round_number}/{rounds}: preparing {len(devices)} devices...")
+                results = list(executor.map(
+                    lambda pair: _run_device(pair[0], pair[1], suite, barrier, round_number), zip(drivers, devices)))
+                summary = summarize_round(results)
+                summaries.append(summary)
+
+                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                for result in results:
+                    sink.write([timestamp, round_number, result["device"], _rounded(result["skew_ms"]),
+                                _rounded(result["click_ms"]), result["download"], result["upload"],
+                                result["error"] or ""])
+                sink.write([timestamp, round_number, f"Aggregate ({summary['devices']} devices)",
+                            _rounded(summary["max_skew_ms"]), None, summary["download"], summary["upload"], ""])
+                logging.info(f"Round {round_number}: aggregate download {summary['download']} Mbps, "
+                             f"upload {summary['upload']} Mbps over {summary['devices']} devices "
+                             f"(max start skew {_rounded(summary['max_skew_ms'])} ms)")
+                if round_number < rounds:
+                    time.sleep(interval)
+    finally:
+        try:
+            for config, driver in zip(devices, drivers):
+                try:
+                    driver.quit()
+                except Exception as e:
+                    logging.warning(f"Failed to quit the session on {device_name(config)}: {e}")
+        finally:
+            sink.close()
+            sink.export_excel(os.path.splitext(output)[0] + ".xlsx", sheet_title="Aggregate Capacity")
+    return summaries
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Measure aggregate AP capacity with synchronized speed tests.")
+    parser.add_argument("--config", default="adb_devices.json", help="Device config JSON file")
+    parser.add_argument("--suite", default="ookla", choices=list(SUITES))
+    parser.add_argument("--rounds", type=int, default=3, help="Synchronized rounds to run")
+    parser.add_argument("--interval", type=float, default=10, help="Seconds between rounds")
+    parser.add_argument("--server", default=APPIUM_SERVER_URL, help="Appium server URL")
+    parser.add_argument("--output", default="aggregate_capacity_results.csv", help="CSV or SQLite results file")
+    args = parser.parse_args()
+
+    run_aggregate_capacity(load_devices(args.config), args.suite, args.rounds, args.server, args.output, args.interval)
+
+
+if __name__ == "__main__":
+    main()
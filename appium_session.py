@@ -0,0 +1,61 @@
+import json
+import logging
+from appium import webdriver
+from appium.options.android import UiAutomator2Options
+from uia2_profiles import apply_profile, apply_profile_options
+from command_metrics import maybe_instrument
+
+# Default Appium server used by the scripts
+APPIUM_SERVER_URL = "http://localhost:4723/wd/hub"
+
+
+def load_devices(path):
+    """Loads the device list from any of the config files ({"devices": [...]} or a bare list)."""
+    with open(path) as config_file:
+        config_data = json.load(config_file)
+    return config_data['devices'] if isinstance(config_data, dict) else config_data
+
+
+def device_name(config):
+    """Returns the device name for either config key style."""
+    return config.get('deviceName', config.get('device_name'))
+
+
+def device_udid(config):
+    """Returns the adb serial for either config key style."""
+    return config.get('deviceUID', config.get('udid'))
+
+
+def find_device(devices, name=None):
+    """Returns the device called name, or the first device when name is None."""
+    return next((d for d in devices if name in (None, device_name(d))), None)
+
+
+def options_from_config(config):
+    """Builds UiAutomator2Options from either of the device config formats used in this repo."""
+    options = UiAutomator2Options()
+    options.platform_name = config.get('platformName', config.get('platform_name', 'Android'))
+    options.device_name = device_name(config)
+    udid = device_udid(config)
+    if udid:
+        options.udid = udid
+    app_package = config.get('appPackage', config.get('app_package'))
+    app_activity = config.get('appActivity', config.get('app_activity'))
+    if app_package and app_activity:
+        options.app_package = app_package
+        options.app_activity = app_activity
+    options.no_reset = True
+    return options
+
+
+def create_driver(config, server_url=APPIUM_SERVER_URL, profile=None, options=None):
+    """Starts an Appium session for a device config, applying a UiAutomator2 settings profile."""
+    options = options or options_from_config(config)
+    if profile:
+        apply_profile_options(options, profile)
+    driver = webdriver.Remote(server_url, options=options)
+    if profile:
+        apply_profile(driver, profile)
+    maybe_instrument(driver)
+    logging.info(f"Driver initialized for {device_name(config)} (profile: {profile or 'none'}).")
+    return driver
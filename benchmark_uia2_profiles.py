@@ -0,0 +1,73 @@
+import argparse
+import json
+import logging
+import statistics
+from appium_session import APPIUM_SERVER_URL, create_driver, find_device, load_devices
+from locator_registry import DEFAULT_LOCATOR_FILES, LocatorRegistry, time_locator
+from uia2_profiles import DEFAULT_SETTINGS, SETTINGS_PROFILES, apply_profile
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def benchmark_profiles(driver, locators, profiles, repeat=10):
+    """Measures median and p95 lookup latency of each locator under each profile."""
+    results = []
+    for name in profiles:
+        driver.update_settings(DEFAULT_SETTINGS)
+        apply_profile(driver, name)
+        for label, locator in locators.items():
+            samples = [time_locator(driver, locator, 1)[0] for _ in range(repeat)]
+            results.append({
+                "profile": name,
+                "locator": label,
+                "median_ms": round(statistics.median(samples), 1),
+                "p95_ms": round(sorted(samples)[int(0.95 * (len(samples) - 1))], 1),
+            })
+    driver.update_settings(DEFAULT_SETTINGS)
+    return results
+
+
+def print_results(results):
+    """Prints results with the speed-up against the default profile."""
+    baseline = {r["locator"]: r["median_ms"] for r in results if r["profile"] == "default"}
+    print(f"{'Profile':<18}{'Locator':<32}{'Median ms':>10}{'p95 ms':>10}{'Speed-up':>10}")
+    for r in results:
+        base = baseline.get(r["locator"])
+        speedup = f"{base / r['median_ms']:.1f}x" if base and r["median_ms"] else "-"
+        print(f"{r['profile']:<18}{r['locator']:<32}{r['median_ms']:>10.1f}{r['p95_ms']:>10.1f}{speedup:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare locator latency with and without each UiAutomator2 settings profile.")
+    parser.add_argument("--config", default="device_config.json", help="Device config JSON file")
+    parser.add_argument("--device", help="deviceName to benchmark (default: first device)")
+    parser.add_argument("--server", default=APPIUM_SERVER_URL, help="Appium server URL")
+    parser.add_argument("--profiles", nargs="+", default=list(SETTINGS_PROFILES), help="Profiles to compare")
+    parser.add_argument("--names", nargs="+", required=True, help="Logical locator names visible on the current screen")
+    parser.add_argument("--repeat", type=int, default=10, help="Lookups per locator and profile")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    if "default" not in args.profiles:
+        args.profiles.insert(0, "default")
+    registry = LocatorRegistry.load(*DEFAULT_LOCATOR_FILES)
+    device = find_device(load_devices(args.config), args.device)
+    if device is None:
+        parser.error(f"Device {args.device} not found in {args.config}")
+
+    driver = create_driver(device, args.server)
+    try:
+        results = benchmark_profiles(driver, {name: registry[name] for name in args.names}, args.profiles, args.repeat)
+    finally:
+        driver.quit()
+
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+        logging.info(f"Benchmark results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+import threading
+from adb_client import AdbClient, AdbError
+from package_manager import installed_version
+
+# Learned bounds and window metrics, shared by every script and device
+BOUNDS_CACHE_FILE = "bounds_cache.json"
+# App version used when it cannot be read; nothing is pruned or persisted under it
+UNKNOWN_VERSION = "unknown"
+
+# Serializes read-merge-write of the cache file across device threads
+_file_lock = threading.Lock()
+
+
+def _load(path):
+    try:
+        with open(path) as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _element_bounds(element):
+    """Returns [left, top, right, bottom] for a WebElement."""
+    rect = element.rect
+    return [rect["x"], rect["y"], rect["x"] + rect["width"], rect["y"] + rect["height"]]
+
+
+class BoundsCache:
+    """Element bounds and window metrics learned per (device model, app version, orientation).
+
+    The first lookup of an element finds it by locator and stores its bounds on disk; later
+    runs on the same model and app version tap those coordinates directly. Entries for other
+    versions of the app are dropped when the cache is opened (the layout may have changed),
+    and a rotation switches to the entries learned for the new orientation. If the version
+    cannot be read, bounds are only kept in memory and the file is left untouched.
+    """
+
+    def __init__(self, driver, app_package, path=BOUNDS_CACHE_FILE, adb=None):
+        self.driver = driver
+        self.app_package = app_package
+        self.path = path
+        capabilities = driver.capabilities or {}
+        self.model = capabilities.get("deviceModel") or capabilities.get("deviceName") or "unknown"
+        self.serial = capabilities.get("udid") or capabilities.get("deviceUDID")
+        self.app_version = self._app_version(adb)
+        self.orientation = self._orientation()
+        self.hits = 0
+        self.misses = 0
+        self._prune_other_versions()
+
+    def _app_version(self, adb):
+        if not self.serial:
+            return UNKNOWN_VERSION
+        try:
+            return installed_version(adb or AdbClient(), self.serial, self.app_package) or UNKNOWN_VERSION
+        except (AdbError, OSError) as e:
+            logging.warning(f"Could not read the {self.app_package} version on {self.serial}: {e}; "
+                            f"learned bounds will not be saved.")
+            return UNKNOWN_VERSION
+
+    @property
+    def persistent(self):
+        return self.app_version != UNKNOWN_VERSION
+
+    def _orientation(self):
+        try:
+            return self.driver.orientation
+        except Exception:
+            return "PORTRAIT"
+
+    @property
+    def prefix(self):
+        return f"{self.model}|{self.app_package}|"
+
+    @property
+    def key(self):
+        return f"{self.prefix}{self.app_version}|{self.orientation}"
+
+    def _prune_other_versions(self):
+        if not self.persistent:
+            self._entry = {}
+            return
+        with _file_lock:
+            cache = _load(self.path)
+            stale = [key for key in cache
+                     if key.startswith(self.prefix) and not key.startswith(f"{self.prefix}{self.app_version}|")]
+            if not stale:
+                self._entry = cache.get(self.key, {})
+                return
+            for key in stale:
+                logging.info(f"Dropping learned bounds for {key} ({self.app_package} is now {self.app_version}).")
+                del cache[key]
+            self._write(cache)
+            self._entry = cache.get(self.key, {})
+
+    def _write(self, cache):
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as cache_file:
+            json.dump(cache, cache_file, indent=2, sort_keys=True)
+        os.replace(temporary_path, self.path)
+
+    def _save(self, name, value):
+        self._entry[name] = value
+        if not self.persistent:
+            return
+        with _file_lock:
+            cache = _load(self.path)
+            cache.setdefault(self.key, {})[name] = value
+            self._write(cache)
+
+    def check_orientation(self):
+        """Re-reads the orientation and switches to its entries if the device rotated."""
+        orientation = self._orientation()
+        if orientation != self.orientation:
+            logging.info(f"{self.model} rotated to {orientation}, switching learned bounds.")
+            self.orientation = orientation
+            if not self.persistent:
+                self._entry = {}
+                return orientation
+            with _file_lock:
+                self._entry = _load(self.path).get(self.key, {})
+        return orientation
+
+    def window_size(self):
+        """Returns {"width", "height"}, asking the driver only the first time."""
+        size = self._entry.get("window")
+        if size is None:
+            size = self.driver.get_window_size()
+            self._save("window", {"width": size["width"], "height": size["height"]})
+        return size
+
+    def bounds(self, name, locator):
+        """Returns the learned [left, top, right, bottom] for name, finding locator on first use."""
+        bounds = self._entry.get(f"element:{name}")
+        if bounds is not None:
+            self.hits += 1
+            return bounds
+        self.misses += 1
+        bounds = _element_bounds(self.driver.find_element(*locator))
+        self._save(f"element:{name}", bounds)
+        return bounds
+
+    def tap(self, name, locator, y_offset=None):
+        """Taps the element's center (or y_offset below its top edge) at its learned coordinates."""
+        left, top, right, bottom = self.bounds(name, locator)
+        x = left + (right - left) // 2
+        y = top + y_offset if y_offset is not None else top + (bottom - top) // 2
+        self.driver.tap([(x, y)])
+        return x, y
+
+    def forget(self, name=None):
+        """Drops one learned element (e.g. after a tap missed), or everything for this key."""
+        if not self.persistent:
+            if name is None:
+                self._entry = {}
+            else:
+                self._entry.pop(f"element:{name}", None)
+            return
+        with _file_lock:
+            cache = _load(self.path)
+            if name is None:
+                self._entry = {}
+                cache.pop(self.key, None)
+            else:
+                self._entry.pop(f"element:{name}", None)
+                cache.get(self.key, {}).pop(f"element:{name}", None)
+            self._write(cache)
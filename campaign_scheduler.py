@@ -0,0 +1,120 @@
+import ipaddress
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from adb_client import AdbClient, AdbError
+from appium_session import device_name, device_udid
+
+# Optional config key naming the AP a device is associated with (SSID, BSSID or any label)
+ACCESS_POINT_KEY = "accessPoint"
+# Devices whose AP cannot be determined share this group, so they never overlap
+UNKNOWN_ACCESS_POINT = "unknown"
+# Prefix length used to group devices by the ipAddress subnet when nothing better is known
+SUBNET_PREFIX = 24
+
+# Only the current connection line of dumpsys wifi is needed
+BSSID_COMMAND = "dumpsys wifi | grep -m1 mWifiInfo"
+BSSID_PATTERN = re.compile(r"mWifiInfo[^\n]*?BSSID: ([0-9a-fA-F]{2}(?::[0-9a-fA-F]{2}){5})")
+
+
+def query_bssid(serial, client=None, timeout=10):
+    """Returns the BSSID the device is currently associated with, or None."""
+    if not serial:
+        return None
+    own_client = client is None
+    client = client or AdbClient()
+    try:
+        output = client.run(serial, BSSID_COMMAND, timeout=timeout)
+    except (AdbError, OSError) as e:
+        logging.warning(f"Could not query the BSSID of {serial}: {e}")
+        return None
+    finally:
+        if own_client:
+            client.close()
+    match = BSSID_PATTERN.search(output)
+    if not match or match.group(1) == "02:00:00:00:00:00":
+        return None
+    return match.group(1).lower()
+
+
+def access_point_key(config, resolve_bssid=True, client=None):
+    """Returns the AP a device shares airtime on: accessPoint, the live BSSID, or the ipAddress subnet."""
+    if config.get(ACCESS_POINT_KEY):
+        return str(config[ACCESS_POINT_KEY])
+    if resolve_bssid:
+        bssid = query_bssid(device_udid(config), client)
+        if bssid:
+            return f"bssid:{bssid}"
+    ip_address = config.get('ipAddress')
+    if ip_address:
+        try:
+            subnet = ipaddress.ip_interface(f'{ip_address}/{SUBNET_PREFIX}').network
+        except ValueError:
+            subnet = None
+        if subnet:
+            logging.warning(f"No {ACCESS_POINT_KEY} or BSSID for {device_name(config)}; grouping it by subnet {subnet}, "
+                            f"which merges every access point on that subnet into one cell.")
+            return f"subnet:{subnet}"
+    return UNKNOWN_ACCESS_POINT
+
+
+def group_by_access_point(devices, resolve_bssid=True, client=None):
+    """Groups the device list by AP, keeping the config order within each group."""
+    groups = {}
+    own_client = client is None and resolve_bssid
+    client = client or (AdbClient() if resolve_bssid else None)
+    try:
+        for config in devices:
+            groups.setdefault(access_point_key(config, resolve_bssid, client), []).append(config)
+    finally:
+        if own_client:
+            client.close()
+    return groups
+
+
+def _run_serially(access_point, configs, run_test):
+    """Runs run_test on each device of one AP in turn."""
+    results = []
+    for config in configs:
+        name = device_name(config)
+        logging.info(f"[{access_point}] Starting {name}")
+        start = time.monotonic()
+        try:
+            run_test(config)
+            error = None
+        except Exception as e:
+            error = e
+            logging.error(f"[{access_point}] {name} failed: {e}")
+        results.append({
+            "device": name,
+            "access_point": access_point,
+            "elapsed_s": round(time.monotonic() - start, 1),
+            "error": error,
+        })
+    return results
+
+
+def run_campaign(devices, run_test, resolve_bssid=True, max_parallel=None):
+    """Runs run_test(config) for every device: serially on a shared AP, in parallel across APs.
+
+    Returns one dict per device with its AP, elapsed time and error (None on success).
+    """
+    groups = group_by_access_point(devices, resolve_bssid)
+    for access_point, configs in groups.items():
+        logging.info(f"AP {access_point}: {', '.join(device_name(config) for config in configs)}")
+
+    start = time.monotonic()
+    results = []
+    with ThreadPoolExecutor(max_workers=max_parallel or len(groups) or 1) as executor:
+        futures = [executor.submit(_run_serially, access_point, configs, run_test)
+                   for access_point, configs in groups.items()]
+        for future in as_completed(futures):
+            results.extend(future.result())
+
+    serial_time = sum(result["elapsed_s"] for result in results)
+    campaign_time = time.monotonic() - start
+    failed = [result["device"] for result in results if result["error"]]
+    logging.info(f"Campaign finished in {campaign_time:.0f} s across {len(groups)} AP(s) "
+                 f"({serial_time:.0f} s of device time); failed: {', '.join(failed) or 'none'}")
+    return results
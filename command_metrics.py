@@ -0,0 +1,190 @@
+import atexit
+import html
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+# Set to 1 to instrument every driver created through maybe_instrument()
+ENABLE_ENV = "APPIUM_COMMAND_METRICS"
+# Directory the per-run JSON summary is written to
+OUTPUT_DIR_ENV = "APPIUM_COMMAND_METRICS_DIR"
+
+# W3C element reference keys in findElement(s) responses
+ELEMENT_KEYS = ("element-6066-11e4-a52e-4f735466cecf", "ELEMENT")
+# Element id -> locator entries kept for tagging element commands
+MAX_TRACKED_ELEMENTS = 10000
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram (HDR-style) with bounded relative error."""
+
+    def __init__(self, precision=0.01):
+        self._log_base = math.log1p(precision)
+        self.buckets = defaultdict(int)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value_ms):
+        """Records one latency sample in milliseconds."""
+        value_ms = max(value_ms, 0.001)
+        self.buckets[int(math.log(value_ms) / self._log_base)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.min = value_ms if self.min is None else min(self.min, value_ms)
+        self.max = value_ms if self.max is None else max(self.max, value_ms)
+
+    def percentile(self, p):
+        """Returns the p-th percentile (0-100) in milliseconds."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(math.exp((bucket + 1) * self._log_base), self.max)
+        return self.max
+
+    def summary(self):
+        """Returns count, total and p50/p95/p99 in milliseconds."""
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 1),
+            "mean_ms": round(self.total / self.count, 1) if self.count else None,
+            "min_ms": round(self.min, 1) if self.min is not None else None,
+            "p50_ms": round(self.percentile(50), 1) if self.count else None,
+            "p95_ms": round(self.percentile(95), 1) if self.count else None,
+            "p99_ms": round(self.percentile(99), 1) if self.count else None,
+            "max_ms": round(self.max, 1) if self.max is not None else None,
+        }
+
+
+class CommandMetrics:
+    """Latency histograms per (command, locator, device)."""
+
+    def __init__(self):
+        self._histograms = defaultdict(LatencyHistogram)
+        self._lock = threading.Lock()
+
+    def record(self, command, elapsed_ms, locator=None, device=None):
+        """Records the latency of one command."""
+        with self._lock:
+            self._histograms[(command, locator or "", device or "")].record(elapsed_ms)
+
+    @contextmanager
+    def timed(self, command, locator=None, device=None):
+        """Times a block (e.g. a whole WebDriverWait) as a pseudo-command."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(command, (time.perf_counter() - start) * 1000, locator, device)
+
+    def summary(self):
+        """Returns one row per (command, locator, device), slowest total first."""
+        with self._lock:
+            rows = [dict(command=command, locator=locator, device=device, **histogram.summary())
+                    for (command, locator, device), histogram in self._histograms.items()]
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def dump_json(self, path):
+        """Writes the summary to a JSON file."""
+        with open(path, "w") as output_file:
+            json.dump({"generated": datetime.now().isoformat(timespec="seconds"), "commands": self.summary()},
+                      output_file, indent=2)
+        logging.info(f"Command latency summary saved to {path}")
+        return path
+
+    def to_html(self):
+        """Renders the summary as an HTML table for the pytest-html report."""
+        columns = ["command", "locator", "device", "count", "total_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+        head = "".join(f"<th>{column}</th>" for column in columns)
+        body = "".join(
+            "<tr>" + "".join(f"<td>{html.escape(str(row[column]))}</td>" for column in columns) + "</tr>"
+            for row in self.summary()
+        )
+        return f"<h2>WebDriver command latency</h2><table><tr>{head}</tr>{body}</table>"
+
+
+# Metrics shared by every instrumented driver in this process
+run_metrics = CommandMetrics()
+_atexit_registered = False
+
+
+def _locator_from_params(params):
+    """Returns 'using=value' for find commands."""
+    if params and "using" in params:
+        return f"{params['using']}={params.get('value')}"
+    return None
+
+
+def _element_ids(value):
+    """Yields element ids from a find response value."""
+    for item in value if isinstance(value, list) else [value]:
+        if isinstance(item, dict):
+            for key in ELEMENT_KEYS:
+                if key in item:
+                    yield item[key]
+                    break
+
+
+def instrument(driver, metrics=None, device=None):
+    """Wraps driver.execute so every WebDriver command (including WebElement calls) is timed."""
+    metrics = metrics or run_metrics
+    if device is None:
+        capabilities = getattr(driver, "capabilities", None) or {}
+        device = capabilities.get("deviceName") or capabilities.get("udid") or capabilities.get("appium:udid")
+    element_locators = {}
+    execute = driver.execute
+
+    def timed_execute(driver_command, params=None):
+        locator = _locator_from_params(params) or element_locators.get((params or {}).get("id"))
+        start = time.perf_counter()
+        try:
+            response = execute(driver_command, params)
+        finally:
+            metrics.record(driver_command, (time.perf_counter() - start) * 1000, locator, device)
+        if locator and driver_command in ("findElement", "findElements", "findChildElement", "findChildElements"):
+            if len(element_locators) > MAX_TRACKED_ELEMENTS:
+                element_locators.clear()
+            for element_id in _element_ids(response.get("value")):
+                element_locators[element_id] = locator
+        return response
+
+    driver.execute = timed_execute
+    driver.command_metrics = metrics
+    return metrics
+
+
+def enabled():
+    """Returns True when instrumentation is switched on through the environment."""
+    return os.environ.get(ENABLE_ENV, "").lower() in ("1", "true", "yes")
+
+
+def dump_run_summary(directory=None):
+    """Writes the run-wide summary to command_metrics_<timestamp>.json."""
+    if not run_metrics.summary():
+        return None
+    directory = directory or os.environ.get(OUTPUT_DIR_ENV, ".")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"command_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    return run_metrics.dump_json(path)
+
+
+def maybe_instrument(driver, device=None):
+    """Instruments the driver if APPIUM_COMMAND_METRICS is set; the summary is written at exit."""
+    global _atexit_registered
+    if not enabled():
+        return None
+    if not _atexit_registered:
+        atexit.register(dump_run_summary)
+        _atexit_registered = True
+    return instrument(driver, run_metrics, device)
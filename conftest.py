@@ -0,0 +1,9 @@
+import pytest
+from command_metrics import run_metrics
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_html_results_summary(prefix, summary, postfix):
+    """Adds the WebDriver command latency table to the pytest-html report."""
+    if run_metrics.summary():
+        postfix.append(run_metrics.to_html())
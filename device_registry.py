@@ -0,0 +1,174 @@
+import argparse
+import logging
+import threading
+import time
+from adb_client import AdbClient, AdbError, read_device_list
+
+# State adb reports for a device that is ready for commands
+READY_STATE = "device"
+# Reported by state() for serials the server does not list at all
+DISCONNECTED_STATE = "disconnected"
+# Seconds between attempts to re-subscribe after the adb server went away
+RECONNECT_DELAY = 1.0
+RECONNECT_DELAY_MAX = 30.0
+
+
+class DeviceRegistry:
+    """Live serial -> state map fed by the adb server's host:track-devices stream."""
+
+    def __init__(self, client=None):
+        self.client = client or AdbClient()
+        self._states = {}
+        self._listeners = []
+        self._condition = threading.Condition()
+        self._synced = threading.Event()
+        self._stopped = threading.Event()
+        self._sock = None
+        self._thread = None
+
+    def start(self, timeout=10):
+        """Starts tracking in the background and waits for the first device list."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._track, name="adb-track-devices", daemon=True)
+            self._thread.start()
+        if not self._synced.wait(timeout):
+            logging.warning("No device list from the adb server yet; states may be stale.")
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        sock = self._sock
+        if sock is not None:
+            sock.close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _track(self):
+        delay = RECONNECT_DELAY
+        while not self._stopped.is_set():
+            try:
+                self._sock = self.client.track_devices()
+                delay = RECONNECT_DELAY
+                while True:
+                    self._update(read_device_list(self._sock))
+            except (AdbError, OSError) as e:
+                if self._stopped.is_set():
+                    break
+                logging.warning(f"Lost the adb device stream ({e}), retrying in {delay:.1f}s...")
+                # Nothing is known while the server is away, so report every device as gone
+                self._update({})
+                self._synced.clear()
+                self._stopped.wait(delay)
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
+            finally:
+                if self._sock is not None:
+                    self._sock.close()
+                    self._sock = None
+
+    def _update(self, states):
+        with self._condition:
+            previous = self._states
+            self._states = states
+            self._condition.notify_all()
+        self._synced.set()
+        for serial in previous.keys() | states.keys():
+            old_state = previous.get(serial, DISCONNECTED_STATE)
+            new_state = states.get(serial, DISCONNECTED_STATE)
+            if old_state != new_state:
+                logging.info(f"Device {serial}: {old_state} -> {new_state}")
+                for listener in list(self._listeners):
+                    try:
+                        listener(serial, old_state, new_state)
+                    except Exception as e:
+                        logging.error(f"Device state listener failed for {serial}: {e}")
+
+    def on_change(self, listener):
+        """Calls listener(serial, old_state, new_state) from the tracking thread on every state change."""
+        self._listeners.append(listener)
+        return listener
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def states(self):
+        """Returns a copy of the current {serial: state} map."""
+        with self._condition:
+            return dict(self._states)
+
+    def state(self, serial):
+        with self._condition:
+            return self._states.get(serial, DISCONNECTED_STATE)
+
+    def is_available(self, serial):
+        return self.state(serial) == READY_STATE
+
+    def available(self):
+        """Returns the serials that are ready for commands."""
+        return [serial for serial, state in self.states().items() if state == READY_STATE]
+
+    def wait_for(self, serial, state=READY_STATE, timeout=None):
+        """Blocks until serial reaches state; returns False if timeout passes first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._states.get(serial, DISCONNECTED_STATE) != state:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def wait_until_gone(self, serial, timeout=None):
+        """Blocks until serial is no longer ready (unplugged, offline, unauthorized...)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._states.get(serial) == READY_STATE:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def default_registry():
+    """Returns the shared, already started DeviceRegistry."""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = DeviceRegistry().start()
+        return _default_registry
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Print adb device state changes as they happen.")
+    parser.add_argument("--wait-for", metavar="SERIAL", help="Exit once SERIAL is ready")
+    parser.add_argument("--timeout", type=float, help="Seconds to wait with --wait-for")
+    args = parser.parse_args()
+
+    with DeviceRegistry() as registry:
+        logging.info(f"Devices: {registry.states()}")
+        if args.wait_for:
+            ready = registry.wait_for(args.wait_for, timeout=args.timeout)
+            logging.info(f"{args.wait_for} is {'ready' if ready else registry.state(args.wait_for)}")
+            raise SystemExit(0 if ready else 1)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
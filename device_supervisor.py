@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+from selenium.common.exceptions import InvalidSessionIdException
+
+# Restart backoff (seconds), doubling after each failure
+RESTART_DELAY = 5
+RESTART_DELAY_MAX = 300
+# A session that ran this long resets the backoff
+STABLE_AFTER = 600
+# Consecutive helper failures after which the whole worker is restarted with a fresh session
+HELPER_FAILURES = 3
+# Seconds between status reports while supervising
+STATUS_INTERVAL = 900
+
+STATUS_HEADERS = ["Device", "State", "Uptime (s)", "Availability (%)", "Sessions", "Restarts",
+                  "Helper Restarts", "Last Error"]
+
+
+def _task_name(task):
+    return getattr(task, "__name__", None) or getattr(getattr(task, "func", None), "__name__", repr(task))
+
+
+def _session_lost(error):
+    """Returns True if error means the Appium session itself is gone, so retrying within it is pointless."""
+    return isinstance(error, InvalidSessionIdException) or "session is either terminated or not started" in str(error)
+
+
+class SupervisedDevice:
+    """One device's worker and helpers, restarted together with a fresh session when the worker fails.
+
+    start_session() returns a session (an Appium driver); run(session, stop=stop) is the main
+    loop and each helper(session, stop=stop) runs on its own thread with the same session. Both
+    should return once stop is set. A failing helper is restarted alone within the current session,
+    unless the session is gone or it keeps failing; then the whole worker gets a fresh session.
+    """
+
+    def __init__(self, name, start_session, run, helpers=(), stop_session=None):
+        self.name = name
+        self.start_session = start_session
+        self.run = run
+        self.helpers = list(helpers)
+        self.stop_session = stop_session or (lambda session: session.quit())
+        self.state = "pending"
+        self.sessions = 0
+        self.restarts = 0
+        self.helper_restarts = 0
+        self.last_error = None
+        self.uptime = 0.0
+        self.started_at = None
+        self._session_started = None
+
+    def current_uptime(self):
+        running = time.monotonic() - self._session_started if self._session_started else 0.0
+        return self.uptime + running
+
+    def status(self):
+        """Returns one row of STATUS_HEADERS."""
+        uptime = self.current_uptime()
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        return [self.name, self.state, round(uptime), round(100 * uptime / elapsed, 1) if elapsed else None,
+                self.sessions, self.restarts, self.helper_restarts, self.last_error or ""]
+
+
+class DeviceSupervisor:
+    """Runs every device on its own thread, restarting failed devices with backoff without touching the others."""
+
+    def __init__(self, restart_delay=RESTART_DELAY, restart_delay_max=RESTART_DELAY_MAX,
+                 stable_after=STABLE_AFTER, status_interval=STATUS_INTERVAL, helper_failures=HELPER_FAILURES):
+        self.restart_delay = restart_delay
+        self.restart_delay_max = restart_delay_max
+        self.stable_after = stable_after
+        self.helper_failures = helper_failures
+        self.status_interval = status_interval
+        self.devices = []
+        self._stop = threading.Event()
+        self._threads = []
+        self._session_stops = set()
+
+    def add(self, name, start_session, run, helpers=(), stop_session=None):
+        device = SupervisedDevice(name, start_session, run, helpers, stop_session)
+        self.devices.append(device)
+        return device
+
+    def _run_helper(self, device, helper, session, stop, escalate):
+        delay = self.restart_delay
+        failures = 0
+        while not stop.is_set():
+            attempt_start = time.monotonic()
+            try:
+                helper(session, stop=stop)
+                return
+            except Exception as e:
+                if time.monotonic() - attempt_start >= self.stable_after:
+                    failures, delay = 0, self.restart_delay
+                failures += 1
+                if _session_lost(e) or failures >= self.helper_failures:
+                    logging.error(f"[{device.name}] Helper {_task_name(helper)} failed ({failures} in a row): {e}; "
+                                  f"restarting the worker with a fresh session.")
+                    escalate(e)
+                    return
+                device.helper_restarts += 1
+                logging.error(f"[{device.name}] Helper {_task_name(helper)} failed: {e}; "
+                              f"restarting it in {delay}s.")
+                stop.wait(delay)
+                delay = min(delay * 2, self.restart_delay_max)
+
+    def _session(self, device):
+        """Runs one session of the device; returns the exception that ended it, or None if it finished."""
+        session = device.start_session()
+        device.sessions += 1
+        device.state = "running"
+        device._session_started = time.monotonic()
+        stop = threading.Event()
+        self._session_stops.add(stop)
+        if self._stop.is_set():
+            stop.set()
+        escalated = []
+
+        def escalate(error):
+            # Ends the worker's loop; the helper's error then restarts the session like a worker failure
+            escalated.append(error)
+            stop.set()
+
+        helpers = [threading.Thread(target=self._run_helper, args=(device, helper, session, stop, escalate),
+                                    name=f"{device.name}-helper-{i}", daemon=True)
+                   for i, helper in enumerate(device.helpers)]
+        for thread in helpers:
+            thread.start()
+        try:
+            device.run(session, stop=stop)
+            return escalated[0] if escalated else None
+        except Exception as e:
+            return e
+        finally:
+            stop.set()
+            self._session_stops.discard(stop)
+            for thread in helpers:
+                thread.join(timeout=30)
+            device.uptime += time.monotonic() - device._session_started
+            device._session_started = None
+            try:
+                device.stop_session(session)
+            except Exception as e:
+                logging.warning(f"[{device.name}] Could not close the session cleanly: {e}")
+
+    def _supervise(self, device):
+        device.started_at = time.monotonic()
+        delay = self.restart_delay
+        while not self._stop.is_set():
+            session_start = time.monotonic()
+            try:
+                error = self._session(device)
+            except Exception as e:
+                error = e  # The session could not be started
+            if error is None or self._stop.is_set():
+                break
+            if time.monotonic() - session_start >= self.stable_after:
+                delay = self.restart_delay
+            device.restarts += 1
+            device.last_error = f"{type(error).__name__}: {error}"
+            device.state = "restarting"
+            logging.error(f"[{device.name}] Worker failed ({device.last_error}); restart {device.restarts} "
+                          f"with a fresh session in {delay}s.")
+            self._stop.wait(delay)
+            delay = min(delay * 2, self.restart_delay_max)
+        device.state = "stopped"
+
+    def start(self):
+        for device in self.devices:
+            thread = threading.Thread(target=self._supervise, args=(device,), name=f"supervisor-{device.name}",
+                                      daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=60):
+        self._stop.set()
+        for stop in list(self._session_stops):
+            stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def status(self):
+        return [device.status() for device in self.devices]
+
+    def log_status(self):
+        for row in self.status():
+            logging.info(" | ".join(f"{header}: {value}" for header, value in zip(STATUS_HEADERS, row)))
+
+    def run(self):
+        """Starts every device and blocks until all have finished or Ctrl+C, reporting status periodically."""
+        self.start()
+        next_report = time.monotonic() + self.status_interval
+        try:
+            while any(thread.is_alive() for thread in self._threads):
+                time.sleep(1)
+                if time.monotonic() >= next_report:
+                    self.log_status()
+                    next_report += self.status_interval
+        except KeyboardInterrupt:
+            logging.info("Stopping all device workers...")
+        finally:
+            self.stop()
+            self.log_status()
@@ -0,0 +1,95 @@
+import re
+import time
+import numpy as np
+
+# Sizes use decimal units throughout, matching the store page (Android formats sizes in SI units)
+# and the device counters (bytes / 1e6), so MB * 8 / s is Mbit/s
+BYTES_PER_MB = 1_000_000
+
+# Package size used when neither the store page nor the device counters give one
+DEFAULT_PACKAGE_SIZE_MB = 3220
+# Progress percentages reported as time-to-X% milestones
+MILESTONES = (10, 25, 50, 75, 90, 100)
+
+# Play Store progress content-desc, e.g. "45% of 3.15 GB" or "Downloading 1.2 GB of 3.1 GB, 38%"
+PERCENT_PATTERN = re.compile(r"(\d{1,3}(?:\.\d+)?)\s*%")
+SIZE_PATTERN = re.compile(r"of\s+([\d.,]+)\s*([KMG]B)", re.IGNORECASE)
+UNIT_MB = {"KB": 1000 / BYTES_PER_MB, "MB": 1, "GB": 1_000_000_000 / BYTES_PER_MB}
+
+CURVE_HEADERS = ["Attempt", "Elapsed (s)", "Progress (%)", "Interval Throughput (Mbps)"]
+
+
+def parse_progress(text):
+    """Returns (percent, package size in MB or None) from a progress content-desc, or (None, None)."""
+    if not text:
+        return None, None
+    percent = PERCENT_PATTERN.search(text)
+    size = SIZE_PATTERN.search(text)
+    size_mb = float(size.group(1).replace(",", "")) * UNIT_MB[size.group(2).upper()] if size else None
+    return (float(percent.group(1)) if percent else None), size_mb
+
+
+class DownloadProgress:
+    """(time, percent) curve of one Play Store download, recorded each time the percentage changes."""
+
+    def __init__(self, start_time=None):
+        self.start_time = time.time() if start_time is None else start_time
+        self.times = []
+        self.percents = []
+        self.store_size_mb = None
+        self.received_mb = None
+
+    def record(self, text, timestamp=None):
+        """Records a progress content-desc; returns the percent if it changed, else None."""
+        percent, size_mb = parse_progress(text)
+        if size_mb:
+            self.store_size_mb = size_mb
+        if percent is None or (self.percents and percent == self.percents[-1]):
+            return None
+        self.times.append(time.time() if timestamp is None else timestamp)
+        self.percents.append(percent)
+        return percent
+
+    @property
+    def complete(self):
+        return bool(self.percents) and self.percents[-1] >= 100
+
+    @property
+    def elapsed(self):
+        return (self.times[-1] if self.times else time.time()) - self.start_time
+
+    def package_size(self):
+        """Returns (size MB, source): the store page size, the bytes the device received, or the default."""
+        if self.store_size_mb:
+            return self.store_size_mb, "store page"
+        if self.received_mb:
+            return self.received_mb, "device counters"
+        return DEFAULT_PACKAGE_SIZE_MB, "default"
+
+    def average_mbps(self):
+        """Average throughput over the whole download, from the package size."""
+        size_mb, _ = self.package_size()
+        return size_mb * 8 / self.elapsed if self.elapsed > 0 else None
+
+    def curve(self):
+        """Returns (elapsed s, percent, interval Mbps) rows; the first row's interval starts at start_time."""
+        if not self.times:
+            return []
+        size_mb, _ = self.package_size()
+        elapsed = np.asarray(self.times) - self.start_time
+        percents = np.asarray(self.percents)
+        interval = np.diff(elapsed, prepend=0.0)
+        gained = np.diff(percents, prepend=0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mbps = np.where(interval > 0, gained / 100 * size_mb * 8 / interval, np.nan)
+        return [(round(float(e), 2), float(p), None if np.isnan(m) else round(float(m), 2))
+                for e, p, m in zip(elapsed, percents, mbps)]
+
+    def milestones(self, marks=MILESTONES):
+        """Returns {percent: seconds to reach it}, interpolated between samples (None if never reached)."""
+        if not self.times:
+            return {mark: None for mark in marks}
+        elapsed = np.concatenate(([0.0], np.asarray(self.times) - self.start_time))
+        percents = np.maximum.accumulate(np.concatenate(([0.0], self.percents)))
+        return {mark: round(float(np.interp(mark, percents, elapsed)), 2) if mark <= percents[-1] else None
+                for mark in marks}
@@ -0,0 +1,173 @@
+import logging
+import re
+import time
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Locator predicates on text or state, which a recycled view can change while its handle stays live
+VOLATILE_PREDICATE = re.compile(r"@(text|checked|selected)\b|text\(\)|\.(text\w*|checked|selected)\(")
+
+
+def _volatile(locator):
+    """True if the locator matches on text or state, so a cached handle cannot vouch for it."""
+    return bool(VOLATILE_PREDICATE.search(str(locator[1])))
+
+
+class _CandidateDriver:
+    """Driver stand-in whose lookups of one locator return a cached element, for evaluating wait conditions."""
+
+    def __init__(self, driver, locator, element):
+        self._driver = driver
+        self._locator = tuple(locator)
+        self._element = element
+
+    def find_element(self, by, value):
+        return self._element if (by, value) == self._locator else self._driver.find_element(by, value)
+
+    def find_elements(self, by, value):
+        return [self._element] if (by, value) == self._locator else self._driver.find_elements(by, value)
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+class ElementCache:
+    """Caches WebElements by locator and re-resolves them only when they go stale.
+
+    max_age (seconds) forces a fresh lookup for entries older than that, for screens
+    where a recycled view can keep its handle but stop matching the locator. A cached
+    element counts as a hit only once it has been used without going stale. Locators
+    that match on text or state (see VOLATILE_PREDICATE) are never cached: the view
+    behind them stays live when its text changes, so only a fresh lookup re-checks them.
+    """
+
+    def __init__(self, driver, device_name=None, max_age=None):
+        self.driver = driver
+        self.device_name = device_name
+        self.max_age = max_age
+        self._elements = {}
+        self._found_at = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def _resolve(self, locator):
+        """Finds the element with a fresh lookup and caches it."""
+        self.misses += 1
+        element = self.driver.find_element(*locator)
+        return self.put(locator, element)
+
+    def _cached(self, locator):
+        """Returns the cached element, or None if missing or older than max_age."""
+        element = self._elements.get(locator)
+        if element is not None and self.max_age is not None:
+            if time.monotonic() - self._found_at[locator] > self.max_age:
+                self.invalidate(locator)
+                return None
+        return element
+
+    def _lookup(self, locator):
+        """Returns (element, True if it came from the cache), finding it on a miss."""
+        element = self._cached(locator)
+        if element is None:
+            return self._resolve(locator), False
+        return element, True
+
+    def get(self, locator):
+        """Returns the cached element for a (by, value) locator, finding it on a miss.
+
+        The element is not checked for staleness here, so this is not counted as a hit.
+        """
+        return self._lookup(locator)[0]
+
+    def put(self, locator, element):
+        """Stores an element found elsewhere (e.g. by WebDriverWait) under its locator."""
+        if _volatile(locator):
+            return element
+        self._elements[locator] = element
+        self._found_at[locator] = time.monotonic()
+        return element
+
+    def invalidate(self, locator=None):
+        """Drops one cached element, or all of them when no locator is given."""
+        if locator is None:
+            self._elements.clear()
+            self._found_at.clear()
+        else:
+            self._elements.pop(locator, None)
+            self._found_at.pop(locator, None)
+
+    def call(self, locator, action):
+        """Runs action(element), re-resolving once if the cached element has gone stale."""
+        element, cached = self._lookup(locator)
+        try:
+            result = action(element)
+            if cached:
+                self.hits += 1
+            return result
+        except StaleElementReferenceException:
+            self.stale += 1
+            logging.debug(f"[{self.device_name}] Stale element for {locator}, re-resolving.")
+            self.invalidate(locator)
+            return action(self._resolve(locator))
+
+    def text(self, locator):
+        """Returns the element text."""
+        return self.call(locator, lambda element: element.text)
+
+    def attribute(self, locator, name):
+        """Returns an element attribute."""
+        return self.call(locator, lambda element: element.get_attribute(name))
+
+    def click(self, locator):
+        """Clicks the element."""
+        return self.call(locator, lambda element: element.click())
+
+    def is_present(self, locator):
+        """Checks presence, using a cheap liveness call on a cached element instead of a new lookup."""
+        try:
+            return self.call(locator, lambda element: element.is_displayed() or True)
+        except NoSuchElementException:
+            self.invalidate(locator)
+            return False
+
+    def wait(self, locator, timeout, condition=EC.presence_of_element_located):
+        """Waits until condition(locator) holds and returns its result, caching the element.
+
+        The condition is always evaluated; the cached element is tried first as its candidate,
+        and only if it no longer satisfies the condition is the explicit wait run with fresh lookups.
+        """
+        element = self._cached(locator)
+        if element is not None:
+            try:
+                result = condition(locator)(_CandidateDriver(self.driver, locator, element))
+            except StaleElementReferenceException:
+                self.stale += 1
+                result = False
+            if result:
+                self.hits += 1
+                return result
+            self.invalidate(locator)
+        self.misses += 1
+        result = WebDriverWait(self.driver, timeout).until(condition(locator))
+        if not isinstance(result, bool):
+            self.put(locator, result)
+        return result
+
+    def stats(self):
+        """Returns hit/miss counters; every hit is a find_element round trip saved."""
+        lookups = self.hits + self.misses
+        return {
+            "device": self.device_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def log_stats(self):
+        """Logs the hit/miss counters."""
+        stats = self.stats()
+        logging.info(f"[{self.device_name}] Element cache: {stats['hits']} hits, {stats['misses']} misses, "
+                     f"{stats['stale']} stale ({stats['hit_rate']:.0%} of lookups saved).")
@@ -0,0 +1,555 @@
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# W3C element reference key
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+
+# Taps whose pointer moves less than this many pixels count as taps, not swipes
+TAP_SLOP_PX = 10
+
+
+class XPathError(ValueError):
+    """Raised for XPath expressions outside the subset the fake server understands."""
+
+
+def _split_top_level(text, separator):
+    """Splits text on separator outside quotes, brackets and parentheses."""
+    parts, depth, quote, start, i = [], 0, None, 0, 0
+    while i < len(text):
+        c = text[i]
+        if quote:
+            quote = None if c == quote else quote
+        elif c in "'\"":
+            quote = c
+        elif c in "[(":
+            depth += 1
+        elif c in "])":
+            depth -= 1
+        elif depth == 0 and text.startswith(separator, i):
+            parts.append(text[start:i])
+            i += len(separator)
+            start = i
+            continue
+        i += 1
+    parts.append(text[start:])
+    return parts
+
+
+def _closing_bracket(text):
+    """Returns the index of the ']' closing the '[' at text[0]."""
+    depth, quote = 0, None
+    for i, c in enumerate(text):
+        if quote:
+            quote = None if c == quote else quote
+        elif c in "'\"":
+            quote = c
+        elif c == "[":
+            depth += 1
+        elif c == "]":
+            depth -= 1
+            if depth == 0:
+                return i
+    raise XPathError(f"Unbalanced brackets in {text}")
+
+
+def _parse_steps(path):
+    """Parses a location path into (axis, name, predicates) steps."""
+    if not path.startswith("/"):
+        raise XPathError(f"Only absolute XPaths are supported: {path}")
+    steps = []
+    raw = _split_top_level(path, "/")[1:]
+    axis = "child"
+    for step in raw:
+        if step == "":
+            axis = "descendant"
+            continue
+        match = re.match(r"^(\*|[\w.$-]+)((?:\[.*\])*)$", step)
+        if not match:
+            raise XPathError(f"Unsupported XPath step: {step}")
+        predicates = []
+        rest = match.group(2)
+        while rest:
+            end = _closing_bracket(rest)
+            predicates.append(rest[1:end])
+            rest = rest[end + 1:]
+        steps.append((axis, match.group(1), predicates))
+        axis = "child"
+    return steps
+
+
+def _term_matches(term, node):
+    """Evaluates one predicate term against a node."""
+    term = term.strip()
+    match = re.match(r"^@([\w-]+)\s*=\s*(['\"])(.*)\2$", term)
+    if match:
+        return node.get(match.group(1)) == match.group(3)
+    match = re.match(r"^(contains|starts-with)\(\s*@([\w-]+)\s*,\s*(['\"])(.*)\3\s*\)$", term)
+    if match:
+        value = node.get(match.group(2)) or ""
+        return match.group(4) in value if match.group(1) == "contains" else value.startswith(match.group(4))
+    match = re.match(r"^@([\w-]+)$", term)
+    if match:
+        return node.get(match.group(1)) is not None
+    raise XPathError(f"Unsupported XPath predicate: {term}")
+
+
+def _apply_predicate(predicate, nodes):
+    """Filters nodes by a positional or boolean predicate."""
+    if predicate.strip().isdigit():
+        position = int(predicate)
+        return nodes[position - 1:position]
+    terms = _split_top_level(predicate, " and ")
+    return [node for node in nodes if all(_term_matches(term, node) for term in terms)]
+
+
+def evaluate_xpath(document, xpath):
+    """Evaluates the XPath subset used by the scripts against a parsed page source."""
+    xpath = xpath.strip()
+    grouped = re.match(r"^\((.*)\)\[(\d+)\]$", xpath)
+    if grouped:
+        nodes = evaluate_xpath(document, grouped.group(1))
+        position = int(grouped.group(2))
+        return nodes[position - 1:position]
+
+    order = {id(node): i for i, node in enumerate(document.iter())}
+    contexts = [document]
+    for axis, name, predicates in _parse_steps(xpath):
+        parents = contexts if axis == "child" else [n for c in contexts for n in c.iter()]
+        seen, matches = set(), []
+        for parent in parents:
+            if id(parent) in seen:
+                continue
+            seen.add(id(parent))
+            children = [child for child in parent if name == "*" or child.tag == name]
+            for predicate in predicates:
+                children = _apply_predicate(predicate, children)
+            matches.extend(children)
+        unique = {id(node): node for node in matches}
+        contexts = sorted(unique.values(), key=lambda node: order[id(node)])
+    return contexts
+
+
+def evaluate_uiselector(document, selector):
+    """Evaluates a 'new UiSelector()...' chain against a parsed page source."""
+    calls = re.findall(r"\.(\w+)\(\s*\"((?:[^\"\\]|\\.)*)\"\s*\)", selector)
+    if not selector.strip().startswith("new UiSelector()") or not calls:
+        raise XPathError(f"Unsupported UiSelector: {selector}")
+    checks = {
+        "className": lambda node, v: node.tag == v,
+        "resourceId": lambda node, v: node.get("resource-id") == v,
+        "text": lambda node, v: node.get("text") == v,
+        "textContains": lambda node, v: v in (node.get("text") or ""),
+        "description": lambda node, v: node.get("content-desc") == v,
+        "descriptionContains": lambda node, v: v in (node.get("content-desc") or ""),
+    }
+    for method, _ in calls:
+        if method not in checks:
+            raise XPathError(f"Unsupported UiSelector method: {method}")
+    values = [(checks[method], value.replace('\\"', '"').replace('\\\\', '\\')) for method, value in calls]
+    return [node for node in document.iter() if node.tag != "#document"
+            and all(check(node, value) for check, value in values)]
+
+
+def find_nodes(document, using, value):
+    """Finds nodes by any of the locator strategies the scripts use."""
+    if using == "xpath":
+        return evaluate_xpath(document, value)
+    if using == "-android uiautomator":
+        return evaluate_uiselector(document, value)
+    if using == "id":
+        return [n for n in document.iter() if n.get("resource-id") in (value,) or
+                (n.get("resource-id") or "").endswith(":id/" + value)]
+    if using == "accessibility id":
+        return [n for n in document.iter() if n.get("content-desc") == value]
+    if using == "class name":
+        return [n for n in document.iter() if n.tag == value]
+    raise XPathError(f"Unsupported locator strategy: {using}")
+
+
+def parse_bounds(bounds):
+    """Parses '[x1,y1][x2,y2]' into (x1, y1, x2, y2)."""
+    match = re.match(r"\[(\d+),(\d+)\]\[(\d+),(\d+)\]", bounds or "")
+    return tuple(int(v) for v in match.groups()) if match else None
+
+
+class Scenario:
+    """Recorded page sources plus the transitions between them."""
+
+    def __init__(self, path):
+        with open(path) as scenario_file:
+            data = json.load(scenario_file)
+        base = os.path.dirname(os.path.abspath(path))
+        self.name = data.get("name", os.path.splitext(os.path.basename(path))[0])
+        self.app_package = data.get("appPackage")
+        self.initial = data["initial"]
+        self.window = data.get("window", {"width": 1080, "height": 2340})
+        self.transitions = data.get("transitions", [])
+        self.latency_ms = data.get("latency_ms", {})
+        self.sources = {}
+        for screen, source_path in data["screens"].items():
+            with open(os.path.join(base, source_path), encoding="utf-8") as source_file:
+                self.sources[screen] = source_file.read()
+
+
+class FakeSession:
+    """State of one fake Appium session: current screen, element handles and settings."""
+
+    def __init__(self, scenario, capabilities):
+        self.id = uuid.uuid4().hex
+        self.scenario = scenario
+        self.capabilities = capabilities
+        self.settings = {}
+        self.lock = threading.Lock()
+        self.entries = 0
+        self._enter(scenario.initial)
+
+    def _enter(self, screen):
+        """Switches to a screen; element handles from the previous screen become stale."""
+        self.screen = screen
+        self.entered_at = time.monotonic()
+        self.entries += 1
+        self.document = ET.Element("#document")
+        self.document.append(ET.fromstring(self.scenario.sources[screen]))
+        self.elements = {}
+        self.element_ids = {}
+        logging.info(f"[{self.id[:8]}] Screen -> {screen}")
+
+    def advance(self):
+        """Applies timed ('after') transitions for the current screen."""
+        for transition in self.scenario.transitions:
+            if transition.get("screen") == self.screen and "after" in transition:
+                if time.monotonic() - self.entered_at >= transition["after"]:
+                    self._enter(transition["to"])
+                    return self.advance()
+
+    def trigger(self, event, node=None, keycode=None):
+        """Applies the first transition matching an event on the current screen."""
+        for transition in self.scenario.transitions:
+            if transition.get("screen") != self.screen or transition.get("on") != event:
+                continue
+            if event == "keycode" and transition.get("keycode") not in (None, keycode):
+                continue
+            match = transition.get("match", {})
+            if match and (node is None or any(node.get(k) != v for k, v in match.items())):
+                continue
+            self._enter(transition["to"])
+            return True
+        return False
+
+    def element_id(self, node):
+        """Returns a handle for a node, stable while the screen stays the same."""
+        key = id(node)
+        if key not in self.element_ids:
+            element_id = f"{self.screen}-{self.entries}-{len(self.element_ids)}"
+            self.element_ids[key] = element_id
+            self.elements[element_id] = node
+        return self.element_ids[key]
+
+    def node_at(self, x, y):
+        """Returns the deepest node whose bounds contain the point."""
+        found = None
+        for node in self.document.iter():
+            bounds = parse_bounds(node.get("bounds"))
+            if bounds and bounds[0] <= x < bounds[2] and bounds[1] <= y < bounds[3]:
+                found = node
+        return found
+
+
+class WebDriverError(Exception):
+    """A W3C error response."""
+
+    def __init__(self, error, message, status=404):
+        super().__init__(message)
+        self.error = error
+        self.status = status
+
+
+class FakeAppiumServer(ThreadingHTTPServer):
+    """HTTP stand-in for the Appium endpoints the scripts use."""
+
+    daemon_threads = True
+
+    def __init__(self, address, scenarios, latency_ms=0.0, jitter_ms=0.0):
+        super().__init__(address, FakeAppiumHandler)
+        self.scenarios = scenarios
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.sessions = {}
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/wd/hub"
+
+    def delay(self, command, scenario=None):
+        """Sleeps for the scenario's per-command latency, else the server default.
+
+        Find commands are looked up as "<command>.<strategy>" first (e.g. "findElement.xpath").
+        """
+        latency = self.latency_ms
+        if scenario is not None:
+            latency = scenario.latency_ms.get(command, scenario.latency_ms.get(command.split(".")[0], latency))
+        latency += random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+    def scenario_for(self, capabilities):
+        """Picks the scenario whose appPackage matches the session, else the first one."""
+        app_package = capabilities.get("appium:appPackage") or capabilities.get("appPackage")
+        for scenario in self.scenarios:
+            if scenario.app_package and scenario.app_package == app_package:
+                return scenario
+        return self.scenarios[0]
+
+
+class FakeAppiumHandler(BaseHTTPRequestHandler):
+    """Routes W3C/Appium requests to FakeSession state."""
+
+    ROUTES = [
+        ("POST", r"/session", "new_session"),
+        ("DELETE", r"/session/(?P<sid>[^/]+)", "delete_session"),
+        ("POST", r"/session/(?P<sid>[^/]+)/element", "find_element"),
+        ("POST", r"/session/(?P<sid>[^/]+)/elements", "find_elements"),
+        ("POST", r"/session/(?P<sid>[^/]+)/element/(?P<eid>[^/]+)/element", "find_element"),
+        ("POST", r"/session/(?P<sid>[^/]+)/element/(?P<eid>[^/]+)/elements", "find_elements"),
+        ("GET", r"/session/(?P<sid>[^/]+)/element/(?P<eid>[^/]+)/text", "element_text"),
+        ("GET", r"/session/(?P<sid>[^/]+)/element/(?P<eid>[^/]+)/attribute/(?P<name>[^/]+)", "element_attribute"),
+        ("GET", r"/session/(?P<sid>[^/]+)/element/(?P<eid>[^/]+)/displayed", "element_displayed"),
+        ("GET", r"/session/(?P<sid>[^/]+)/element/(?P<eid>[^/]+)/enabled", "element_enabled"),
+        ("GET", r"/session/(?P<sid>[^/]+)/element/(?P<eid>[^/]+)/rect", "element_rect"),
+        ("POST", r"/session/(?P<sid>[^/]+)/element/(?P<eid>[^/]+)/click", "element_click"),
+        ("POST", r"/session/(?P<sid>[^/]+)/element/(?P<eid>[^/]+)/value", "element_value"),
+        ("POST", r"/session/(?P<sid>[^/]+)/element/(?P<eid>[^/]+)/clear", "element_clear"),
+        ("POST", r"/session/(?P<sid>[^/]+)/actions", "actions"),
+        ("DELETE", r"/session/(?P<sid>[^/]+)/actions", "release_actions"),
+        ("GET", r"/session/(?P<sid>[^/]+)/source", "page_source"),
+        ("GET", r"/session/(?P<sid>[^/]+)/window/rect", "window_rect"),
+        ("POST", r"/session/(?P<sid>[^/]+)/appium/device/press_keycode", "press_keycode"),
+        ("POST", r"/session/(?P<sid>[^/]+)/execute/sync", "execute_script"),
+        ("GET", r"/session/(?P<sid>[^/]+)/appium/settings", "get_settings"),
+        ("POST", r"/session/(?P<sid>[^/]+)/appium/settings", "update_settings"),
+        ("POST", r"/session/(?P<sid>[^/]+)/timeouts", "set_timeouts"),
+    ]
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+    def _dispatch(self, method):
+        path = re.sub(r"^/wd/hub", "", self.path.split("?")[0]).rstrip("/") or "/"
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+        try:
+            for route_method, pattern, handler in self.ROUTES:
+                match = re.fullmatch(pattern, path)
+                if route_method == method and match:
+                    value = getattr(self, handler)(body, **match.groupdict())
+                    return self._respond(200, {"value": value})
+            raise WebDriverError("unknown command", f"{method} {path} is not implemented by the fake server")
+        except WebDriverError as e:
+            self._respond(e.status, {"value": {"error": e.error, "message": str(e), "stacktrace": ""}})
+        except XPathError as e:
+            self._respond(400, {"value": {"error": "invalid selector", "message": str(e), "stacktrace": ""}})
+
+    def _respond(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _session(self, sid, command):
+        session = self.server.sessions.get(sid)
+        if session is None:
+            raise WebDriverError("invalid session id", f"Session {sid} does not exist")
+        self.server.delay(command, session.scenario)
+        session.advance()
+        return session
+
+    def _element(self, session, eid):
+        node = session.elements.get(eid)
+        if node is None:
+            raise WebDriverError("stale element reference", f"Element {eid} is no longer on screen")
+        return node
+
+    def new_session(self, body):
+        capabilities = body.get("capabilities", {}).get("alwaysMatch", {}) or body.get("desiredCapabilities", {})
+        scenario = self.server.scenario_for(capabilities)
+        self.server.delay("newSession", scenario)
+        session = FakeSession(scenario, capabilities)
+        self.server.sessions[session.id] = session
+        logging.info(f"New fake session {session.id[:8]} using scenario '{session.scenario.name}'")
+        return {"sessionId": session.id, "capabilities": dict(capabilities, platformName="Android")}
+
+    def delete_session(self, body, sid):
+        self.server.sessions.pop(sid, None)
+        return None
+
+    def _find(self, body, sid, eid, command):
+        session = self._session(sid, f"{command}.{body.get('using')}")
+        with session.lock:
+            root = session.document
+            if eid is not None:
+                root = ET.Element("#document")
+                root.append(self._element(session, eid))
+            nodes = find_nodes(root, body.get("using"), body.get("value"))
+            return session, [{ELEMENT_KEY: session.element_id(node)} for node in nodes]
+
+    def find_element(self, body, sid, eid=None):
+        session, elements = self._find(body, sid, eid, "findElement")
+        if not elements:
+            raise WebDriverError("no such element", f"No element matches {body.get('using')}={body.get('value')}")
+        return elements[0]
+
+    def find_elements(self, body, sid, eid=None):
+        return self._find(body, sid, eid, "findElements")[1]
+
+    def element_text(self, body, sid, eid):
+        session = self._session(sid, "getElementText")
+        return self._element(session, eid).get("text", "")
+
+    def element_attribute(self, body, sid, eid, name):
+        session = self._session(sid, "getElementAttribute")
+        node = self._element(session, eid)
+        aliases = {"contentDescription": "content-desc", "resourceId": "resource-id", "className": "class"}
+        return node.get(aliases.get(name, name))
+
+    def element_displayed(self, body, sid, eid):
+        session = self._session(sid, "isElementDisplayed")
+        return self._element(session, eid).get("displayed", "true") == "true"
+
+    def element_enabled(self, body, sid, eid):
+        session = self._session(sid, "isElementEnabled")
+        return self._element(session, eid).get("enabled", "true") == "true"
+
+    def element_rect(self, body, sid, eid):
+        session = self._session(sid, "getElementRect")
+        x1, y1, x2, y2 = parse_bounds(self._element(session, eid).get("bounds")) or (0, 0, 0, 0)
+        return {"x": x1, "y": y1, "width": x2 - x1, "height": y2 - y1}
+
+    def element_click(self, body, sid, eid):
+        session = self._session(sid, "clickElement")
+        with session.lock:
+            node = self._element(session, eid)
+            if node.get("checkable") == "true":
+                node.set("checked", "false" if node.get("checked") == "true" else "true")
+            session.trigger("click", node)
+        return None
+
+    def element_value(self, body, sid, eid):
+        session = self._session(sid, "sendKeysToElement")
+        node = self._element(session, eid)
+        node.set("text", (node.get("text") or "") + body.get("text", "".join(body.get("value", []))))
+        return None
+
+    def element_clear(self, body, sid, eid):
+        session = self._session(sid, "clearElement")
+        self._element(session, eid).set("text", "")
+        return None
+
+    def actions(self, body, sid):
+        session = self._session(sid, "actions")
+        for source in body.get("actions", []):
+            moves = [a for a in source.get("actions", []) if a.get("type") == "pointerMove"]
+            if not moves:
+                continue
+            start, end = moves[0], moves[-1]
+            with session.lock:
+                if abs(end["x"] - start["x"]) <= TAP_SLOP_PX and abs(end["y"] - start["y"]) <= TAP_SLOP_PX:
+                    session.trigger("click", session.node_at(start["x"], start["y"]))
+                else:
+                    session.trigger("swipe")
+        return None
+
+    def release_actions(self, body, sid):
+        self._session(sid, "releaseActions")
+        return None
+
+    def page_source(self, body, sid):
+        session = self._session(sid, "getPageSource")
+        return session.scenario.sources[session.screen]
+
+    def window_rect(self, body, sid):
+        session = self._session(sid, "getWindowRect")
+        return dict(x=0, y=0, **session.scenario.window)
+
+    def press_keycode(self, body, sid):
+        session = self._session(sid, "pressKeyCode")
+        with session.lock:
+            session.trigger("keycode", keycode=body.get("keycode"))
+        return None
+
+    def execute_script(self, body, sid):
+        script = body.get("script", "")
+        args = (body.get("args") or [{}])[0]
+        session = self._session(sid, script)
+        with session.lock:
+            if script == "mobile: pressKey":
+                session.trigger("keycode", keycode=args.get("keycode"))
+            elif script == "mobile: clickGesture":
+                node = session.elements.get(args.get("elementId")) or session.node_at(args.get("x", -1), args.get("y", -1))
+                session.trigger("click", node)
+            elif script in ("mobile: swipeGesture", "mobile: scrollGesture"):
+                session.trigger("swipe")
+            else:
+                raise WebDriverError("unknown command", f"{script} is not implemented by the fake server")
+        return None
+
+    def get_settings(self, body, sid):
+        return self._session(sid, "getSettings").settings
+
+    def update_settings(self, body, sid):
+        session = self._session(sid, "updateSettings")
+        session.settings.update(body.get("settings", {}))
+        return None
+
+    def set_timeouts(self, body, sid):
+        self._session(sid, "setTimeouts")
+        return None
+
+
+def start_server(scenario_paths, host="127.0.0.1", port=0, latency_ms=0.0, jitter_ms=0.0):
+    """Starts the fake server on a background thread and returns it (see .url)."""
+    server = FakeAppiumServer((host, port), [Scenario(path) for path in scenario_paths], latency_ms, jitter_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Serve recorded page sources as a fake Appium server.")
+    parser.add_argument("--scenario", nargs="+", default=["recorded_sessions/ookla.json"], help="Scenario JSON files")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4723)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Default per-command latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter added to every command")
+    args = parser.parse_args()
+
+    server = FakeAppiumServer((args.host, args.port), [Scenario(path) for path in args.scenario],
+                              args.latency_ms, args.jitter_ms)
+    logging.info(f"Fake Appium server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Fake Appium server stopped.")
+
+
+if __name__ == "__main__":
+    main()
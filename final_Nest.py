@@ -1,17 +1,34 @@
 import json
 import time
-import csv
+import logging
+import threading
+from functools import partial
 from datetime import datetime
 from appium.webdriver.common.appiumby import AppiumBy
 from appium.options.android import UiAutomator2Options
 from appium import webdriver
 from selenium.common.exceptions import NoSuchElementException
-from concurrent.futures import ThreadPoolExecutor
+from uia2_profiles import apply_profile, apply_profile_options
+from command_metrics import maybe_instrument
+from device_supervisor import DeviceSupervisor
+from result_sinks import EventLogSink
+from fixed_rate import FixedRateSampler
+
+# Configure logging (supervisor restarts and status reports)
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 # Load device configurations from JSON file
 with open("devices_config.json", "r") as file:
     devices = json.load(file)
 
+# Shared text log for every device, and the per-device CSV columns
+COMPREHENSIVE_LOG = "comprehensive_log.txt"
+DISCONNECT_LOG_HEADERS = ["Device", "Event", "Start Time", "End Time", "Duration (seconds)"]
+# Seconds between writer flushes to disk
+LOG_FLUSH_INTERVAL = 1.0
+# Seconds between UI checks of each device
+MONITOR_INTERVAL = 1.0
+
 # XPath Definitions
 XPATH_TIMESTAMP = "//android.widget.TextView[@resource-id='com.nest.android:id/timeline_timestamp']"
 XPATH_LIVE_CAMERA = "//android.view.ViewGroup[@resource-id='com.nest.android:id/camera_stream_view']/android.view.View"
@@ -40,8 +57,9 @@ def get_timestamp(driver):
         return None
 
 # Function to handle reconnection attempts
-def handle_reconnection(driver, device_name):
-    while True:
+def handle_reconnection(driver, device_name, stop=None):
+    stop = stop or threading.Event()
+    while not stop.is_set():
         try:
             print(f"\033[93m[{device_name} RECONNECTING]\033[0m Clicking 'Try Again' button...")
             driver.find_element(AppiumBy.XPATH, XPATH_TRY_AGAIN).click()
@@ -54,9 +72,10 @@ def handle_reconnection(driver, device_name):
         except NoSuchElementException:
             print(f"\033[93m[{device_name} TRY AGAIN NOT FOUND]\033[0m Retrying in 4 seconds...")
             time.sleep(4)
+    return False
 
-# Monitor a single device
-def monitor_device(device):
+# Start an Appium session for a device
+def start_session(device):
     options = UiAutomator2Options()
     options.platform_name = device["platformName"]
     options.platform_version = device["platformVersion"]
@@ -67,89 +86,88 @@ def monitor_device(device):
     options.no_reset = device["noReset"]
     options.full_reset = device["fullReset"]
 
-    log_file = f"{device['deviceUniqueId']}_disconnect_log.csv"
-    comprehensive_log = "comprehensive_log.txt"
+    apply_profile_options(options, "live_camera")
+    driver = webdriver.Remote("http://127.0.0.1:4723/wd/hub", options=options)
+    apply_profile(driver, "live_camera")
+    maybe_instrument(driver)
+    print(f"Appium session started for {device['deviceName']}. Monitoring live stream...")
+    return driver
+
+# Per-device disconnect log; started once per run so worker restarts append to it
+def disconnect_log_path(device):
+    return f"{device['deviceUniqueId']}_disconnect_log.csv"
+
+# Monitor a single device until stop is set; exceptions end the session and the supervisor restarts it.
+# Events go to the shared log writer, so this thread never blocks on file I/O.
+def monitor_device(device, event_log, driver, stop):
+    log_file = disconnect_log_path(device)
     disconnect_start_time = None
     buffering_start_time = None
     live_stream_logged = False
-
+    sampler = FixedRateSampler(MONITOR_INTERVAL, stop, name=device["deviceName"])
+
+    for _ in sampler:
+        timestamp = get_timestamp(driver)
+        live_camera_present = is_element_present(driver, XPATH_LIVE_CAMERA)
+        buffering_present = is_element_present(driver, XPATH_BUFFERING)
+        error_text_present = is_element_present(driver, XPATH_ERROR_TEXT)
+        blue_container_present = is_element_present(driver, XPATH_BLUE_CONTAINER)
+        no_internet_present = is_element_present(driver, XPATH_NO_INTERNET)
+
+        # Detect Buffering
+        if buffering_present:
+            if buffering_start_time is None:
+                buffering_start_time = datetime.now()
+                log_message = f"\033[93m[{device['deviceName']} BUFFERING]\033[0m Started at {buffering_start_time.strftime('%Y-%m-%d %H:%M:%S')}"
+                event_log.event(log_message)
+        elif buffering_start_time:
+            buffering_end_time = datetime.now()
+            buffering_duration = (buffering_end_time - buffering_start_time).total_seconds()
+            log_message = f"\033[92m[{device['deviceName']} BUFFERING ENDED]\033[0m Ended at {buffering_end_time.strftime('%Y-%m-%d %H:%M:%S')} - Duration: {buffering_duration:.2f} seconds"
+            event_log.event(log_message, log_file,
+                            [device["deviceName"], "Buffering", buffering_start_time.strftime('%Y-%m-%d %H:%M:%S'),
+                             buffering_end_time.strftime('%Y-%m-%d %H:%M:%S'), buffering_duration])
+            buffering_start_time = None
+
+        # Detect Disconnection
+        if error_text_present or blue_container_present or no_internet_present:
+            if disconnect_start_time is None:
+                disconnect_start_time = datetime.now()
+                log_message = f"\033[91m[{device['deviceName']} DISCONNECTED]\033[0m {disconnect_start_time.strftime('%Y-%m-%d %H:%M:%S')}"
+                event_log.event(log_message)
+
+            if is_element_present(driver, XPATH_TRY_AGAIN):
+                success = handle_reconnection(driver, device["deviceName"], stop)
+                if success:
+                    reconnect_time = datetime.now()
+                    duration = (reconnect_time - disconnect_start_time).total_seconds()
+                    log_message = f"\033[92m[{device['deviceName']} RECONNECTED]\033[0m Reconnected after {duration:.2f} seconds."
+                    event_log.event(log_message, log_file,
+                                    [device["deviceName"], "Disconnection", disconnect_start_time.strftime('%Y-%m-%d %H:%M:%S'),
+                                     reconnect_time.strftime('%Y-%m-%d %H:%M:%S'), duration])
+                    disconnect_start_time = None
+
+        # Log Live Stream
+        elif timestamp and live_camera_present and not live_stream_logged:
+            log_message = f"\033[92m[{device['deviceName']} LIVE STREAM]\033[0m Timestamp: {timestamp} - Actively monitoring."
+            event_log.event(log_message)
+            live_stream_logged = True
+
+    sampler.log_stats()
+    print(f"\nMonitoring stopped for {device['deviceName']}. Log saved to {log_file}.")
+
+# Run monitoring for all devices concurrently, restarting any device whose session dies
+def monitor_all_devices(devices):
+    event_log = EventLogSink(COMPREHENSIVE_LOG, DISCONNECT_LOG_HEADERS,
+                             csv_paths=[disconnect_log_path(device) for device in devices],
+                             flush_interval=LOG_FLUSH_INTERVAL)
+    supervisor = DeviceSupervisor()
+    for device in devices:
+        supervisor.add(device["deviceName"], partial(start_session, device), partial(monitor_device, device, event_log))
     try:
-        driver = webdriver.Remote("http://127.0.0.1:4723/wd/hub", options=options)
-        print(f"Appium session started for {device['deviceName']}. Monitoring live stream...")
-
-        with open(log_file, mode="w", newline="") as file, open(comprehensive_log, "a") as report:
-            writer = csv.writer(file)
-            writer.writerow(["Device", "Event", "Start Time", "End Time", "Duration (seconds)"])
-            file.flush()
-
-            while True:
-                timestamp = get_timestamp(driver)
-                live_camera_present = is_element_present(driver, XPATH_LIVE_CAMERA)
-                buffering_present = is_element_present(driver, XPATH_BUFFERING)
-                error_text_present = is_element_present(driver, XPATH_ERROR_TEXT)
-                blue_container_present = is_element_present(driver, XPATH_BLUE_CONTAINER)
-                no_internet_present = is_element_present(driver, XPATH_NO_INTERNET)
-
-                # Detect Buffering
-                if buffering_present:
-                    if buffering_start_time is None:
-                        buffering_start_time = datetime.now()
-                        log_message = f"\033[93m[{device['deviceName']} BUFFERING]\033[0m Started at {buffering_start_time.strftime('%Y-%m-%d %H:%M:%S')}"
-                        print(log_message)
-                        report.write(log_message + "\n")
-                        report.flush()
-                elif buffering_start_time:
-                    buffering_end_time = datetime.now()
-                    buffering_duration = (buffering_end_time - buffering_start_time).total_seconds()
-                    log_message = f"\033[92m[{device['deviceName']} BUFFERING ENDED]\033[0m Ended at {buffering_end_time.strftime('%Y-%m-%d %H:%M:%S')} - Duration: {buffering_duration:.2f} seconds"
-                    print(log_message)
-                    report.write(log_message + "\n")
-                    writer.writerow([device["deviceName"], "Buffering", buffering_start_time.strftime('%Y-%m-%d %H:%M:%S'),
-                                     buffering_end_time.strftime('%Y-%m-%d %H:%M:%S'), buffering_duration])
-                    file.flush()
-                    buffering_start_time = None
-
-                # Detect Disconnection
-                if error_text_present or blue_container_present or no_internet_present:
-                    if disconnect_start_time is None:
-                        disconnect_start_time = datetime.now()
-                        log_message = f"\033[91m[{device['deviceName']} DISCONNECTED]\033[0m {disconnect_start_time.strftime('%Y-%m-%d %H:%M:%S')}"
-                        print(log_message)
-                        report.write(log_message + "\n")
-                        report.flush()
-
-                    if is_element_present(driver, XPATH_TRY_AGAIN):
-                        success = handle_reconnection(driver, device["deviceName"])
-                        if success:
-                            reconnect_time = datetime.now()
-                            duration = (reconnect_time - disconnect_start_time).total_seconds()
-                            log_message = f"\033[92m[{device['deviceName']} RECONNECTED]\033[0m Reconnected after {duration:.2f} seconds."
-                            print(log_message)
-                            report.write(log_message + "\n")
-                            writer.writerow([device["deviceName"], "Disconnection", disconnect_start_time.strftime('%Y-%m-%d %H:%M:%S'),
-                                             reconnect_time.strftime('%Y-%m-%d %H:%M:%S'), duration])
-                            file.flush()
-                            disconnect_start_time = None
-
-                # Log Live Stream
-                elif timestamp and live_camera_present and not live_stream_logged:
-                    log_message = f"\033[92m[{device['deviceName']} LIVE STREAM]\033[0m Timestamp: {timestamp} - Actively monitoring."
-                    print(log_message)
-                    report.write(log_message + "\n")
-                    report.flush()
-                    live_stream_logged = True
-
-                time.sleep(1)
-
-    except KeyboardInterrupt:
-        print(f"\nMonitoring stopped for {device['deviceName']}. Log saved to {log_file}.")
+        supervisor.run()
     finally:
-        driver.quit()
-
-# Run monitoring for all devices concurrently
-def monitor_all_devices(devices):
-    with ThreadPoolExecutor(max_workers=len(devices)) as executor:
-        executor.map(monitor_device, devices)
+        event_log.close()
 
 # Run the script
 monitor_all_devices(devices)
@@ -4,6 +4,13 @@ from appium import webdriver
 from appium.options.android import UiAutomator2Options
 from selenium.webdriver.common.by import By
 from datetime import datetime, timezone, timedelta
+from uia2_profiles import apply_profile, apply_profile_options
+from command_metrics import maybe_instrument
+from fixed_rate import FixedRateSampler
+
+
+# Seconds between UI polls
+POLL_INTERVAL = 0.01
 
 
 # Function to convert timestamp to EST time format
@@ -56,10 +63,14 @@ def run_test(device):
     options.app_activity = device["app_activity"]
     options.no_reset = device["no_reset"]
 
+    apply_profile_options(options, "video_stats")
     driver = webdriver.Remote("http://127.0.0.1:4723/wd/hub", options=options)
+    apply_profile(driver, "video_stats")
+    maybe_instrument(driver)
 
     stats_data = []
     buffering_intervals = []
+    sampler = FixedRateSampler(POLL_INTERVAL, name=device["device_name"])
 
     try:
         print(f"Starting test on {device['device_name']}...")
@@ -78,7 +89,7 @@ def run_test(device):
             stats_log.write(f"Stats Log for {device['device_name']}:\n")
             stats_log.write("-" * 50 + "\n")
 
-            while True:  # Infinite loop
+            for tick in sampler:  # Runs until interrupted
                 try:
                     # Detect buffering
                     buffer_element = driver.find_element(
@@ -122,7 +133,7 @@ def run_test(device):
                 # Capture overall stats (outside buffering)
                 try:
                     stats = {
-                        "timestamp": format_timestamp(time.time()),
+                        "timestamp": format_timestamp(tick),
                         "device_info": clean_text(driver.find_element(By.XPATH, "//android.widget.TextView[@resource-id='com.google.android.youtube:id/device_info']").text),
                         "scpn": clean_text(driver.find_element(By.XPATH, "//android.widget.TextView[@resource-id='com.google.android.youtube:id/scpn']").text),
                         "video_format": clean_text(driver.find_element(By.XPATH, "//android.widget.TextView[@resource-id='com.google.android.youtube:id/video_format']").text),
@@ -138,11 +149,10 @@ def run_test(device):
                 except Exception as e:
                     print(f"Failed to capture stats: {e}")
 
-                time.sleep(0.01)  # Polling interval
-
     except KeyboardInterrupt:
         print("Manual interruption detected. Saving data...")
     finally:
+        print(sampler.summary())
         save_to_txt(device['device_name'], stats_data, buffering_intervals)
         driver.quit()
 
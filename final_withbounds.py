@@ -1,15 +1,45 @@
 import os
 import json
 import time
+import argparse
+import statistics
 import openpyxl
 from datetime import datetime
-from subprocess import check_output, CalledProcessError
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from appium import webdriver
 from appium.options.android import UiAutomator2Options
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from command_metrics import maybe_instrument
+from device_registry import default_registry
+from adb_client import AdbClient, AdbError
+from net_timeline import NetDevTimeline, SUMMARY_HEADERS
+from download_progress import CURVE_HEADERS, MILESTONES, DownloadProgress
+from package_manager import install_and_remove
+from bounds_cache import BoundsCache
+
+# Seconds to wait for a device to (re)appear before giving up on it
+DEVICE_WAIT_TIMEOUT = 60
+
+# adb server client for network counters and package manager calls
+adb = AdbClient()
+
+# Package installed by the Play Store search for "Asphalt 9: Legends"
+APP_PACKAGE = "com.gameloft.android.ANMP.GloftA9HM"
+# Seconds to wait after the download for the package manager to report the install
+INSTALL_TIMEOUT = 120
+
+# Installed app entry on the Play Store page, in the two layouts seen so far
+INSTALLED_APP_XPATHS = [
+    ("installedAppEntry", "//android.view.View[@content-desc='Asphalt Legends Unite Installed ']"),
+    ("installedAppComposeEntry", "//androidx.compose.ui.platform.ComposeView[@resource-id='com.android.vending:id/0_resource_name_obfuscated']/android.view.View/android.view.View[1]/android.view.View[1]/android.view.View[3]"),
+]
+
+# Columns of the combined per-device summary
+SUMMARY_COLUMNS = ["Device", "Timestamp", "Attempts", "Successful", "Mean Speed (Mbps)", "Median Speed (Mbps)",
+                   "Min Speed (Mbps)", "Max Speed (Mbps)", "Error"]
 
 # Load device configurations from JSON file
 def load_device_config():
@@ -19,23 +49,27 @@ def load_device_config():
 
 # Get list of connected devices
 def get_connected_devices():
-    """Get a list of connected devices using ADB."""
-    try:
-        result = check_output("adb devices", shell=True).decode("utf-8")
-        devices = [line.split()[0] for line in result.splitlines() if "device" in line and "List" not in line]
-        return devices
-    except CalledProcessError as e:
-        print(f"Error fetching connected devices: {e}")
-        return []
+    """Get a list of connected devices from the live device registry."""
+    return default_registry().available()
 
 # Ensure the correct device is connected and available
-def ensure_device(device_uid):
-    """Ensure the specified device is connected."""
-    connected_devices = get_connected_devices()
-    if device_uid not in connected_devices:
-        raise Exception(f"Device {device_uid} not found. Connected devices: {connected_devices}")
+def ensure_device(device_uid, timeout=DEVICE_WAIT_TIMEOUT):
+    """Ensure the specified device is connected, waiting up to timeout seconds for it to reconnect."""
+    registry = default_registry()
+    if not registry.is_available(device_uid):
+        print(f"Device {device_uid} is {registry.state(device_uid)}, waiting up to {timeout}s for it...")
+        if not registry.wait_for(device_uid, timeout=timeout):
+            raise Exception(f"Device {device_uid} not found. Connected devices: {registry.available()}")
     print(f"Device {device_uid} is connected and ready.")
 
+# Report USB drop-outs as soon as adb sees them instead of at the next failing WebDriver call
+def report_device_changes(serial, old_state, new_state):
+    """Print device state changes for the devices under test."""
+    if old_state == "device":
+        print(f"Device {serial} dropped out ({new_state}).")
+    elif new_state == "device":
+        print(f"Device {serial} is back.")
+
 # Initialize Excel workbook to store results
 def setup_excel(folder_path, device_name):
     """Set up an Excel workbook to store download speed results."""
@@ -46,7 +80,9 @@ def setup_excel(folder_path, device_name):
     workbook = openpyxl.Workbook()
     sheet = workbook.active
     sheet.title = "Download Speeds"
-    sheet.append(["Attempt", "Timestamp", "Download Speed (Mbps)", "Total Time (min:sec)"])
+    sheet.append(["Attempt", "Timestamp", "Download Speed (Mbps)", "Total Time (min:sec)", "Package Size (MB)",
+                  "Size Source"] + [f"Time to {mark}% (s)" for mark in MILESTONES])
+    workbook.create_sheet("Progress Curve").append(CURVE_HEADERS)
     return excel_file_path, workbook, sheet
 
 # Retry function with logging
@@ -72,18 +108,24 @@ def click_search_tab(driver):
             pass
     raise Exception("Failed to click the search tab.")
 
+# Read the device's /proc/net/dev counters into a timeline
+def sample_net_counters(device_uid, timeline):
+    """Add one /proc/net/dev sample from the device to the timeline."""
+    try:
+        timeline.add(adb.run(device_uid, "cat /proc/net/dev"))
+    except (AdbError, OSError) as e:
+        print(f"Could not read network counters on {device_uid}: {e}")
+
 # Monitor the download progress
-def monitor_download_progress(driver):
-    """Monitor the download progress and print updates in real-time."""
-    last_progress = None
+def monitor_download_progress(driver, progress):
+    """Monitor the download progress, recording the (time, percent) curve and printing updates in real-time."""
     while True:
         try:
             progress_tracker = driver.find_element(By.XPATH, "//android.view.View[contains(@content-desc, '%')]")
             progress_text = progress_tracker.get_attribute("content-desc")
-            if progress_text != last_progress:
-                print(f"Current progress: {progress_text}")
-                last_progress = progress_text
-            if "100%" in progress_text:
+            if progress.record(progress_text) is not None:
+                print(f"Current progress: {progress_text} ({progress.elapsed:.1f}s)")
+            if progress.complete or "100%" in progress_text:
                 print("Download completed!")
                 break
         except NoSuchElementException:
@@ -91,8 +133,8 @@ def monitor_download_progress(driver):
         time.sleep(0.1)
 
 # Search and install the app
-def search_and_install_app(driver):
-    """Search for the specified app in the Google Play Store and initiate installation."""
+def search_and_install_app(driver, device_uid=None):
+    """Search for the specified app in the Google Play Store, install it and return (speed, time, progress)."""
     try:
         print("Clicking on the search tab at the bottom...")
         click_search_tab(driver)
@@ -112,77 +154,82 @@ def search_and_install_app(driver):
         install_button = log_and_retry(lambda: WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable((By.XPATH, "(//android.widget.TextView[@content-desc='Install'])[2]"))
         ))
+        counters = NetDevTimeline()
+        if device_uid:
+            sample_net_counters(device_uid, counters)
         install_button.click()
 
         WebDriverWait(driver, 10).until(
             EC.presence_of_element_located((By.XPATH, "//android.view.View[contains(@content-desc, '%')]"))
         )
         print("Download started...")
-        start_time = time.time()
+        progress = DownloadProgress()
 
-        monitor_download_progress(driver)
+        monitor_download_progress(driver, progress)
 
-        end_time = time.time()
-        download_time = end_time - start_time
+        if device_uid:
+            sample_net_counters(device_uid, counters)
+            if len(counters) == 2:
+                progress.received_mb = counters.summary()[0][SUMMARY_HEADERS.index("Rx (MB)")]
+        download_time = progress.elapsed
         total_time = divmod(download_time, 60)
-        print(f"Download time: {int(total_time[0])} min {int(total_time[1])} sec")
-        speed = (3220 * 8) / download_time
-        return speed, f"{int(total_time[0])}:{int(total_time[1]):02d}"
+        size_mb, size_source = progress.package_size()
+        print(f"Download time: {int(total_time[0])} min {int(total_time[1])} sec ({size_mb:.0f} MB from {size_source})")
+        print(f"Milestones: {progress.milestones()}")
+        speed = progress.average_mbps()
+        return speed, f"{int(total_time[0])}:{int(total_time[1]):02d}", progress
 
     except Exception as e:
         print(f"Error during search and install: {e}")
-        return None, None
+        return None, None, None
+
+# Uninstall the app through the package manager
+def uninstall_app_with_pm(device_uid, device_name):
+    """Wait for the install to complete and uninstall with pm; return False if the UI must be used instead."""
+    try:
+        install_seconds = install_and_remove(adb, device_uid, APP_PACKAGE, INSTALL_TIMEOUT)
+    except (AdbError, OSError) as e:
+        print(f"Package manager uninstall failed on {device_name} ({e}), falling back to the UI.")
+        return False
+    print(f"Install completed {install_seconds:.1f}s after the download; uninstalled {APP_PACKAGE} on {device_name}.")
+    return True
 
 # Uninstall the app with dynamic XPath and bounds handling
-def uninstall_app(driver, device_name):
-    """Uninstall the specified app with dynamic XPath and bounds handling."""
+def uninstall_app(driver, device_name, device_uid=None, bounds_cache=None):
+    """Uninstall the specified app via pm, falling back to dynamic XPath and learned bounds handling."""
+    if device_uid and uninstall_app_with_pm(device_uid, device_name):
+        return
     try:
+        bounds_cache = bounds_cache or BoundsCache(driver, "com.android.vending", adb=adb)
         if device_name in ["Galaxy S22 Ultra", "Galaxy A54", "Galaxy S8 Tab", "Galaxy S22"]:
             print("Waiting longer for installation to stabilize...")
             time.sleep(60)
         else:
             time.sleep(30)
 
-        # Define XPaths and bounds for devices
-        xpaths_and_bounds = {
-            "Galaxy S22 Ultra": [
-                ("//android.view.View[@content-desc='Asphalt Legends Unite Installed ']", [271, 1210, 809, 1327]),
-                ("//androidx.compose.ui.platform.ComposeView[@resource-id='com.android.vending:id/0_resource_name_obfuscated']/android.view.View/android.view.View[1]/android.view.View[1]/android.view.View[3]", [271, 865, 801, 994])
-            ],
-            "Galaxy A54": [
-                ("//android.view.View[@content-desc='Asphalt Legends Unite Installed ']", [271, 865, 801, 994]),
-                ("//androidx.compose.ui.platform.ComposeView[@resource-id='com.android.vending:id/0_resource_name_obfuscated']/android.view.View/android.view.View[1]/android.view.View[1]/android.view.View[3]", [271, 865, 801, 994])
-            ],
-            "Galaxy S8 Tab": [
-                ("//android.view.View[@content-desc='Asphalt Legends Unite Installed ']", [213, 758, 1530, 846]),
-                ("//androidx.compose.ui.platform.ComposeView[@resource-id='com.android.vending:id/0_resource_name_obfuscated']/android.view.View/android.view.View[1]/android.view.View[1]/android.view.View[3]", [213, 758, 1530, 846])
-            ],
-            "Galaxy S22": [
-                ("//android.view.View[@content-desc='Asphalt Legends Unite Installed ']", [240, 895, 828, 1019]),
-                ("//androidx.compose.ui.platform.ComposeView[@resource-id='com.android.vending:id/0_resource_name_obfuscated']/android.view.View/android.view.View[1]/android.view.View[1]/android.view.View[3]", [240, 895, 828, 1019])
-            ]
-        }
-
-        device_xpaths_and_bounds = xpaths_and_bounds.get(device_name, [])
-
-        for xpath, bounds in device_xpaths_and_bounds:
-            print(f"Trying XPath: {xpath} for {device_name}")
+        # Tap the installed app entry at its learned bounds (found by XPath only on first use)
+        tapped = None
+        for name, xpath in INSTALLED_APP_XPATHS:
+            print(f"Trying {name} for {device_name}")
             try:
-                element = log_and_retry(lambda: driver.find_element(By.XPATH, xpath), max_retries=2)
-                # Tap on the provided bounds
-                x_center = bounds[0] + (bounds[2] - bounds[0]) // 2
-                y_top = bounds[1] + 10
-                driver.tap([(x_center, y_top)])
-                print(f"Successfully tapped bounds for XPath: {xpath}")
+                bounds_cache.tap(name, (By.XPATH, xpath), y_offset=10)
+                tapped = name
+                print(f"Successfully tapped bounds for {name}")
                 break
             except Exception as e:
                 print(f"Failed for XPath: {xpath}. Error: {e}")
 
         # Click the uninstall button
-        uninstall_button = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.XPATH,
-                "//androidx.compose.ui.platform.ComposeView[@resource-id='com.android.vending:id/0_resource_name_obfuscated']/android.view.View/android.view.View[1]/android.view.View[1]/android.view.View[2]/android.widget.Button"))
-        )
+        try:
+            uninstall_button = WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.XPATH,
+                    "//androidx.compose.ui.platform.ComposeView[@resource-id='com.android.vending:id/0_resource_name_obfuscated']/android.view.View/android.view.View[1]/android.view.View[1]/android.view.View[2]/android.widget.Button"))
+            )
+        except TimeoutException:
+            if tapped:
+                # The learned bounds no longer match the screen; look the entry up again next time
+                bounds_cache.forget(tapped)
+            raise
         uninstall_button.click()
 
         confirm_uninstall_button = WebDriverWait(driver, 10).until(
@@ -194,42 +241,118 @@ def uninstall_app(driver, device_name):
     except Exception as e:
         print(f"Error during uninstall on {device_name}: {e}")
 
-# Main script
-def main():
-    """Main function to execute the testing process."""
-    folder_path = "C:\\GooglePlayDL_speed_results"
-    devices = load_device_config()
-    attempts = int(input("Enter the number of download attempts per device: "))
-
-    for device in devices:
-        ensure_device(device["deviceUID"])
-        print(f"Testing on device: {device['deviceName']} ({device['deviceUID']})")
-        excel_file_path, workbook, sheet = setup_excel(folder_path, device["deviceName"])
-        options = UiAutomator2Options()
-        options.platform_name = device["platformName"]
-        options.device_name = device["deviceName"]
-        options.udid = device["deviceUID"]
-        options.app_package = "com.android.vending"
-        options.app_activity = "com.android.vending.AssetBrowserActivity"
-        options.no_reset = device["noReset"]
-        options.new_command_timeout = 300
-
-        driver = webdriver.Remote("http://localhost:4723/wd/hub", options=options)
+# Run every download attempt on one device
+def run_device(device, attempts, folder_path, start_delay=0):
+    """Run the download attempts on one device, save its workbook and return the successful speeds."""
+    if start_delay:
+        print(f"Starting {device['deviceName']} in {start_delay:g}s...")
+        time.sleep(start_delay)
+    ensure_device(device["deviceUID"])
+    print(f"Testing on device: {device['deviceName']} ({device['deviceUID']})")
+    excel_file_path, workbook, sheet = setup_excel(folder_path, device["deviceName"])
+    options = UiAutomator2Options()
+    options.platform_name = device["platformName"]
+    options.device_name = device["deviceName"]
+    options.udid = device["deviceUID"]
+    options.app_package = "com.android.vending"
+    options.app_activity = "com.android.vending.AssetBrowserActivity"
+    options.no_reset = device["noReset"]
+    options.new_command_timeout = 300
+
+    driver = webdriver.Remote("http://localhost:4723/wd/hub", options=options)
+    maybe_instrument(driver)
+    bounds_cache = BoundsCache(driver, "com.android.vending", adb=adb)
 
+    speeds = []
+    try:
         for i in range(attempts):
+            try:
+                ensure_device(device["deviceUID"])
+            except Exception as e:
+                print(f"Skipping remaining attempts on {device['deviceName']}: {e}")
+                break
             print(f"Starting attempt {i + 1} on {device['deviceName']}...")
-            speed, total_time = search_and_install_app(driver)
+            speed, total_time, progress = search_and_install_app(driver, device["deviceUID"])
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             if speed:
                 print(f"Attempt {i + 1} on {device['deviceUID']}: {speed:.2f} Mbps")
-                sheet.append([i + 1, timestamp, speed, total_time])
-                uninstall_app(driver, device["deviceName"])
+                speeds.append(speed)
+                size_mb, size_source = progress.package_size()
+                sheet.append([i + 1, timestamp, speed, total_time, round(size_mb, 1), size_source]
+                             + list(progress.milestones().values()))
+                for row in progress.curve():
+                    workbook["Progress Curve"].append([i + 1, *row])
+                uninstall_app(driver, device["deviceName"], device["deviceUID"], bounds_cache)
             else:
                 print(f"Attempt {i + 1} on {device['deviceUID']} failed.")
-
+    finally:
         driver.quit()
         workbook.save(excel_file_path)
         print(f"Results saved to {excel_file_path}")
+    return speeds
+
+# Write the per-device summary of a campaign
+def save_summary(folder_path, attempts, outcomes):
+    """Save and print one summary row per device; outcomes maps device name to speeds or an error."""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Summary"
+    sheet.append(SUMMARY_COLUMNS)
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for device_name, outcome in outcomes.items():
+        if isinstance(outcome, Exception):
+            row = [device_name, timestamp, attempts, 0, None, None, None, None, str(outcome)]
+        else:
+            row = [device_name, timestamp, attempts, len(outcome),
+                   round(statistics.mean(outcome), 2) if outcome else None,
+                   round(statistics.median(outcome), 2) if outcome else None,
+                   round(min(outcome), 2) if outcome else None,
+                   round(max(outcome), 2) if outcome else None, ""]
+        sheet.append(row)
+        print(" | ".join("" if value is None else str(value) for value in row))
+    os.makedirs(folder_path, exist_ok=True)
+    summary_path = os.path.join(folder_path, "combined_summary.xlsx")
+    workbook.save(summary_path)
+    print(f"Combined summary saved to {summary_path}")
+
+# Main script
+def main():
+    """Main function to execute the testing process."""
+    parser = argparse.ArgumentParser(description="Google Play Store download speed test.")
+    parser.add_argument("--attempts", type=int, help="Download attempts per device (prompted for if omitted)")
+    parser.add_argument("--parallel", action="store_true", help="Run all devices at the same time")
+    parser.add_argument("--stagger", type=float, default=0, help="Seconds between device starts in parallel mode")
+    parser.add_argument("--results-dir", default="C:\\GooglePlayDL_speed_results", help="Where result files go")
+    args = parser.parse_args()
+
+    folder_path = args.results_dir
+    devices = load_device_config()
+    attempts = args.attempts or int(input("Enter the number of download attempts per device: "))
+    default_registry().on_change(report_device_changes)
+
+    outcomes = {}
+    try:
+        if args.parallel:
+            with ThreadPoolExecutor(max_workers=len(devices)) as executor:
+                futures = {executor.submit(run_device, device, attempts, folder_path, i * args.stagger):
+                           device["deviceName"] for i, device in enumerate(devices)}
+                for future in as_completed(futures):
+                    try:
+                        outcomes[futures[future]] = future.result()
+                    except Exception as e:
+                        print(f"Device {futures[future]} failed: {e}")
+                        outcomes[futures[future]] = e
+        else:
+            for device in devices:
+                try:
+                    outcomes[device["deviceName"]] = run_device(device, attempts, folder_path)
+                except Exception as e:
+                    print(f"Device {device['deviceName']} failed: {e}")
+                    outcomes[device["deviceName"]] = e
+    finally:
+        adb.close()
+    save_summary(folder_path, attempts, {device["deviceName"]: outcomes[device["deviceName"]]
+                                         for device in devices if device["deviceName"] in outcomes})
 
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
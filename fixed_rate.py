@@ -0,0 +1,121 @@
+import logging
+import math
+import time
+
+# What to do with ticks missed while the previous iteration overran
+SKIP = "skip"          # drop them and wait for the next slot on the grid
+COALESCE = "coalesce"  # run once immediately for all of them, then resume on the grid
+
+STATS_HEADERS = ["Loop", "Interval (s)", "Ticks", "Skipped", "Coalesced", "Target (Hz)", "Achieved (Hz)",
+                 "Jitter Mean (ms)", "Jitter Std (ms)", "Jitter Max (ms)"]
+
+
+class FixedRateSampler:
+    """Deadline-based fixed-rate loop: tick n is due at start + n * interval.
+
+    Iterating yields the scheduled wall-clock time of each tick, so samples stamped with it
+    are evenly spaced regardless of how long the loop body takes. Deadlines come from the
+    start time rather than from the end of the previous iteration, so the period does not
+    drift. An iteration that overruns by a whole interval or more misses ticks, which are
+    skipped or coalesced according to on_overrun. Iteration ends when stop (a
+    threading.Event) is set; lateness against each deadline is recorded as jitter.
+    """
+
+    def __init__(self, interval, stop=None, name="loop", on_overrun=SKIP):
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if on_overrun not in (SKIP, COALESCE):
+            raise ValueError(f"on_overrun must be {SKIP!r} or {COALESCE!r}")
+        self.interval = interval
+        self.stop = stop
+        self.name = name
+        self.on_overrun = on_overrun
+        self.ticks = 0
+        self.skipped = 0
+        self.coalesced = 0
+        self._first_tick = None
+        self._last_tick = None
+        self._lateness_sum = 0.0
+        self._lateness_squares = 0.0
+        self._lateness_max = 0.0
+
+    def _stopped(self):
+        return self.stop is not None and self.stop.is_set()
+
+    def _wait(self, seconds):
+        if self.stop is not None:
+            self.stop.wait(seconds)
+        else:
+            time.sleep(seconds)
+
+    def __iter__(self):
+        start = time.monotonic()
+        wall_start = time.time()
+        slot = 0
+        while not self._stopped():
+            deadline = start + slot * self.interval
+            now = time.monotonic()
+            if now < deadline:
+                self._wait(deadline - now)
+                if self._stopped():
+                    return
+                now = time.monotonic()
+            else:
+                missed = math.floor((now - deadline) / self.interval)
+                if missed and self.on_overrun == SKIP:
+                    self.skipped += missed + 1
+                    slot += missed + 1
+                    continue
+                self.coalesced += missed
+                slot += missed
+            self._record(now, now - (start + slot * self.interval))
+            yield wall_start + slot * self.interval
+            slot += 1
+
+    def _record(self, now, lateness):
+        self.ticks += 1
+        self._first_tick = self._first_tick if self._first_tick is not None else now
+        self._last_tick = now
+        self._lateness_sum += lateness
+        self._lateness_squares += lateness * lateness
+        self._lateness_max = max(self._lateness_max, lateness)
+
+    def run(self, callback):
+        """Calls callback(tick_time) once per tick until stop is set or it returns False."""
+        for tick_time in self:
+            if callback(tick_time) is False:
+                break
+        return self.stats()
+
+    def stats(self):
+        """Returns the achieved rate and jitter (lateness against each deadline) so far."""
+        achieved = None
+        if self.ticks > 1 and self._last_tick > self._first_tick:
+            achieved = (self.ticks - 1) / (self._last_tick - self._first_tick)
+        mean = self._lateness_sum / self.ticks if self.ticks else 0.0
+        variance = max(0.0, self._lateness_squares / self.ticks - mean * mean) if self.ticks else 0.0
+        return {
+            "loop": self.name,
+            "interval": self.interval,
+            "ticks": self.ticks,
+            "skipped": self.skipped,
+            "coalesced": self.coalesced,
+            "target_hz": round(1 / self.interval, 3),
+            "achieved_hz": round(achieved, 3) if achieved is not None else None,
+            "jitter_mean_ms": round(mean * 1000, 2),
+            "jitter_std_ms": round(math.sqrt(variance) * 1000, 2),
+            "jitter_max_ms": round(self._lateness_max * 1000, 2),
+        }
+
+    def row(self):
+        """Returns the stats as one row of STATS_HEADERS."""
+        return list(self.stats().values())
+
+    def summary(self):
+        stats = self.stats()
+        return (f"[{self.name}] {stats['ticks']} ticks at {stats['achieved_hz']} Hz (target {stats['target_hz']} Hz), "
+                f"{stats['skipped']} skipped, {stats['coalesced']} coalesced, jitter mean {stats['jitter_mean_ms']} ms, "
+                f"std {stats['jitter_std_ms']} ms, max {stats['jitter_max_ms']} ms")
+
+    def log_stats(self):
+        logging.info(self.summary())
@@ -0,0 +1,225 @@
+import argparse
+import json
+import logging
+import os
+import re
+import statistics
+import time
+from appium.webdriver.common.appiumby import AppiumBy
+from appium_session import APPIUM_SERVER_URL, create_driver, find_device, load_devices
+
+# Registry files loaded by default, later files override earlier ones
+DEFAULT_LOCATOR_FILES = ["xpath.json", "locators.json"]
+
+# Map of the "locatorType" values used in the JSON files to Appium strategies
+LOCATOR_TYPES = {
+    "id": AppiumBy.ID,
+    "accessibility id": AppiumBy.ACCESSIBILITY_ID,
+    "xpath": AppiumBy.XPATH,
+    "uiautomator": AppiumBy.ANDROID_UIAUTOMATOR,
+    "-android uiautomator": AppiumBy.ANDROID_UIAUTOMATOR,
+    "class name": AppiumBy.CLASS_NAME,
+}
+
+# A "simple" XPath: a single descendant step with one predicate and no nesting
+SIMPLE_XPATH = re.compile(r"^//(?P<cls>\*|[\w.]+)\[(?P<predicate>[^\[\]]+)\]$")
+EQUALS_TERM = re.compile(r"^@(?P<attr>[\w-]+)\s*=\s*(?P<q>['\"])(?P<value>.*?)(?P=q)$")
+CONTAINS_TERM = re.compile(r"^contains\(\s*@(?P<attr>[\w-]+)\s*,\s*(?P<q>['\"])(?P<value>.*?)(?P=q)\s*\)$")
+
+# UiSelector methods for each supported attribute, as (exact, contains)
+UISELECTOR_METHODS = {
+    "resource-id": ("resourceId", None),
+    "text": ("text", "textContains"),
+    "content-desc": ("description", "descriptionContains"),
+}
+
+
+def _quote(value):
+    """Quotes a value for use inside a UiSelector expression."""
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def rewrite_xpath(xpath):
+    """Rewrites a simple XPath to an ID, accessibility id or UiSelector locator, or returns None."""
+    match = SIMPLE_XPATH.match(xpath.strip())
+    if not match:
+        return None
+
+    terms = []
+    for term in re.split(r"\s+and\s+", match.group("predicate").strip()):
+        term_match = EQUALS_TERM.match(term) or CONTAINS_TERM.match(term)
+        if not term_match or term_match.group("attr") not in UISELECTOR_METHODS:
+            return None
+        exact, contains = UISELECTOR_METHODS[term_match.group("attr")]
+        method = exact if term_match.re is EQUALS_TERM else contains
+        if method is None:
+            return None
+        terms.append((term_match.group("attr"), method, term_match.group("value")))
+
+    cls = match.group("cls")
+    if cls == "*" and len(terms) == 1:
+        attr, method, value = terms[0]
+        if method == "resourceId":
+            return AppiumBy.ID, value
+        if method == "description":
+            return AppiumBy.ACCESSIBILITY_ID, value
+
+    selector = "new UiSelector()"
+    if cls != "*":
+        selector += f".className({_quote(cls)})"
+    for attr, method, value in terms:
+        selector += f".{method}({_quote(value)})"
+    return AppiumBy.ANDROID_UIAUTOMATOR, selector
+
+
+class LocatorRegistry:
+    """Logical element names mapped to Appium locators, shared across scripts."""
+
+    def __init__(self, locators=None, rewrite=True):
+        self.rewrite = rewrite
+        self._original = {}
+        self._native = {}
+        for name, entry in (locators or {}).items():
+            self.add(name, entry["locatorType"], entry["value"])
+
+    @classmethod
+    def load(cls, *paths, rewrite=True):
+        """Loads one or more registry JSON files (xpath.json format)."""
+        locators = {}
+        for path in paths or DEFAULT_LOCATOR_FILES:
+            if not os.path.exists(path):
+                logging.warning(f"Locator file {path} not found, skipping.")
+                continue
+            with open(path) as locator_file:
+                locators.update(json.load(locator_file))
+        return cls(locators, rewrite=rewrite)
+
+    def add(self, name, locator_type, value):
+        """Registers a locator under a logical name."""
+        if locator_type not in LOCATOR_TYPES:
+            raise ValueError(f"Unknown locatorType '{locator_type}' for {name}")
+        by = LOCATOR_TYPES[locator_type]
+        self._original[name] = (by, value)
+        self._native[name] = rewrite_xpath(value) if by == AppiumBy.XPATH else None
+
+    def names(self):
+        """Returns the registered logical names."""
+        return list(self._original)
+
+    def original(self, name):
+        """Returns the locator exactly as it was registered."""
+        return self._original[name]
+
+    def native(self, name):
+        """Returns the rewritten native locator, or None if the XPath could not be rewritten."""
+        return self._native[name]
+
+    def get(self, name):
+        """Returns the (by, value) tuple to use for a logical name."""
+        if self.rewrite and self._native.get(name):
+            return self._native[name]
+        return self._original[name]
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    def __contains__(self, name):
+        return name in self._original
+
+    def find(self, driver, name):
+        """Finds a single element by logical name."""
+        return driver.find_element(*self.get(name))
+
+    def find_all(self, driver, name):
+        """Finds all elements matching a logical name."""
+        return driver.find_elements(*self.get(name))
+
+
+# Shared registry for scripts that only need the default files
+_default_registry = None
+
+
+def default_registry():
+    """Returns the registry loaded from DEFAULT_LOCATOR_FILES, loading it once."""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = LocatorRegistry.load()
+    return _default_registry
+
+
+def time_locator(driver, locator, repeat):
+    """Times find_elements for a locator, returning (median ms, matches)."""
+    samples = []
+    matches = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        matches = len(driver.find_elements(*locator))
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), matches
+
+
+def benchmark(driver, registry, names=None, repeat=5):
+    """Times every locator in its original and rewritten form against a session."""
+    results = []
+    for name in names or registry.names():
+        original = registry.original(name)
+        original_ms, original_matches = time_locator(driver, original, repeat)
+        result = {
+            "name": name,
+            "strategy": original[0],
+            "original_ms": round(original_ms, 1),
+            "original_matches": original_matches,
+            "native_strategy": None,
+            "native_ms": None,
+            "native_matches": None,
+        }
+        native = registry.native(name)
+        if native:
+            native_ms, native_matches = time_locator(driver, native, repeat)
+            result.update(native_strategy=native[0], native_ms=round(native_ms, 1), native_matches=native_matches)
+            if native_matches != original_matches:
+                logging.warning(f"{name}: rewritten locator matched {native_matches} elements, original matched {original_matches}.")
+        results.append(result)
+    return sorted(results, key=lambda r: r["original_ms"], reverse=True)
+
+
+def print_benchmark(results):
+    """Prints benchmark results, slowest locators first."""
+    print(f"{'Locator':<32}{'Strategy':<22}{'Original ms':>12}{'Native ms':>12}  Matches")
+    for r in results:
+        native_ms = f"{r['native_ms']:.1f}" if r["native_ms"] is not None else "-"
+        print(f"{r['name']:<32}{r['strategy']:<22}{r['original_ms']:>12.1f}{native_ms:>12}  {r['original_matches']}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Time every registered locator against a live or recorded session.")
+    parser.add_argument("--locators", nargs="+", default=DEFAULT_LOCATOR_FILES, help="Registry JSON files")
+    parser.add_argument("--config", default="device_configs.json", help="Device config JSON file")
+    parser.add_argument("--device", help="deviceName to benchmark (default: first device)")
+    parser.add_argument("--server", default=APPIUM_SERVER_URL, help="Appium (or recorded session) server URL")
+    parser.add_argument("--names", nargs="*", help="Only benchmark these logical names")
+    parser.add_argument("--repeat", type=int, default=5, help="Lookups per locator")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    registry = LocatorRegistry.load(*args.locators)
+    device = find_device(load_devices(args.config), args.device)
+    if device is None:
+        parser.error(f"Device {args.device} not found in {args.config}")
+
+    driver = create_driver(device, args.server)
+    try:
+        results = benchmark(driver, registry, args.names, args.repeat)
+    finally:
+        driver.quit()
+
+    print_benchmark(results)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+        logging.info(f"Benchmark results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import argparse
+import logging
+import re
+import threading
+from datetime import datetime
+from adb_client import AdbClient, AdbError
+from appium_session import device_name, device_udid, load_devices
+
+# Follow new lines only (-T 1), with epoch timestamps so events carry the device's own clock
+LOGCAT_COMMAND = "logcat -v epoch -T 1 -b main -b system"
+
+# "  1697712345.123456  1234  5678 I wpa_supplicant: CTRL-EVENT-CONNECTED - ..."
+LOGCAT_LINE = re.compile(r"^\s*(\d+\.\d+)\s+\d+\s+\d+\s+[VDIWEF]\s+([^:]*?)\s*: (.*)$")
+
+# (tag, message pattern, event) rules for Wi-Fi link changes across Android versions
+WIFI_RULES = [
+    ("wpa_supplicant", r"CTRL-EVENT-DISCONNECTED(?: bssid=(?P<bssid>\S+))?(?: reason=(?P<reason>\d+))?", "disconnected"),
+    ("wpa_supplicant", r"CTRL-EVENT-CONNECTED - Connection to (?P<bssid>\S+) completed", "associated"),
+    ("WifiStateMachine", r"enter.*\bDisconnectedState\b|\bDisconnectedState\b.*enter", "disconnected"),
+    ("WifiClientModeImpl", r"enter.*\bDisconnectedState\b|\bDisconnectedState\b.*enter", "disconnected"),
+    ("ConnectivityService", r"NetworkAgentInfo ?\[WIFI[^\]]*\].*CONNECTED to DISCONNECTED", "disconnected"),
+    ("ConnectivityService", r"NetworkAgentInfo ?\[WIFI[^\]]*\].*validation passed", "validated"),
+    ("ConnectivityService", r"NetworkAgentInfo ?\[WIFI[^\]]*\].*(?:validation failed|lost internet)", "unvalidated"),
+]
+
+
+class LogcatDispatcher:
+    """Routes logcat lines to handlers by tag, then by compiled message regex."""
+
+    def __init__(self):
+        self._rules = {}
+
+    def on(self, tag, pattern, handler):
+        """Calls handler(timestamp, match) for lines from tag whose message matches pattern."""
+        self._rules.setdefault(tag, []).append((re.compile(pattern), handler))
+
+    def dispatch(self, line):
+        """Parses one logcat line and runs the first matching rule; returns True if one matched."""
+        parsed = LOGCAT_LINE.match(line)
+        if not parsed:
+            return False
+        rules = self._rules.get(parsed.group(2))
+        if not rules:
+            return False
+        message = parsed.group(3)
+        for pattern, handler in rules:
+            match = pattern.search(message)
+            if match:
+                handler(float(parsed.group(1)), match)
+                return True
+        return False
+
+
+class WifiLinkState:
+    """Per-device Wi-Fi state machine turning logcat events into disconnect/reconnect events.
+
+    on_event(event, timestamp, details) receives "Disconnected", "Reconnected" (with the
+    outage duration) and "Validated" events, timestamped with the logcat time.
+    """
+
+    def __init__(self, on_event):
+        self.on_event = on_event
+        self.state = "unknown"
+        self.disconnected_since = None
+        self.reconnected_at = None
+
+    def handle(self, event, timestamp, match=None):
+        details = {key: value for key, value in (match.groupdict() if match else {}).items() if value}
+        if event == "disconnected":
+            if self.state != "disconnected":
+                self.state = "disconnected"
+                self.disconnected_since = timestamp
+                self.on_event("Disconnected", timestamp, details)
+            return
+        if event not in ("associated", "validated"):
+            return
+        # Devices that don't log wpa_supplicant events only show the reconnect at validation
+        if self.state == "disconnected":
+            self.reconnected_at = timestamp
+            self.on_event("Reconnected", timestamp, dict(details, duration=round(timestamp - self.disconnected_since, 3)))
+        self.state = "connected"
+        self.disconnected_since = None
+        if event == "validated" and self.reconnected_at is not None:
+            self.on_event("Validated", timestamp, dict(details, after_reconnect=round(timestamp - self.reconnected_at, 3)))
+            self.reconnected_at = None
+
+
+class LogcatReader:
+    """Streams logcat from one device over the adb server on a background thread."""
+
+    def __init__(self, serial, dispatcher, client=None, command=LOGCAT_COMMAND):
+        self.serial = serial
+        self.dispatcher = dispatcher
+        self.client = client or AdbClient()
+        self.command = command
+        self.lines = 0
+        self.error = None
+        self._sock = None
+        self._stopped = False
+        self._thread = threading.Thread(target=self._read, name=f"logcat-{serial}", daemon=True)
+
+    def start(self):
+        self._sock = self.client.open_service(self.serial, f"shell:{self.command}")
+        self._sock.settimeout(None)
+        self._thread.start()
+        return self
+
+    def _read(self):
+        try:
+            with self._sock.makefile("rb") as stream:
+                for raw_line in stream:
+                    self.lines += 1
+                    self.dispatcher.dispatch(raw_line.decode(errors="replace"))
+            self.error = "logcat stream ended"
+        except (AdbError, OSError, ValueError) as e:
+            self.error = str(e)
+        if not self._stopped:
+            logging.warning(f"[{self.serial}] logcat reader stopped: {self.error}")
+
+    @property
+    def alive(self):
+        return self._thread.is_alive()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def stop(self):
+        self._stopped = True
+        if self._sock is not None:
+            self._sock.close()
+
+
+def wifi_dispatcher(link_state):
+    """Returns a dispatcher feeding WIFI_RULES into a WifiLinkState."""
+    dispatcher = LogcatDispatcher()
+    for tag, pattern, event in WIFI_RULES:
+        dispatcher.on(tag, pattern, lambda timestamp, match, event=event: link_state.handle(event, timestamp, match))
+    return dispatcher
+
+
+def watch_wifi(serial, on_event, client=None):
+    """Starts streaming Wi-Fi events for serial; returns (reader, link_state)."""
+    link_state = WifiLinkState(on_event)
+    reader = LogcatReader(serial, wifi_dispatcher(link_state), client).start()
+    return reader, link_state
+
+
+def format_timestamp(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Print Wi-Fi disconnect/reconnect events from logcat.")
+    parser.add_argument("--config", default="device_configs.json", help="Device config JSON file")
+    args = parser.parse_args()
+
+    readers = []
+    for device in load_devices(args.config):
+        name = device_name(device)
+        on_event = lambda event, timestamp, details, name=name: print(
+            f"{format_timestamp(timestamp)} [{name}] {event} {details}")
+        readers.append(watch_wifi(device_udid(device), on_event)[0])
+    try:
+        for reader in readers:
+            reader.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for reader in readers:
+            reader.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import time
+import warnings
+import numpy as np
+
+# 32-bit counters (older kernels / some vendor drivers) wrap here
+COUNTER_WRAP = 2 ** 32
+# Fastest link a counter can plausibly advance at (bits/s); larger "wraps" are counter resets
+MAX_LINK_RATE = 5e9
+
+TIME_SERIES_HEADERS = ["Elapsed (s)", "State", "Rx (Mbps)", "Tx (Mbps)"]
+SUMMARY_HEADERS = ["Phase", "Intervals", "Duration (s)", "Avg Rx (Mbps)", "Peak Rx (Mbps)",
+                   "Avg Tx (Mbps)", "Peak Tx (Mbps)", "Rx (MB)", "Tx (MB)"]
+
+
+def parse_proc_net_dev(text):
+    """Parses /proc/net/dev into {interface: (rx_bytes, tx_bytes)}."""
+    counters = {}
+    for line in text.splitlines():
+        interface, separator, fields = line.partition(":")
+        if not separator or "|" in line:
+            continue
+        values = fields.split()
+        if len(values) >= 9:
+            counters[interface.strip()] = (int(values[0]), int(values[8]))
+    return counters
+
+
+def counter_deltas(counter, intervals=None):
+    """Byte deltas between consecutive counter samples, correcting 32-bit wrap and counter resets.
+
+    A drop is a wrap only if it starts in the upper half of the 32-bit range, lands more
+    than half the range lower and, given the sample intervals (seconds), implies no more
+    than MAX_LINK_RATE; any other drop means the interface was reset and counted again
+    from zero. Gaps (NaN samples) stay NaN.
+    """
+    counter = np.asarray(counter, dtype=np.float64)
+    previous, current = counter[:-1], counter[1:]
+    delta = np.diff(counter)
+    with np.errstate(invalid="ignore"):
+        wrapped = ((delta < 0) & (previous >= COUNTER_WRAP / 2) & (previous < COUNTER_WRAP)
+                   & (current < previous - COUNTER_WRAP / 2))
+        if intervals is not None:
+            wrapped &= delta + COUNTER_WRAP <= np.asarray(intervals, dtype=np.float64) * MAX_LINK_RATE / 8
+        delta = np.where(wrapped, delta + COUNTER_WRAP, delta)
+        return np.where(delta < 0, current, delta)
+
+
+class NetDevTimeline:
+    """Per-interface rx/tx counters parsed from a series of /proc/net/dev samples."""
+
+    def __init__(self):
+        self.timestamps = []
+        self.states = []
+        self.counters = {}
+
+    def add(self, text, timestamp=None, state="playing"):
+        """Parses one /proc/net/dev sample taken at timestamp (default: now) while in state."""
+        sample = parse_proc_net_dev(text)
+        index = len(self.timestamps)
+        self.timestamps.append(time.time() if timestamp is None else timestamp)
+        self.states.append(state)
+        for interface in sample.keys() - self.counters.keys():
+            self.counters[interface] = [(np.nan, np.nan)] * index
+        for interface, values in self.counters.items():
+            values.append(sample.get(interface, (np.nan, np.nan)))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def busiest_interface(self):
+        """Returns the non-loopback interface that received the most bytes."""
+        intervals = np.diff(np.asarray(self.timestamps, dtype=np.float64))
+        received = {interface: np.nansum(counter_deltas(np.asarray(values)[:, 0], intervals))
+                    for interface, values in self.counters.items() if interface != "lo"}
+        return max(received, key=received.get) if received else None
+
+    def throughput(self, interface=None):
+        """Returns (elapsed s, interval s, state, rx bytes, tx bytes, rx Mbps, tx Mbps) arrays per interval."""
+        interface = interface or self.busiest_interface()
+        timestamps = np.asarray(self.timestamps, dtype=np.float64)
+        values = np.asarray(self.counters.get(interface, [(np.nan, np.nan)] * len(timestamps)), dtype=np.float64)
+        if len(timestamps) < 2:
+            empty = np.empty(0)
+            return empty, empty, np.empty(0, dtype=object), empty, empty, empty, empty
+        interval = np.diff(timestamps)
+        rx_bytes = counter_deltas(values[:, 0], interval)
+        tx_bytes = counter_deltas(values[:, 1], interval)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rx_mbps = np.where(interval > 0, rx_bytes * 8 / interval / 1e6, np.nan)
+            tx_mbps = np.where(interval > 0, tx_bytes * 8 / interval / 1e6, np.nan)
+        # Each interval takes the state observed at its closing sample
+        states = np.asarray(self.states[1:], dtype=object)
+        return timestamps[1:] - timestamps[0], interval, states, rx_bytes, tx_bytes, rx_mbps, tx_mbps
+
+    def time_series(self, interface=None, digits=3):
+        """Returns compact [elapsed, state, rx Mbps, tx Mbps] rows (see TIME_SERIES_HEADERS)."""
+        elapsed, _, states, _, _, rx_mbps, tx_mbps = self.throughput(interface)
+        return [[round(float(e), 2), state, _round(rx, digits), _round(tx, digits)]
+                for e, state, rx, tx in zip(elapsed, states, rx_mbps, tx_mbps)]
+
+    def summary(self, interface=None):
+        """Returns avg/peak Mbps and volume overall and per state (see SUMMARY_HEADERS)."""
+        _, interval, states, rx_bytes, tx_bytes, rx_mbps, tx_mbps = self.throughput(interface)
+        rows = []
+        for phase in ["all"] + sorted(set(states)):
+            mask = np.ones(len(states), dtype=bool) if phase == "all" else states == phase
+            valid = mask & ~np.isnan(rx_bytes) & (interval > 0)
+            duration = interval[valid].sum()
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)  # All-NaN phases
+                rows.append([
+                    phase, int(mask.sum()), round(float(duration), 2),
+                    _round(rx_bytes[valid].sum() * 8 / duration / 1e6 if duration else np.nan),
+                    _round(np.nanmax(rx_mbps[mask]) if mask.any() else np.nan),
+                    _round(tx_bytes[valid].sum() * 8 / duration / 1e6 if duration else np.nan),
+                    _round(np.nanmax(tx_mbps[mask]) if mask.any() else np.nan),
+                    _round(rx_bytes[valid].sum() / 1e6),
+                    _round(tx_bytes[valid].sum() / 1e6),
+                ])
+        return rows
+
+
+def _round(value, digits=3):
+    """Rounds a NumPy value for reports, mapping NaN to None."""
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
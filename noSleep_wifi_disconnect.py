@@ -1,13 +1,19 @@
 import json
 import logging
-import time
+import threading
 from datetime import datetime
-import openpyxl
+from functools import partial
 from appium import webdriver
 from appium.webdriver.common.appiumby import AppiumBy
 from appium.options.android import UiAutomator2Options
-from selenium.common.exceptions import NoSuchElementException
-from concurrent.futures import ThreadPoolExecutor
+from element_cache import ElementCache
+from bounds_cache import BoundsCache
+from adb_client import AdbError
+from logcat_events import watch_wifi
+from device_supervisor import DeviceSupervisor
+from fixed_rate import FixedRateSampler
+from command_metrics import maybe_instrument
+from result_sinks import CsvSink
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -24,11 +30,17 @@ XPATH_DISCONNECTED_NETWORK = "//android.widget.TextView[@resource-id='com.androi
 XPATH_DISCONNECTED_STATS = "//android.widget.TextView[@resource-id='com.android.settings:id/summary' and contains(@text,'Auto reconnect turned off')]"
 XPATH_WIFI_TITLE = "//android.widget.TextView[@resource-id='com.android.settings:id/collapsing_appbar_extended_title']"
 
-# Bounds for Wi-Fi title per device
-DEVICE_BOUNDS = {
-    "default": [0, 383, 1080, 514],
-    "Galaxy S8 Tab": [854, 122, 960, 184]
-}
+# Detect disconnects from a streaming logcat reader (logcat timestamps, nothing missed between
+# polls); the Settings screen is only polled if logcat cannot be read
+logcat_mode = True
+
+# Cached element handles are refreshed at least this often (seconds)
+ELEMENT_CACHE_MAX_AGE = 60
+# Seconds between Settings screen checks when polling
+WIFI_POLL_INTERVAL = 3
+
+# Wi-Fi title bounds tapped when the title cannot be found to learn its real bounds
+FALLBACK_WIFI_TITLE_BOUNDS = [0, 383, 1080, 514]
 
 def initialize_driver(config):
     """Initializes Appium driver."""
@@ -39,110 +51,158 @@ def initialize_driver(config):
     options.automation_name = 'UiAutomator2'
     options.no_reset = True
 
-    return webdriver.Remote("http://localhost:4723/wd/hub", options=options)
-
-def prepare_excel_file(device_name):
-    """Prepares an Excel file for logging."""
-    file_path = f"{device_name}_wifi_log.xlsx"
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = "Wi-Fi Events"
-    sheet.append(["Timestamp", "Event", "Details"])
-    workbook.save(file_path)
-    return file_path
-
-def log_event_to_excel(file_path, event, details):
-    """Logs an event to the Excel file."""
-    workbook = openpyxl.load_workbook(file_path)
-    sheet = workbook.active
-    sheet.append([datetime.now().strftime("%Y-%m-%d %H:%M:%S"), event, details])
-    workbook.save(file_path)
-
-def keep_device_awake(driver, device_name):
-    """Periodically taps the Wi-Fi title to keep the device awake."""
-    bounds = DEVICE_BOUNDS.get(device_name, DEVICE_BOUNDS["default"])
-    x = (bounds[0] + bounds[2]) // 2
-    y = (bounds[1] + bounds[3]) // 2
-
-    while True:
-        try:
-            logging.info(f"[{device_name}] Tapping on Wi-Fi title to keep the device awake.")
-            driver.tap([(x, y)])  # Tap on the center of the Wi-Fi title
-            time.sleep(300)  # Wait for 5 minutes before the next tap
-        except Exception as e:
-            logging.error(f"Error while keeping device awake for {device_name}: {e}")
-            break
-
-def check_wifi_status(driver, device_config):
-    """Continuously checks the Wi-Fi connection status."""
+    driver = webdriver.Remote("http://localhost:4723/wd/hub", options=options)
+    maybe_instrument(driver)
+    return driver
+
+def prepare_event_log(device_name):
+    """Opens a buffered CSV event log; the Excel file is exported when monitoring stops."""
+    return CsvSink(f"{device_name}_wifi_log.csv", ["Timestamp", "Event", "Details"], truncate=True)
+
+def log_event(sink, event, details, timestamp=None):
+    """Queues an event for the background writer; logcat events carry their own millisecond timestamp."""
+    if timestamp:
+        when = timestamp.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    else:
+        when = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    sink.write([when, event, details])
+
+def start_wifi_logcat(device_config, event_log):
+    """Starts streaming Wi-Fi events from logcat into the event log; returns (reader, link_state) or (None, None)."""
+    device_name = device_config['deviceName']
+
+    def on_event(event, timestamp, details):
+        event_time = datetime.fromtimestamp(timestamp)
+        if event == "Disconnected":
+            logging.warning(f"[{device_name}] Wi-Fi Disconnected at {event_time.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]} {details}.")
+            log_event(event_log, "Disconnected", f"Wi-Fi disconnected {details}".strip(), event_time)
+        elif event == "Reconnected":
+            logging.info(f"[{device_name}] Reconnected after {details['duration']:.2f} seconds.")
+            log_event(event_log, "Reconnected", f"Duration: {details['duration']:.2f} seconds", event_time)
+        elif event == "Validated":
+            logging.info(f"[{device_name}] Internet validated {details['after_reconnect']:.2f} seconds after reconnecting.")
+            log_event(event_log, "Validated", f"{details['after_reconnect']:.2f} seconds after reconnect", event_time)
+
+    try:
+        reader, link_state = watch_wifi(device_config['deviceUID'], on_event)
+    except (AdbError, OSError) as e:
+        logging.warning(f"[{device_name}] Cannot stream logcat ({e}), polling the Settings screen instead.")
+        return None, None
+    logging.info(f"[{device_name}] Watching Wi-Fi events in logcat.")
+    return reader, link_state
+
+def wifi_title_bounds(bounds_cache, device_name):
+    """Returns the Wi-Fi title bounds learned for this model and Settings version."""
+    try:
+        return bounds_cache.bounds("wifiTitle", (AppiumBy.XPATH, XPATH_WIFI_TITLE))
+    except Exception as e:
+        logging.warning(f"[{device_name}] Wi-Fi title not found ({e}), using fallback bounds.")
+        return FALLBACK_WIFI_TITLE_BOUNDS
+
+def keep_device_awake(driver, device_name, stop=None):
+    """Periodically taps the Wi-Fi title to keep the device awake until stop is set.
+
+    Errors propagate so the supervisor can restart this helper with backoff.
+    """
+    stop = stop or threading.Event()
+    bounds_cache = BoundsCache(driver, "com.android.settings")
+
+    while not stop.is_set():
+        # A rotation switches to the bounds learned for the new orientation
+        bounds_cache.check_orientation()
+        bounds = wifi_title_bounds(bounds_cache, device_name)
+        x = (bounds[0] + bounds[2]) // 2
+        y = (bounds[1] + bounds[3]) // 2
+        logging.info(f"[{device_name}] Tapping on Wi-Fi title to keep the device awake.")
+        driver.tap([(x, y)])  # Tap on the center of the Wi-Fi title
+        stop.wait(300)  # Wait for 5 minutes before the next tap
+
+def check_wifi_status(driver, device_config, event_log, stop=None):
+    """Checks the Wi-Fi connection status until stop is set."""
     device_name = device_config['deviceName']
-    file_path = prepare_excel_file(device_name)
+    stop = stop or threading.Event()
     disconnect_start_time = None
+    cache = ElementCache(driver, device_name, max_age=ELEMENT_CACHE_MAX_AGE)
+    reader = link_state = None
 
     try:
-        while True:
-            connected_network_present = is_element_present(driver, XPATH_CONNECTED_NETWORK)
-            connected_ssid_present = is_element_present(driver, XPATH_CONNECTED_SSID)
-            connected_stats_present = is_element_present(driver, XPATH_CONNECTED_STATS)
+        if logcat_mode:
+            reader, link_state = start_wifi_logcat(device_config, event_log)
+        if reader:
+            while reader.alive and not stop.is_set():
+                reader.join(1)
+            if not stop.is_set():
+                logging.warning(f"[{device_name}] Lost the logcat stream, polling the Settings screen instead.")
+            if link_state.disconnected_since:
+                disconnect_start_time = datetime.fromtimestamp(link_state.disconnected_since)
+
+        sampler = FixedRateSampler(WIFI_POLL_INTERVAL, stop, name=device_name)
+        for tick in sampler:
+            sample_time = datetime.fromtimestamp(tick)
+            connected_network_present = cache.is_present((AppiumBy.XPATH, XPATH_CONNECTED_NETWORK))
+            connected_ssid_present = cache.is_present((AppiumBy.XPATH, XPATH_CONNECTED_SSID))
+            connected_stats_present = cache.is_present((AppiumBy.XPATH, XPATH_CONNECTED_STATS))
 
             if connected_network_present and connected_ssid_present and connected_stats_present:
                 if disconnect_start_time:
-                    disconnect_duration = (datetime.now() - disconnect_start_time).total_seconds()
+                    disconnect_duration = (sample_time - disconnect_start_time).total_seconds()
                     log_message = f"[{device_name}] Reconnected after {disconnect_duration:.2f} seconds."
                     logging.info(log_message)
-                    log_event_to_excel(file_path, "Reconnected", f"Duration: {disconnect_duration:.2f} seconds")
+                    log_event(event_log, "Reconnected", f"Duration: {disconnect_duration:.2f} seconds")
                     disconnect_start_time = None
 
-                ssid = driver.find_element(AppiumBy.XPATH, XPATH_CONNECTED_SSID).text
-                stats = driver.find_element(AppiumBy.XPATH, XPATH_CONNECTED_STATS).text
+                ssid = cache.text((AppiumBy.XPATH, XPATH_CONNECTED_SSID))
+                stats = cache.text((AppiumBy.XPATH, XPATH_CONNECTED_STATS))
                 logging.info(f"[{device_name}] Wi-Fi Connected: SSID = {ssid}, Stats = {stats}")
             else:
-                disconnected_network_present = is_element_present(driver, XPATH_DISCONNECTED_NETWORK)
-                disconnected_stats_present = is_element_present(driver, XPATH_DISCONNECTED_STATS)
+                disconnected_network_present = cache.is_present((AppiumBy.XPATH, XPATH_DISCONNECTED_NETWORK))
+                disconnected_stats_present = cache.is_present((AppiumBy.XPATH, XPATH_DISCONNECTED_STATS))
 
                 if disconnected_network_present and disconnected_stats_present:
                     if disconnect_start_time is None:
-                        disconnect_start_time = datetime.now()
+                        disconnect_start_time = sample_time
                         log_message = f"[{device_name}] Wi-Fi Disconnected at {disconnect_start_time.strftime('%Y-%m-%d %H:%M:%S')}."
                         logging.warning(log_message)
-                        log_event_to_excel(file_path, "Disconnected", "Wi-Fi disconnected")
+                        log_event(event_log, "Disconnected", "Wi-Fi disconnected")
                 else:
                     logging.warning(f"[{device_name}] Unable to detect Wi-Fi stats. Retrying...")
-            time.sleep(3)  # Check every 3 seconds
-    except KeyboardInterrupt:
+
+        sampler.log_stats()
         logging.info(f"Monitoring stopped for {device_name}.")
+        if disconnect_start_time is None and link_state and link_state.disconnected_since:
+            disconnect_start_time = datetime.fromtimestamp(link_state.disconnected_since)
         if disconnect_start_time:
             disconnect_duration = (datetime.now() - disconnect_start_time).total_seconds()
-            log_event_to_excel(file_path, "Disconnected (Incomplete)", f"Duration: {disconnect_duration:.2f} seconds")
+            log_event(event_log, "Disconnected (Incomplete)", f"Duration: {disconnect_duration:.2f} seconds")
     finally:
-        driver.quit()
-
-def is_element_present(driver, xpath):
-    """Checks if an element is present on the screen."""
+        if reader:
+            reader.stop()
+        cache.log_stats()
+
+def monitor_all_devices(device_configs=None):
+    """Monitors Wi-Fi status for all devices concurrently, restarting a device whose session dies."""
+    supervisor = DeviceSupervisor()
+    event_logs = {}
+    for device_config in device_configs or devices['devices']:
+        device_name = device_config['deviceName']
+        # One event log per device for the whole run, shared by every session the supervisor starts
+        event_logs[device_name] = prepare_event_log(device_name)
+        supervisor.add(device_name, partial(initialize_driver, device_config),
+                       partial(check_wifi_status, device_config=device_config, event_log=event_logs[device_name]),
+                       helpers=[partial(keep_device_awake, device_name=device_name)])
     try:
-        driver.find_element(AppiumBy.XPATH, xpath)
-        return True
-    except NoSuchElementException:
-        return False
+        supervisor.run()
+    finally:
+        for device_name, event_log in event_logs.items():
+            try:
+                event_log.close()
+                event_log.export_excel(f"{device_name}_wifi_log.xlsx", sheet_title="Wi-Fi Events")
+            except Exception as e:
+                logging.error(f"[{device_name}] Failed to save the Wi-Fi event log: {e}")
 
 def monitor_device(device_config):
     """Monitors Wi-Fi status for a single device."""
-    driver = initialize_driver(device_config)
-
-    # Run keep_device_awake in a separate thread
-    ThreadPoolExecutor(max_workers=1).submit(keep_device_awake, driver, device_config['deviceName'])
-
-    check_wifi_status(driver, device_config)
-
-def monitor_all_devices():
-    """Monitors Wi-Fi status for all devices concurrently."""
-    with ThreadPoolExecutor(max_workers=len(devices['devices'])) as executor:
-        futures = [executor.submit(monitor_device, device) for device in devices['devices']]
-        for future in futures:
-            try:
-                future.result()
-            except Exception as e:
-                logging.error(f"Error occurred: {e}")
+    monitor_all_devices([device_config])
 
 if __name__ == "__main__":
     monitor_all_devices()
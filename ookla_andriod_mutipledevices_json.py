@@ -1,14 +1,18 @@
 import json
 from appium import webdriver
 from appium.options.android import UiAutomator2Options
-from appium.webdriver.common.appiumby import AppiumBy
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import openpyxl
-from openpyxl.styles import Font
 import logging
 import time
-import os
+from datetime import datetime
+from locator_registry import default_registry
+from uia2_profiles import apply_profile, apply_profile_options
+from command_metrics import maybe_instrument
+from results_store import open_results
+from speed_test_stats import AdaptiveTrialPlan
+from campaign_scheduler import run_campaign
+from aggregate_capacity import run_aggregate_capacity
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -17,9 +21,25 @@ logging.basicConfig(level=logging.INFO)
 with open('device_configs.json') as config_file:
     config_data = json.load(config_file)
 
-# Define the number of trials
+# Shared locator registry (locators.json)
+locators = default_registry()
+
+# Define the number of trials (used when adaptive_trials is off)
 num_trials = 10
 
+# Adaptive trial count (opt-in): run between min_trials and max_trials, stopping once the 95%
+# confidence interval of the download and upload speeds is within ci_tolerance of the mean.
+# Capped at num_trials so it can only shorten a run; 15% stops at 3 trials when the speeds
+# vary by up to about 6% and at 4 trials by up to about 9%
+adaptive_trials = False
+min_trials = 3
+max_trials = num_trials
+ci_tolerance = 0.15
+
+# Aggregate-capacity mode: start every device at the same instant and sum their throughputs
+aggregate_capacity_mode = False
+aggregate_rounds = 3
+
 
 # Function to run tests on a device
 def run_device_tests(device_config):
@@ -28,22 +48,12 @@ def run_device_tests(device_config):
     # Excel file setup
     excel_file = f"C:\\Users\\actio\\Documents\\Ookla_automation_results_andriod\\{device_config['deviceUniqueId']}_results.xlsx"
 
-    # Load or create workbook and select the active sheet
-    if os.path.exists(excel_file):
-        workbook = openpyxl.load_workbook(excel_file)
-        sheet = workbook.active
-    else:
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        sheet.title = 'Speed Test Results'
-        sheet.append(["Download Speed (Mbps)", "Upload Speed (Mbps)", "Avg Download Speed", "Avg Upload Speed", "Test Run ID"])
-
-    # Determine the next Test Run ID
-    last_run_id = 0
-    for value in sheet['E']:
-        if value.value and value.value.startswith("TR-"):
-            last_run_id = max(last_run_id, int(value.value.split('-')[1]))
-    test_run_id = f"TR-{last_run_id + 1}"
+    # Results database next to the workbook (existing workbook history is imported on first use)
+    device_id = device_config['deviceUniqueId']
+    results = open_results(excel_file, device_id, "ookla")
+
+    # Allocate the next Test Run ID
+    test_run_id = results.next_run_id(device_id, "ookla")
 
     # Initialize the driver using UiAutomator2Options
     options = UiAutomator2Options()
@@ -55,31 +65,35 @@ def run_device_tests(device_config):
     options.no_reset = device_config['noReset']
     options.full_reset = device_config['fullReset']
 
+    apply_profile_options(options, "speed_test")
     driver = webdriver.Remote("http://localhost:4723/wd/hub", options=options)
+    apply_profile(driver, "speed_test")
+    maybe_instrument(driver)
     logging.info(f"Driver initialized successfully for {device_config['deviceName']}.")
 
     try:
-        for i in range(num_trials):  # Use the defined number of trials
+        trials = AdaptiveTrialPlan(min_trials, max_trials if adaptive_trials else num_trials, ci_tolerance,
+                                   adaptive=adaptive_trials)
+        for i in trials:
             logging.info(f"Starting trial {i + 1} for {device_config['deviceName']}...")
+            trial_start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
             # Wait for the "GO" button and click
-            WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((AppiumBy.ID, "org.zwanoo.android.speedtest:id/go_button"))
+            go_button = WebDriverWait(driver, 20).until(
+                EC.presence_of_element_located(locators["ooklaGoButton"])
             )
-            go_button = driver.find_element(AppiumBy.ID, "org.zwanoo.android.speedtest:id/go_button")
             go_button.click()
 
             # Wait for results
             WebDriverWait(driver, 60).until(
-                EC.presence_of_element_located(
-                    (AppiumBy.XPATH, '//android.widget.FrameLayout[@content-desc="DOWNLOAD"]/android.view.ViewGroup'))
+                EC.presence_of_element_located(locators["ooklaDownloadPanel"])
             )
 
             download_speed_element = WebDriverWait(driver, 45).until(
-                EC.presence_of_element_located((AppiumBy.XPATH, '//android.widget.FrameLayout[@content-desc="DOWNLOAD"]/android.view.ViewGroup/android.widget.TextView[@resource-id="org.zwanoo.android.speedtest:id/txt_test_result_value"]'))
+                EC.presence_of_element_located(locators["ooklaDownloadSpeed"])
             )
             upload_speed_element = WebDriverWait(driver, 45).until(
-                EC.presence_of_element_located((AppiumBy.XPATH, '//android.widget.FrameLayout[@content-desc="UPLOAD"]/android.view.ViewGroup/android.widget.TextView[@resource-id="org.zwanoo.android.speedtest:id/txt_test_result_value"]'))
+                EC.presence_of_element_located(locators["ooklaUploadSpeed"])
             )
 
             download_speed = float(download_speed_element.text.split()[0])
@@ -88,35 +102,30 @@ def run_device_tests(device_config):
             logging.info(f"Download Speed: {download_speed} Mbps")
             logging.info(f"Upload Speed: {upload_speed} Mbps")
 
-            sheet.append([download_speed, upload_speed, None, None, test_run_id])
+            results.add_trial(device_id, "ookla", test_run_id, trial_start_time, download_speed, upload_speed)
+            trials.record(download_speed, upload_speed)
 
             time.sleep(2)
             close_icon = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((AppiumBy.ID, "org.zwanoo.android.speedtest:id/closeIcon"))
+                EC.element_to_be_clickable(locators["ooklaCloseIcon"])
             )
             close_icon.click()
             time.sleep(3)
 
-        last_row = sheet.max_row
-        avg_download_formula = f"=AVERAGE(A2:A{last_row})"
-        avg_upload_formula = f"=AVERAGE(B2:B{last_row})"
-        sheet.cell(row=last_row, column=3, value=avg_download_formula)
-        sheet.cell(row=last_row, column=4, value=avg_upload_formula)
-
-        for col in range(3, 5):
-            cell = sheet.cell(row=last_row, column=col)
-            cell.font = Font(bold=True)
-
-        workbook.save(excel_file)
-        logging.info(f"Results saved to {excel_file}")
+        # Export the workbook view from the database
+        results.export_excel(excel_file, device_id, "ookla")
+        results.log_run_statistics(device_id, "ookla", test_run_id)
 
     finally:
         driver.quit()
+        results.close()
 
 
-# Iterate over each device configuration and run tests
-for device in config_data['devices']:
-    run_device_tests(device)
+if aggregate_capacity_mode:
+    run_aggregate_capacity(config_data['devices'], "ookla", aggregate_rounds)
+else:
+    # Run every device, serializing those that share an access point
+    run_campaign(config_data['devices'], run_device_tests)
 
 # # Iterate over each device configuration and run tests
 # for device in config_data['devices']:
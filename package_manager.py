@@ -0,0 +1,59 @@
+import logging
+import re
+import time
+from adb_client import AdbError
+
+# Seconds between package manager polls while waiting for an install or uninstall
+POLL_INTERVAL = 0.5
+
+VERSION_PATTERN = re.compile(r"versionName=(\S+)")
+
+
+def is_installed(client, serial, package):
+    """Returns True if pm lists package on the device."""
+    output = client.run(serial, f"pm list packages {package}")
+    return f"package:{package}" in output.split()
+
+
+def installed_version(client, serial, package):
+    """Returns the versionName dumpsys reports for package, or None if it is not installed."""
+    match = VERSION_PATTERN.search(client.run(serial, f"dumpsys package {package}"))
+    return match.group(1) if match else None
+
+
+def wait_for_install(client, serial, package, timeout=300):
+    """Blocks until package is installed; returns the seconds waited, or None on timeout."""
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        if is_installed(client, serial, package) and installed_version(client, serial, package):
+            return time.monotonic() - start
+        time.sleep(POLL_INTERVAL)
+    return None
+
+
+def uninstall(client, serial, package, timeout=60):
+    """Uninstalls package with pm and waits until it is gone; returns True on success."""
+    output = client.run(serial, f"pm uninstall {package}", timeout=timeout)
+    if "Success" not in output:
+        logging.warning(f"pm uninstall {package} on {serial}: {output.strip()}")
+        return False
+    start = time.monotonic()
+    while is_installed(client, serial, package):
+        if time.monotonic() - start > timeout:
+            return False
+        time.sleep(POLL_INTERVAL)
+    return True
+
+
+def install_and_remove(client, serial, package, install_timeout=300):
+    """Waits for package to finish installing, then uninstalls it.
+
+    Returns the seconds the install took to complete, or raises AdbError when the
+    package manager path cannot be used and the caller should fall back to the UI.
+    """
+    install_seconds = wait_for_install(client, serial, package, install_timeout)
+    if install_seconds is None:
+        raise AdbError(f"{package} did not appear in pm list packages within {install_timeout}s")
+    if not uninstall(client, serial, package):
+        raise AdbError(f"pm uninstall {package} failed")
+    return install_seconds
@@ -0,0 +1,317 @@
+import csv
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+import openpyxl
+
+# Queue markers for the writer thread
+_CLOSE = object()
+_FLUSH = object()
+
+
+def _excel_value(value):
+    """Converts numeric strings read back from CSV into numbers for Excel."""
+    if not isinstance(value, str):
+        return value
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+class WriteBehindSink(ABC):
+    """Queues result rows and writes them in batches from a background thread.
+
+    Rows are checkpointed to an append-friendly file every flush_interval seconds
+    (or every batch_size rows), so callers never block on file I/O and a crash
+    loses at most one interval. Excel is produced on demand by export_excel().
+    """
+
+    def __init__(self, path, headers, flush_interval=5.0, batch_size=500, max_queue=10000):
+        self.path = path
+        self.headers = list(headers)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._error = None
+        self._closed = False
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"sink-{os.path.basename(path)}", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error:
+            raise self._error
+
+    def _put(self, item):
+        """Queues item, giving up with the writer's error if the writer thread has died."""
+        while True:
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                if not self._thread.is_alive():
+                    raise self._error or RuntimeError(f"Sink {self.path} is closed")
+
+    def write(self, row):
+        """Queues one row; returns immediately unless the queue is full."""
+        if self._closed:
+            raise self._error or RuntimeError(f"Sink {self.path} is closed")
+        self._put(list(row))
+
+    def flush(self):
+        """Blocks until every queued row has been written and checkpointed, or the writer has failed."""
+        if not self._closed:
+            self._put(_FLUSH)
+        # A row queued after the writer failed is never marked done, so stop waiting once it is gone
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks and self._thread.is_alive():
+                self._queue.all_tasks_done.wait(0.5)
+        if self._error:
+            raise self._error
+
+    def close(self):
+        """Writes the remaining rows and stops the writer thread; raises the writer's error if it failed."""
+        already_closed = self._closed
+        self._closed = True
+        if not already_closed and self._thread.is_alive():
+            self._put(_CLOSE)
+        self._thread.join()
+        if self._error:
+            raise self._error
+        if not already_closed:
+            logging.info(f"Saved {self.rows_written} rows to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _run(self):
+        try:
+            self._open()
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+        batch, pending, done = [], 0, False
+        last_checkpoint = time.monotonic()
+        try:
+            while not done:
+                timeout = max(0.0, self.flush_interval - (time.monotonic() - last_checkpoint))
+                flush_now = False
+                try:
+                    item = self._queue.get(timeout=timeout)
+                    pending += 1
+                    if item is _CLOSE:
+                        done = True
+                    elif item is _FLUSH:
+                        flush_now = True
+                    else:
+                        batch.append(item)
+                except queue.Empty:
+                    pass
+                if (done or flush_now or len(batch) >= self.batch_size
+                        or time.monotonic() - last_checkpoint >= self.flush_interval):
+                    if batch:
+                        self._write_batch(batch)
+                        self.rows_written += len(batch)
+                    for _ in range(pending):
+                        self._queue.task_done()
+                    batch, pending = [], 0
+                    last_checkpoint = time.monotonic()
+        except Exception as e:
+            self._error = e
+            self._closed = True
+            logging.error(f"Result sink {self.path} failed: {e}")
+            for _ in range(pending):
+                self._queue.task_done()
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._queue.task_done()
+        finally:
+            try:
+                self._close()
+            except Exception as e:
+                self._error = self._error or e
+
+    def export_excel(self, excel_path, sheet_title="Results"):
+        """Streams every persisted row into a write-only workbook."""
+        self.flush()
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet(title=sheet_title)
+        sheet.append(self.headers)
+        for row in self.rows():
+            sheet.append([_excel_value(value) for value in row])
+        workbook.save(excel_path)
+        logging.info(f"Exported {self.path} to {excel_path}")
+        return excel_path
+
+    @abstractmethod
+    def _open(self):
+        """Opens the backing file; runs on the writer thread."""
+
+    @abstractmethod
+    def _write_batch(self, rows):
+        """Persists one batch of rows; runs on the writer thread."""
+
+    @abstractmethod
+    def _close(self):
+        """Closes the backing file; runs on the writer thread."""
+
+    @abstractmethod
+    def rows(self):
+        """Yields persisted rows (without the header)."""
+
+
+class CsvSink(WriteBehindSink):
+    """Appends rows to a CSV file, writing the header only when the file is new."""
+
+    def __init__(self, path, headers, truncate=False, **kwargs):
+        self.truncate = truncate
+        super().__init__(path, headers, **kwargs)
+
+    def _open(self):
+        new_file = self.truncate or not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, "w" if self.truncate else "a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        if new_file:
+            self._writer.writerow(self.headers)
+            self._file.flush()
+
+    def _write_batch(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+    def rows(self):
+        with open(self.path, newline="", encoding="utf-8") as csv_file:
+            reader = csv.reader(csv_file)
+            next(reader, None)
+            yield from reader
+
+
+class SqliteSink(WriteBehindSink):
+    """Inserts rows into a SQLite table, one transaction per batch."""
+
+    def __init__(self, path, headers, table="results", truncate=False, **kwargs):
+        self.table = table
+        self.truncate = truncate
+        super().__init__(path, headers, **kwargs)
+
+    def _columns(self):
+        return ", ".join(f'"{header}"' for header in self.headers)
+
+    def _open(self):
+        self._connection = sqlite3.connect(self.path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        if self.truncate:
+            self._connection.execute(f'DROP TABLE IF EXISTS "{self.table}"')
+        self._connection.execute(f'CREATE TABLE IF NOT EXISTS "{self.table}" ({self._columns()})')
+        self._connection.commit()
+
+    def _write_batch(self, rows):
+        placeholders = ", ".join("?" for _ in self.headers)
+        with self._connection:
+            self._connection.executemany(f'INSERT INTO "{self.table}" ({self._columns()}) VALUES ({placeholders})', rows)
+
+    def _close(self):
+        self._connection.close()
+
+    def rows(self):
+        connection = sqlite3.connect(self.path)
+        try:
+            yield from connection.execute(f'SELECT {self._columns()} FROM "{self.table}" ORDER BY rowid')
+        finally:
+            connection.close()
+
+
+class EventLogSink(WriteBehindSink):
+    """Single writer for concurrent monitors: a shared text log plus one CSV per device.
+
+    Workers queue events with event(); the writer thread appends every message to the
+    text log (and echoes it to the console) in queue order and the event's row to its
+    device's CSV, flushing each file once per batch. The CSVs are started fresh, with
+    headers, when the sink opens.
+    """
+
+    def __init__(self, path, headers, csv_paths=(), echo=True, **kwargs):
+        self.csv_paths = list(csv_paths)
+        self.echo = echo
+        super().__init__(path, headers, **kwargs)
+
+    def event(self, message, csv_path=None, row=None):
+        """Queues message for the text log and, if given, row for the CSV at csv_path."""
+        self.write((message, csv_path, row))
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._csv_files = {}
+        self._writers = {}
+        for csv_path in self.csv_paths:
+            self._csv_files[csv_path] = open(csv_path, "w", newline="", encoding="utf-8")
+            self._writers[csv_path] = csv.writer(self._csv_files[csv_path])
+            self._writers[csv_path].writerow(self.headers)
+            self._csv_files[csv_path].flush()
+
+    def _write_batch(self, events):
+        touched = set()
+        for message, csv_path, row in events:
+            if message is not None:
+                if self.echo:
+                    print(message)
+                self._file.write(message + "\n")
+            if row is not None:
+                self._writers[csv_path].writerow(row)
+                touched.add(csv_path)
+        self._file.flush()
+        for csv_path in touched:
+            self._csv_files[csv_path].flush()
+
+    def _close(self):
+        self._file.close()
+        for csv_file in self._csv_files.values():
+            csv_file.close()
+
+    def rows(self):
+        for csv_path in self.csv_paths:
+            with open(csv_path, newline="", encoding="utf-8") as csv_file:
+                reader = csv.reader(csv_file)
+                next(reader, None)
+                yield from reader
+
+
+def seed_csv_from_excel(csv_path, excel_path):
+    """Copies an existing workbook's rows into a new CSV so history survives the switch to CSV."""
+    if os.path.exists(csv_path) or not os.path.exists(excel_path):
+        return False
+    workbook = openpyxl.load_workbook(excel_path, read_only=True)
+    with open(csv_path, "w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.writer(csv_file)
+        for row in workbook.active.iter_rows(values_only=True):
+            writer.writerow(["" if value is None else value for value in row])
+    workbook.close()
+    logging.info(f"Seeded {csv_path} from {excel_path}")
+    return True
+
+
+def open_sink(path, headers, excel_path=None, **kwargs):
+    """Opens a CSV or SQLite sink by file extension, seeding a new CSV from excel_path if given."""
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        return SqliteSink(path, headers, **kwargs)
+    if excel_path and not kwargs.get("truncate"):
+        seed_csv_from_excel(path, excel_path)
+    return CsvSink(path, headers, **kwargs)
@@ -0,0 +1,275 @@
+import argparse
+import logging
+import os
+import sqlite3
+from datetime import datetime
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from speed_test_stats import STAT_NAMES, SPEED_COLUMNS, device_summary, run_summary
+
+# Database file created next to the per-device workbooks
+RESULTS_DB_NAME = "speed_test_results.db"
+
+# Column layout of the exported workbooks (and of the newer *_results.xlsx files)
+EXPORT_HEADERS = ["Timestamp", "Download Speed (Mbps)", "Upload Speed (Mbps)", "Avg Download Speed",
+                  "Avg Upload Speed", "Test Run ID"]
+
+# Column labels of the per-run statistics sheet
+STAT_LABELS = {"mean": "Mean", "median": "Median", "p5": "P5", "p95": "P95", "std": "Std Dev",
+               "ci_low": "95% CI Low", "ci_high": "95% CI High"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trials (
+    id INTEGER PRIMARY KEY,
+    device TEXT NOT NULL,
+    suite TEXT NOT NULL,
+    run_number INTEGER NOT NULL,
+    trial INTEGER NOT NULL,
+    started_at TEXT,
+    download_mbps REAL,
+    upload_mbps REAL
+);
+CREATE INDEX IF NOT EXISTS trials_by_run ON trials (device, suite, run_number);
+CREATE TABLE IF NOT EXISTS run_sequence (
+    device TEXT NOT NULL,
+    suite TEXT NOT NULL,
+    last_run INTEGER NOT NULL,
+    PRIMARY KEY (device, suite)
+);
+CREATE TABLE IF NOT EXISTS imported_workbooks (
+    path TEXT PRIMARY KEY,
+    device TEXT NOT NULL,
+    suite TEXT NOT NULL,
+    trials INTEGER NOT NULL,
+    imported_at TEXT NOT NULL
+);
+"""
+
+
+def format_run_id(run_number):
+    """Formats a run number as the "TR-<n>" ID used in the workbooks."""
+    return f"TR-{run_number}"
+
+
+def parse_run_id(value):
+    """Returns the run number of a "TR-<n>" cell value, or None."""
+    if isinstance(value, str) and value.startswith("TR-"):
+        try:
+            return int(value.split('-')[1])
+        except ValueError:
+            return None
+    return None
+
+
+class ResultsStore:
+    """SQLite store of speed-test trials; the per-device workbooks are exported from it."""
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = sqlite3.connect(path, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+
+    @classmethod
+    def for_workbook(cls, excel_file):
+        """Opens the store that lives in the same directory as a results workbook."""
+        directory = os.path.dirname(excel_file) or "."
+        os.makedirs(directory, exist_ok=True)
+        return cls(os.path.join(directory, RESULTS_DB_NAME))
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _bump_sequence(self, device, suite, run_number):
+        self._connection.execute(
+            "INSERT INTO run_sequence (device, suite, last_run) VALUES (?, ?, ?) "
+            "ON CONFLICT (device, suite) DO UPDATE SET last_run = MAX(last_run, excluded.last_run)",
+            (device, suite, run_number))
+
+    def next_run_id(self, device, suite):
+        """Allocates the next Test Run ID for a device with one indexed upsert."""
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.execute(
+                "INSERT INTO run_sequence (device, suite, last_run) VALUES (?, ?, 1) "
+                "ON CONFLICT (device, suite) DO UPDATE SET last_run = last_run + 1",
+                (device, suite))
+            (run_number,) = self._connection.execute(
+                "SELECT last_run FROM run_sequence WHERE device = ? AND suite = ?", (device, suite)).fetchone()
+        return format_run_id(run_number)
+
+    def add_trial(self, device, suite, test_run_id, started_at, download_speed, upload_speed):
+        """Records one trial of a run."""
+        run_number = parse_run_id(test_run_id)
+        with self._connection:
+            (trial,) = self._connection.execute(
+                "SELECT COUNT(*) + 1 FROM trials WHERE device = ? AND suite = ? AND run_number = ?",
+                (device, suite, run_number)).fetchone()
+            self._connection.execute(
+                "INSERT INTO trials (device, suite, run_number, trial, started_at, download_mbps, upload_mbps) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (device, suite, run_number, trial, started_at, download_speed, upload_speed))
+        return trial
+
+    def trials(self, device, suite, run_id=None):
+        """Returns (run_number, trial, started_at, download, upload) rows in run order."""
+        query = ("SELECT run_number, trial, started_at, download_mbps, upload_mbps FROM trials "
+                 "WHERE device = ? AND suite = ?")
+        params = [device, suite]
+        if run_id is not None:
+            query += " AND run_number = ?"
+            params.append(parse_run_id(run_id))
+        return self._connection.execute(query + " ORDER BY run_number, trial", params).fetchall()
+
+    def all_trials(self, suite):
+        """Returns (device, run_number, trial, started_at, download, upload) rows for every device."""
+        return self._connection.execute(
+            "SELECT device, run_number, trial, started_at, download_mbps, upload_mbps FROM trials "
+            "WHERE suite = ? ORDER BY device, run_number, trial", (suite,)).fetchall()
+
+    def run_statistics(self, device, suite, run_id=None):
+        """Returns per-run statistics (see speed_test_stats.run_summary) for a device."""
+        return run_summary(self.trials(device, suite, run_id))
+
+    def log_run_statistics(self, device, suite, run_id):
+        """Logs the download/upload statistics of one run."""
+        for stats in self.run_statistics(device, suite, run_id):
+            for column in SPEED_COLUMNS:
+                logging.info(
+                    f"{device} {run_id} {column}: mean {stats[f'{column}_mean']} Mbps, "
+                    f"median {stats[f'{column}_median']}, p5 {stats[f'{column}_p5']}, p95 {stats[f'{column}_p95']}, "
+                    f"std {stats[f'{column}_std']}, 95% CI [{stats[f'{column}_ci_low']}, {stats[f'{column}_ci_high']}] "
+                    f"over {stats[f'{column}_count']} trials")
+
+    def import_workbook(self, excel_file, device, suite):
+        """Imports an existing *_results.xlsx once; returns the number of trials imported."""
+        path = os.path.abspath(excel_file)
+        if not os.path.exists(path):
+            return 0
+        if self._connection.execute("SELECT 1 FROM imported_workbooks WHERE path = ?", (path,)).fetchone():
+            return 0
+
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, ())
+        # Older scripts wrote no Timestamp column and kept the Test Run ID in column E
+        has_timestamp = bool(header) and header[0] == "Timestamp"
+        trials, run_counts = [], {}
+        for row in rows:
+            row = tuple(row) + (None,) * (6 - len(row))
+            if has_timestamp:
+                started_at, download_speed, upload_speed, run_cell = row[0], row[1], row[2], row[5]
+            else:
+                started_at, download_speed, upload_speed, run_cell = None, row[0], row[1], row[4]
+            run_number = parse_run_id(run_cell)
+            if run_number is None or download_speed is None:
+                continue  # Average and spacer rows
+            if isinstance(started_at, datetime):
+                started_at = started_at.strftime("%Y-%m-%d %H:%M:%S")
+            run_counts[run_number] = run_counts.get(run_number, 0) + 1
+            trials.append((device, suite, run_number, run_counts[run_number], started_at,
+                           download_speed, upload_speed))
+        workbook.close()
+
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO trials (device, suite, run_number, trial, started_at, download_mbps, upload_mbps) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", trials)
+            if run_counts:
+                self._bump_sequence(device, suite, max(run_counts))
+            self._connection.execute(
+                "INSERT INTO imported_workbooks (path, device, suite, trials, imported_at) VALUES (?, ?, ?, ?, ?)",
+                (path, device, suite, len(trials), datetime.now().isoformat(timespec="seconds")))
+        logging.info(f"Imported {len(trials)} trials ({len(run_counts)} runs) from {excel_file}")
+        return len(trials)
+
+    def export_excel(self, excel_file, device, suite):
+        """Writes the device's trials to a workbook, with each run's averages after its last trial.
+
+        All statistics are written as values; a second sheet has the per-run and
+        all-runs distribution (median, p5/p95, std dev, confidence interval).
+        """
+        rows = self.trials(device, suite)
+        run_stats = run_summary(rows)
+        stats_by_run = {stats["run_number"]: stats for stats in run_stats}
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet(title='Speed Test Results')
+        sheet.append(EXPORT_HEADERS)
+        bold = Font(bold=True)
+        for index, (run_number, _, started_at, download_speed, upload_speed) in enumerate(rows):
+            row = [started_at, download_speed, upload_speed, None, None, format_run_id(run_number)]
+            if index + 1 == len(rows) or rows[index + 1][0] != run_number:
+                stats = stats_by_run[run_number]
+                row[3] = WriteOnlyCell(sheet, value=stats["download_mean"])
+                row[4] = WriteOnlyCell(sheet, value=stats["upload_mean"])
+                row[3].font = row[4].font = bold
+            sheet.append(row)
+
+        stats_sheet = workbook.create_sheet(title='Run Statistics')
+        stats_sheet.append(["Test Run ID", "Trials"] + [
+            f"{column.capitalize()} {STAT_LABELS[name]}" for column in SPEED_COLUMNS for name in STAT_NAMES])
+        overall = device_summary([(device,) + tuple(row) for row in rows])
+        for stats in run_stats + overall:
+            label = format_run_id(stats["run_number"]) if "run_number" in stats else "All runs"
+            stats_sheet.append([label, stats["download_count"]] + [
+                stats[f"{column}_{name}"] for column in SPEED_COLUMNS for name in STAT_NAMES])
+        workbook.save(excel_file)
+        # The export is a view of the database, so it never needs importing again
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO imported_workbooks (path, device, suite, trials, imported_at) "
+                "VALUES (?, ?, ?, 0, ?)",
+                (os.path.abspath(excel_file), device, suite, datetime.now().isoformat(timespec="seconds")))
+        logging.info(f"Results saved to {excel_file}")
+        return excel_file
+
+
+def open_results(excel_file, device, suite):
+    """Opens the store next to excel_file, importing the workbook's history on first use."""
+    store = ResultsStore.for_workbook(excel_file)
+    store.import_workbook(excel_file, device, suite)
+    return store
+
+
+def device_from_workbook(excel_file):
+    """Returns the deviceUniqueId part of a "<deviceUniqueId>_results.xlsx" file name."""
+    name = os.path.splitext(os.path.basename(excel_file))[0]
+    return name[:-len("_results")] if name.endswith("_results") else name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import, export or summarize speed-test results.")
+    parser.add_argument("action", choices=["import", "export", "stats"])
+    parser.add_argument("workbooks", nargs="*", help="<deviceUniqueId>_results.xlsx files")
+    parser.add_argument("--suite", default="ookla", choices=["ookla", "fast"])
+    parser.add_argument("--db", help="Database path (default: next to each workbook)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.action == "stats":
+        with ResultsStore(args.db or RESULTS_DB_NAME) as store:
+            for stats in device_summary(store.all_trials(args.suite)):
+                print(f"{stats['device']}: " + ", ".join(
+                    f"{column} mean {stats[f'{column}_mean']} median {stats[f'{column}_median']} "
+                    f"p5 {stats[f'{column}_p5']} p95 {stats[f'{column}_p95']} std {stats[f'{column}_std']} "
+                    f"CI [{stats[f'{column}_ci_low']}, {stats[f'{column}_ci_high']}] (n={stats[f'{column}_count']})"
+                    for column in SPEED_COLUMNS))
+        return
+    for excel_file in args.workbooks:
+        device = device_from_workbook(excel_file)
+        with (ResultsStore(args.db) if args.db else ResultsStore.for_workbook(excel_file)) as store:
+            if args.action == "import":
+                store.import_workbook(excel_file, device, args.suite)
+            else:
+                store.export_excel(excel_file, device, args.suite)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import logging
+import math
+import warnings
+from statistics import NormalDist
+import numpy as np
+
+# Two-sided Student t critical values for df = 1..30
+T_CRITICAL = {
+    0.90: [6.314, 2.920, 2.353, 2.132, 2.015, 1.943, 1.895, 1.860, 1.833, 1.812,
+           1.796, 1.782, 1.771, 1.761, 1.753, 1.746, 1.740, 1.734, 1.729, 1.725,
+           1.721, 1.717, 1.714, 1.711, 1.708, 1.706, 1.703, 1.701, 1.699, 1.697],
+    0.95: [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+           2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+           2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042],
+    0.99: [63.657, 9.925, 5.841, 4.604, 4.032, 3.707, 3.499, 3.355, 3.250, 3.169,
+           3.106, 3.055, 3.012, 2.977, 2.947, 2.921, 2.898, 2.878, 2.861, 2.845,
+           2.831, 2.819, 2.807, 2.797, 2.787, 2.779, 2.771, 2.763, 2.756, 2.750],
+}
+
+# Statistics computed for every group and value column, in report order
+STAT_NAMES = ["mean", "median", "p5", "p95", "std", "ci_low", "ci_high"]
+
+# Value columns of the speed-test trials
+SPEED_COLUMNS = ["download", "upload"]
+
+
+def t_critical(df, confidence=0.95):
+    """Returns two-sided t critical values for an array of degrees of freedom (NaN where df < 1)."""
+    if confidence not in T_CRITICAL:
+        raise ValueError(f"Unsupported confidence level {confidence}. Available: {', '.join(map(str, T_CRITICAL))}")
+    df = np.asarray(df, dtype=float)
+    table = np.array([np.nan] + T_CRITICAL[confidence])
+    # Cornish-Fisher expansion of the t quantile beyond the table
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        large = z + (z ** 3 + z) / (4 * df) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+    small = table[np.clip(df, 0, 30).astype(int)]
+    return np.where(df > 30, large, small)
+
+
+def _percentiles(ordered, counts, q):
+    """Linear-interpolated percentiles of NaN-padded rows already sorted along axis 1."""
+    rank = np.clip(q / 100 * (counts - 1), 0, None)
+    low = np.floor(rank).astype(int)
+    high = np.minimum(low + 1, np.maximum(counts - 1, 0))
+    low_values = np.take_along_axis(ordered, low[:, None], axis=1)[:, 0]
+    high_values = np.take_along_axis(ordered, high[:, None], axis=1)[:, 0]
+    result = low_values + (high_values - low_values) * (rank - low)
+    return np.where(counts > 0, result, np.nan)
+
+
+def group_statistics(groups, values, confidence=0.95):
+    """Computes per-group count, mean, median, p5, p95, std and confidence interval in one pass.
+
+    groups is a sequence of group keys and values an (n, k) array of samples
+    (NaN for missing). Returns (keys, counts, stats) where counts is (groups, k)
+    and stats maps each of STAT_NAMES to a (groups, k) array.
+    """
+    groups = np.asarray(groups)
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    if not len(groups):
+        empty = np.empty((0, values.shape[1]))
+        return groups, empty, {name: empty for name in STAT_NAMES}
+
+    order = np.argsort(groups, kind="stable")
+    groups, values = groups[order], values[order]
+    keys, starts, sizes = np.unique(groups, return_index=True, return_counts=True)
+
+    # Scatter the samples into a (groups, max group size, k) matrix padded with NaN
+    position = np.arange(len(groups)) - np.repeat(starts, sizes)
+    group_index = np.repeat(np.arange(len(keys)), sizes)
+    matrix = np.full((len(keys), sizes.max(), values.shape[1]), np.nan)
+    matrix[group_index, position] = values
+
+    counts = np.sum(~np.isnan(matrix), axis=1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Empty groups and single-sample std
+        mean = np.nanmean(matrix, axis=1)
+        # NaN sorts last, so each group's samples are the first counts entries
+        ordered = np.sort(matrix, axis=1)
+        median, p5, p95 = (
+            np.stack([_percentiles(ordered[:, :, j], counts[:, j], q) for j in range(values.shape[1])], axis=1)
+            for q in (50, 5, 95))
+        std = np.nanstd(matrix, axis=1, ddof=1)
+        half_width = t_critical(counts - 1, confidence) * std / np.sqrt(counts)
+    return keys, counts, {
+        "mean": mean,
+        "median": median,
+        "p5": p5,
+        "p95": p95,
+        "std": std,
+        "ci_low": mean - half_width,
+        "ci_high": mean + half_width,
+    }
+
+
+def _value(number, digits):
+    """Converts a NumPy scalar to a rounded float, or None for NaN."""
+    return None if math.isnan(number) else round(float(number), digits)
+
+
+def summary_rows(keys, counts, stats, key_name, columns=SPEED_COLUMNS, digits=2):
+    """Flattens group_statistics() output into one dict per group (e.g. download_p95)."""
+    rows = []
+    for i, key in enumerate(keys):
+        row = {key_name: key.item() if hasattr(key, "item") else key}
+        for j, column in enumerate(columns):
+            row[f"{column}_count"] = int(counts[i, j])
+            for name in STAT_NAMES:
+                row[f"{column}_{name}"] = _value(stats[name][i, j], digits)
+        rows.append(row)
+    return rows
+
+
+def run_summary(trials, confidence=0.95):
+    """Per-run statistics from (run_number, trial, started_at, download, upload) rows."""
+    if not trials:
+        return []
+    runs = [row[0] for row in trials]
+    speeds = [[np.nan if value is None else value for value in row[3:5]] for row in trials]
+    return summary_rows(*group_statistics(runs, speeds, confidence), key_name="run_number")
+
+
+def device_summary(trials, confidence=0.95):
+    """Per-device statistics over all runs from (device, ..., download, upload) rows."""
+    if not trials:
+        return []
+    devices = [row[0] for row in trials]
+    speeds = [[np.nan if value is None else value for value in row[-2:]] for row in trials]
+    return summary_rows(*group_statistics(devices, speeds, confidence), key_name="device")
+
+
+class AdaptiveTrialPlan:
+    """Runs speed-test trials until the download and upload confidence intervals are narrow enough.
+
+    Iterating yields trial indexes; call record() after each trial. Stops after
+    max_trials, or once at least min_trials have run and the CI half-width of
+    every column is within tolerance (a fraction of the mean). With
+    adaptive=False it always runs max_trials.
+    """
+
+    def __init__(self, min_trials=3, max_trials=10, tolerance=0.15, confidence=0.95, adaptive=True):
+        self.min_trials = max(2, min(min_trials, max_trials))
+        self.max_trials = max_trials
+        self.tolerance = tolerance
+        self.confidence = confidence
+        self.adaptive = adaptive
+        self.samples = []
+
+    def record(self, *speeds):
+        """Records one trial's download and upload speeds."""
+        self.samples.append(speeds)
+
+    def relative_half_widths(self):
+        """Returns the CI half-width / mean of each column, or None before two trials."""
+        if len(self.samples) < 2:
+            return None
+        values = np.asarray(self.samples, dtype=float)
+        half_width = t_critical(len(values) - 1, self.confidence) * values.std(axis=0, ddof=1) / np.sqrt(len(values))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.abs(half_width / values.mean(axis=0))
+
+    def converged(self):
+        """Returns True once every column's confidence interval is within tolerance."""
+        widths = self.relative_half_widths()
+        return widths is not None and bool(np.all(widths <= self.tolerance))
+
+    def __iter__(self):
+        trial = 0
+        while trial < self.max_trials:
+            if self.adaptive and trial >= self.min_trials and self.converged():
+                logging.info(f"Stopping after {trial} trials: CI within {self.tolerance:.0%} of the mean "
+                             f"({', '.join(f'{width:.1%}' for width in self.relative_half_widths())})")
+                return
+            yield trial
+            trial += 1
+        if self.adaptive and self.samples and not self.converged():
+            logging.info(f"Reached the maximum of {self.max_trials} trials without the CI converging.")
@@ -0,0 +1,69 @@
+import socket
+import socketserver
+import subprocess
+import threading
+
+
+class FakeAdbHandler(socketserver.BaseRequestHandler):
+    """Speaks the adb server wire protocol; device services run in a local sh."""
+
+    def _read_request(self):
+        length = int(self._recv(4), 16)
+        return self._recv(length).decode()
+
+    def _recv(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("client went away")
+            data += chunk
+        return data
+
+    def _reply(self, text):
+        payload = text.encode()
+        self.request.sendall(b"OKAY" + f"{len(payload):04x}".encode() + payload)
+
+    def _run(self, argv):
+        fd = self.request.fileno()
+        process = subprocess.Popen(argv, stdin=fd, stdout=fd, stderr=fd)
+        self.server.processes.append(process)
+        process.wait()
+
+    def handle(self):
+        try:
+            service = self._read_request()
+            if service == "host:version":
+                self._reply("0029")
+                return
+            if service == "host:devices":
+                self._reply("fake-serial\tdevice\n")
+                return
+            if service.startswith("host:transport"):
+                self.request.sendall(b"OKAY")
+                service = self._read_request()
+            self.request.sendall(b"OKAY")
+            if service == "exec:sh":
+                self._run(["sh"])
+            elif service.startswith("shell:"):
+                self._run(["sh", "-c", service[len("shell:"):]])
+        except ConnectionError:
+            pass
+
+
+class FakeAdbServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeAdbHandler)
+        self.processes = []
+        self.port = self.server_address[1]
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.shutdown()
+        for process in self.processes:
+            process.kill()
+            process.wait()
+        self.server_close()
@@ -0,0 +1,77 @@
+import socket
+import subprocess
+import pytest
+from adb_client import AdbClient, PersistentShell, ShellClosedError
+
+
+class LocalShellClient:
+    """Stands in for the adb server: exec:sh is a local sh on the other end of a socketpair."""
+
+    def __init__(self):
+        self.opened = 0
+        self.processes = []
+
+    def open_service(self, serial, service):
+        assert service == "exec:sh"
+        ours, theirs = socket.socketpair()
+        self.processes.append(subprocess.Popen(["sh"], stdin=theirs, stdout=theirs))
+        theirs.close()
+        self.opened += 1
+        return ours
+
+    def close(self):
+        for process in self.processes:
+            process.kill()
+            process.wait()
+
+
+@pytest.fixture
+def local_client():
+    client = LocalShellClient()
+    yield client
+    client.close()
+
+
+def test_output_without_trailing_newline(local_client):
+    shell = PersistentShell(local_client, "serial")
+    assert shell.run("printf abc", timeout=5) == "abc"
+    assert shell.last_status == 0
+    assert shell.run("printf 'a\\nb\\n\\n'", timeout=5) == "a\nb\n\n"
+
+
+def test_exit_status_and_stderr(local_client):
+    shell = PersistentShell(local_client, "serial")
+    assert shell.run("echo oops >&2; false", timeout=5) == "oops\n"
+    assert shell.last_status == 1
+
+
+def test_command_cannot_read_the_next_command(local_client):
+    shell = PersistentShell(local_client, "serial")
+    assert shell.run("cat; echo done", timeout=5) == "done\n"
+    assert shell.run("echo next", timeout=5) == "next\n"
+
+
+def test_read_timeout_is_not_retried(local_client):
+    client = AdbClient()
+    client._shells["serial"] = PersistentShell(local_client, "serial")
+    with pytest.raises(OSError):
+        client.run("serial", "sleep 5", timeout=0.2)
+    assert client._shells["serial"].closed
+    assert local_client.opened == 1
+
+
+def test_shell_closed_before_sending_is_retried(local_client, monkeypatch):
+    client = AdbClient()
+    monkeypatch.setattr(client, "open_service", local_client.open_service)
+    client.run("serial", "true", timeout=5)
+    local_client.processes[0].kill()
+    local_client.processes[0].wait()
+    assert client.run("serial", "echo again", timeout=5) == "again\n"
+    assert local_client.opened == 2
+
+
+def test_closed_shell_raises_retryable_error(local_client):
+    shell = PersistentShell(local_client, "serial")
+    shell.close()
+    with pytest.raises(ShellClosedError):
+        shell.run("true")
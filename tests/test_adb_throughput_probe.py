@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+import adb_throughput_probe
+from adb_client import AdbClient
+from adb_throughput_probe import DEFAULT_SAMPLE_INTERVAL, NetDevSampler, measure, throughput_series
+from fake_adb import FakeAdbServer
+
+NET_DEV = ("Inter-|   Receive                                                |  Transmit\n"
+           " face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed\n"
+           "  wlan0: {rx} 100 0 0 0 0 0 0 {tx} 100 0 0 0 0 0 0\n")
+
+
+@pytest.fixture
+def adb_server():
+    server = FakeAdbServer()
+    yield server
+    server.close()
+
+
+def write_counters(path, rx, tx=0):
+    path.write_text(NET_DEV.format(rx=rx, tx=tx))
+
+
+def test_throughput_series_handles_wrap_and_reset():
+    wrap = 2 ** 32
+    samples = [(0.0, wrap - 1_000_000, 0), (1.0, 1_500_000, 0), (2.0, 2_500_000, 0), (3.0, 500_000, 0)]
+    series = throughput_series(samples, 1)
+    assert [elapsed for elapsed, _ in series] == [1.0, 2.0, 3.0]
+    # 2.5 MB across the wrap, 1 MB normally, then 0.5 MB counted again from zero after a reset
+    assert np.allclose([mbps for _, mbps in series], [20.0, 8.0, 4.0])
+
+
+def test_measure_over_the_adb_server(adb_server, tmp_path, monkeypatch):
+    counters = tmp_path / "net_dev"
+    write_counters(counters, rx=1_000_000)
+    monkeypatch.setattr(adb_throughput_probe, "SAMPLER_COMMAND", f"while :; do cat {counters}; sleep {{interval}}; done")
+    client = AdbClient(port=adb_server.port)
+    sampler = NetDevSampler("fake-serial", "wlan0", interval=DEFAULT_SAMPLE_INTERVAL, client=client)
+    try:
+        sampler.wait_for_sample_after()
+        transfer = (f"sleep 0.5; printf '{NET_DEV.format(rx=4_000_000, tx=0)}' > {counters}; sleep 0.5")
+        average, peak, series = measure(sampler, "fake-serial", transfer, 1, DEFAULT_SAMPLE_INTERVAL, 3_000_000)
+    finally:
+        sampler.stop()
+        client.close()
+    window = sampler.window(0, float("inf"))
+    assert window[0][1] == 1_000_000 and window[-1][1] == 4_000_000
+    # 3 MB in a 1 s transfer, although the bracketing samples span up to 3 s at this interval
+    assert average == pytest.approx(24, rel=0.1)
+    assert sum(mbps * DEFAULT_SAMPLE_INTERVAL for _, mbps in series) == pytest.approx(24, rel=0.1)
@@ -0,0 +1,40 @@
+import csv
+import pytest
+import aggregate_capacity
+from aggregate_capacity import run_aggregate_capacity
+
+
+class FakeDriver:
+    def __init__(self, fail_quit=False):
+        self.fail_quit = fail_quit
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+        if self.fail_quit:
+            raise ConnectionError("session already gone")
+
+
+def fake_run_device(driver, config, suite, barrier, round_number):
+    barrier.wait()
+    return {"device": config["deviceName"], "round": round_number, "start": 0.0, "click_ms": 1.0,
+            "skew_ms": 0.0, "download": 100.0, "upload": 20.0, "error": None}
+
+
+def test_every_driver_is_quit_and_results_saved_when_one_quit_fails(tmp_path, monkeypatch):
+    drivers = [FakeDriver(fail_quit=True), FakeDriver()]
+    monkeypatch.setattr(aggregate_capacity, "create_driver", lambda config, *args: drivers[config["index"]])
+    monkeypatch.setattr(aggregate_capacity, "_run_device", fake_run_device)
+    devices = [dict(deviceName=f"phone{i}", index=i) for i in range(2)]
+    output = tmp_path / "aggregate.csv"
+    summaries = run_aggregate_capacity(devices, output=str(output), interval=0)
+    assert summaries[0]["download"] == 200.0
+    assert all(driver.quit_called for driver in drivers)
+    with open(output, newline="") as f:
+        assert len(list(csv.reader(f))) == 4  # Header, two devices and the aggregate
+    assert (tmp_path / "aggregate.xlsx").exists()
+
+
+def test_unknown_suite_is_rejected():
+    with pytest.raises(ValueError):
+        run_aggregate_capacity([dict(deviceName="phone")], suite="nope")
@@ -0,0 +1,61 @@
+import json
+import pytest
+import bounds_cache
+from adb_client import AdbError
+from bounds_cache import BoundsCache
+
+
+class FakeElement:
+    rect = {"x": 10, "y": 20, "width": 100, "height": 40}
+
+
+class FakeDriver:
+    capabilities = {"deviceModel": "Pixel 7", "udid": "serial"}
+    orientation = "PORTRAIT"
+
+    def __init__(self):
+        self.finds = 0
+
+    def find_element(self, by, value):
+        self.finds += 1
+        return FakeElement()
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    path = tmp_path / "bounds_cache.json"
+    path.write_text(json.dumps({
+        "Pixel 7|com.app|1.0|PORTRAIT": {"element:old": [0, 0, 1, 1]},
+        "Pixel 7|com.app|2.0|PORTRAIT": {"element:button": [1, 2, 3, 4]},
+    }))
+    return path
+
+
+def use_version(monkeypatch, version=None, error=None):
+    def installed_version(client, serial, package):
+        if error:
+            raise error
+        return version
+    monkeypatch.setattr(bounds_cache, "installed_version", installed_version)
+
+
+def test_known_version_prunes_other_versions_and_reuses_bounds(cache_path, monkeypatch):
+    use_version(monkeypatch, "2.0")
+    driver = FakeDriver()
+    cache = BoundsCache(driver, "com.app", path=str(cache_path), adb=object())
+    assert cache.bounds("button", ("id", "button")) == [1, 2, 3, 4]
+    assert driver.finds == 0
+    assert list(json.loads(cache_path.read_text())) == ["Pixel 7|com.app|2.0|PORTRAIT"]
+
+
+def test_unknown_version_leaves_the_file_untouched(cache_path, monkeypatch):
+    use_version(monkeypatch, error=AdbError("device offline"))
+    before = cache_path.read_text()
+    driver = FakeDriver()
+    cache = BoundsCache(driver, "com.app", path=str(cache_path), adb=object())
+    assert cache.app_version == bounds_cache.UNKNOWN_VERSION
+    assert cache.bounds("button", ("id", "button")) == [10, 20, 110, 60]
+    assert cache.bounds("button", ("id", "button")) == [10, 20, 110, 60]
+    assert driver.finds == 1
+    cache.forget("button")
+    assert cache_path.read_text() == before
@@ -0,0 +1,64 @@
+import logging
+import campaign_scheduler
+from adb_client import AdbError
+from campaign_scheduler import BSSID_COMMAND, UNKNOWN_ACCESS_POINT, group_by_access_point, query_bssid
+
+
+class FakeAdb:
+    """AdbClient stand-in answering the BSSID query per serial."""
+
+    def __init__(self, outputs):
+        self.outputs = outputs
+        self.closed = False
+
+    def run(self, serial, command, timeout=30):
+        assert command == BSSID_COMMAND
+        output = self.outputs[serial]
+        if isinstance(output, Exception):
+            raise output
+        return output
+
+    def close(self):
+        self.closed = True
+
+
+def device(serial, ip_address=None, **extra):
+    return dict(deviceName=serial, deviceUID=serial, ipAddress=ip_address, **extra)
+
+
+def test_devices_are_grouped_by_bssid_then_subnet(caplog):
+    client = FakeAdb({
+        "a": "mWifiInfo SSID: \"home\", BSSID: AA:BB:CC:00:00:01, Supplicant state: COMPLETED\n",
+        "b": "mWifiInfo SSID: \"home\", BSSID: aa:bb:cc:00:00:01, Supplicant state: COMPLETED\n",
+        "c": "mWifiInfo SSID: \"home\", BSSID: aa:bb:cc:00:00:02, Supplicant state: COMPLETED\n",
+        "d": "mWifiInfo SSID: <unknown ssid>, BSSID: 02:00:00:00:00:00\n",
+        "e": AdbError("device offline"),
+        "f": "",
+    })
+    devices = [device("a"), device("b"), device("c"), device("d", "192.168.1.20"),
+               device("e", "192.168.1.30"), device("f"), device("g", accessPoint="lab")]
+    with caplog.at_level(logging.WARNING):
+        groups = group_by_access_point(devices, client=client)
+    assert {key: [config["deviceName"] for config in configs] for key, configs in groups.items()} == {
+        "bssid:aa:bb:cc:00:00:01": ["a", "b"],
+        "bssid:aa:bb:cc:00:00:02": ["c"],
+        "subnet:192.168.1.0/24": ["d", "e"],
+        UNKNOWN_ACCESS_POINT: ["f"],
+        "lab": ["g"],
+    }
+    assert sum("grouping it by subnet" in record.message for record in caplog.records) == 2
+
+
+def test_query_bssid_closes_only_the_client_it_created(monkeypatch):
+    created = []
+
+    def make_client():
+        created.append(FakeAdb({"a": AdbError("device offline")}))
+        return created[-1]
+
+    monkeypatch.setattr(campaign_scheduler, "AdbClient", make_client)
+    assert query_bssid("a") is None
+    assert len(created) == 1 and created[0].closed
+    shared = FakeAdb({"a": "mWifiInfo SSID: \"home\", BSSID: aa:bb:cc:00:00:01\n"})
+    assert query_bssid("a", shared) == "aa:bb:cc:00:00:01"
+    assert not shared.closed and len(created) == 1
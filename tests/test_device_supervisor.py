@@ -0,0 +1,115 @@
+import time
+from selenium.common.exceptions import InvalidSessionIdException
+from device_supervisor import DeviceSupervisor
+
+
+class FakeSession:
+    def __init__(self, number):
+        self.number = number
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+
+
+class Sessions:
+    """start_session stand-in that numbers every session it opens."""
+
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self):
+        session = FakeSession(len(self.opened) + 1)
+        self.opened.append(session)
+        return session
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def idle(session, stop=None):
+    stop.wait(30)
+
+
+def test_failed_worker_gets_a_fresh_session_without_touching_other_devices():
+    failing, steady = Sessions(), Sessions()
+
+    def flaky(session, stop=None):
+        if session.number < 3:
+            raise RuntimeError("boom")
+        stop.wait(30)
+
+    supervisor = DeviceSupervisor(restart_delay=0.01)
+    device = supervisor.add("flaky", failing, flaky)
+    other = supervisor.add("steady", steady, idle)
+    supervisor.start()
+    try:
+        wait_until(lambda: len(failing.opened) == 3 and device.state == "running")
+        assert device.restarts == 2
+        assert all(session.quit_called for session in failing.opened[:2])
+        assert len(steady.opened) == 1 and other.restarts == 0
+    finally:
+        supervisor.stop()
+    assert device.state == other.state == "stopped"
+
+
+def test_helper_is_restarted_alone_within_the_session():
+    sessions = Sessions()
+    calls = []
+
+    def helper(session, stop=None):
+        calls.append(session.number)
+        if len(calls) < 2:
+            raise RuntimeError("tap failed")
+        stop.wait(30)
+
+    supervisor = DeviceSupervisor(restart_delay=0.01)
+    device = supervisor.add("device", sessions, idle, helpers=[helper])
+    supervisor.start()
+    try:
+        wait_until(lambda: len(calls) == 2)
+        assert calls == [1, 1]
+        assert device.helper_restarts == 1 and device.restarts == 0
+    finally:
+        supervisor.stop()
+
+
+def test_lost_session_in_helper_restarts_the_worker():
+    sessions = Sessions()
+
+    def helper(session, stop=None):
+        if session.number == 1:
+            raise InvalidSessionIdException("session is either terminated or not started")
+        stop.wait(30)
+
+    supervisor = DeviceSupervisor(restart_delay=0.01)
+    device = supervisor.add("device", sessions, idle, helpers=[helper])
+    supervisor.start()
+    try:
+        wait_until(lambda: len(sessions.opened) == 2 and device.state == "running")
+        assert device.restarts == 1
+        assert "InvalidSessionIdException" in device.last_error
+    finally:
+        supervisor.stop()
+
+
+def test_repeated_helper_failures_restart_the_worker():
+    sessions = Sessions()
+
+    def helper(session, stop=None):
+        if session.number == 1:
+            raise RuntimeError("appium server unreachable")
+        stop.wait(30)
+
+    supervisor = DeviceSupervisor(restart_delay=0.01, helper_failures=3)
+    device = supervisor.add("device", sessions, idle, helpers=[helper])
+    supervisor.start()
+    try:
+        wait_until(lambda: len(sessions.opened) == 2)
+        assert device.helper_restarts == 2 and device.restarts == 1
+    finally:
+        supervisor.stop()
@@ -0,0 +1,33 @@
+import pytest
+from download_progress import DownloadProgress, parse_progress
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("45% of 3.15 GB", (45.0, 3150.0)),
+    ("Downloading 1.2 GB of 3.1 GB, 38%", (38.0, 3100.0)),
+    ("12% of 850 MB", (12.0, 850.0)),
+])
+def test_parse_progress_uses_decimal_units(text, expected):
+    assert parse_progress(text) == pytest.approx(expected)
+
+
+def test_parse_progress_without_progress():
+    assert parse_progress("Waiting for download") == (None, None)
+
+
+def test_store_size_and_device_counters_agree():
+    # 1 GB on the store page and 1e9 bytes from the counters are the same download
+    from_store = DownloadProgress(start_time=0)
+    from_store.record("100% of 1 GB", timestamp=80)
+    from_counters = DownloadProgress(start_time=0)
+    from_counters.record("100%", timestamp=80)
+    from_counters.received_mb = 1_000_000_000 / 1e6
+    assert from_store.average_mbps() == pytest.approx(from_counters.average_mbps()) == pytest.approx(100.0)
+
+
+def test_curve_and_milestones():
+    progress = DownloadProgress(start_time=0)
+    for second, percent in [(10, 20), (20, 60), (30, 100)]:
+        progress.record(f"{percent}% of 1 GB", timestamp=second)
+    assert [round(mbps) for _, _, mbps in progress.curve()] == [160, 320, 320]
+    assert progress.milestones((10, 50, 100)) == {10: 5.0, 50: 17.5, 100: 30.0}
@@ -0,0 +1,112 @@
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+from selenium.webdriver.support import expected_conditions as EC
+from element_cache import ElementCache
+
+LOCATOR = ("xpath", "//android.widget.Switch")
+
+
+class FakeElement:
+    def __init__(self, displayed=True):
+        self.displayed = displayed
+        self.stale = False
+
+    def is_displayed(self):
+        if self.stale:
+            raise StaleElementReferenceException("stale")
+        return self.displayed
+
+    def is_enabled(self):
+        return True
+
+    @property
+    def text(self):
+        if self.stale:
+            raise StaleElementReferenceException("stale")
+        return "Wi-Fi"
+
+
+class FakeDriver:
+    def __init__(self):
+        self.elements = [FakeElement()]
+        self.lookups = 0
+
+    def find_element(self, by, value):
+        self.lookups += 1
+        return self.elements[-1]
+
+    def find_elements(self, by, value):
+        self.lookups += 1
+        return self.elements[-1:]
+
+
+def test_hits_are_counted_only_for_live_cached_elements():
+    driver = FakeDriver()
+    cache = ElementCache(driver)
+    assert cache.text(LOCATOR) == "Wi-Fi"
+    assert cache.text(LOCATOR) == "Wi-Fi"
+    assert (cache.hits, cache.misses, driver.lookups) == (1, 1, 1)
+
+    driver.elements[-1].stale = True
+    driver.elements.append(FakeElement())
+    assert cache.text(LOCATOR) == "Wi-Fi"
+    assert (cache.hits, cache.misses, cache.stale) == (1, 2, 1)
+
+
+def test_wait_evaluates_the_condition_on_the_cached_element():
+    driver = FakeDriver()
+    cache = ElementCache(driver)
+    element = cache.wait(LOCATOR, 1, EC.visibility_of_element_located)
+    assert element is driver.elements[-1]
+    assert cache.wait(LOCATOR, 1, EC.visibility_of_element_located) is element
+    assert (cache.hits, cache.misses, driver.lookups) == (1, 1, 1)
+
+    # The cached element is now hidden; a replacement becomes visible
+    element.displayed = False
+    driver.elements.append(FakeElement())
+    assert cache.wait(LOCATOR, 1, EC.visibility_of_element_located) is driver.elements[-1]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_wait_replaces_a_stale_cached_element():
+    driver = FakeDriver()
+    cache = ElementCache(driver)
+    cache.wait(LOCATOR, 1)
+    driver.elements[-1].stale = True
+    driver.elements.append(FakeElement())
+    assert cache.wait(LOCATOR, 1, EC.element_to_be_clickable) is driver.elements[-1]
+    assert cache.hits == 0
+
+
+class TextDriver:
+    """Driver that matches one live element against the text in the locator."""
+
+    def __init__(self, text):
+        self.element = FakeElement()
+        self.element_text = text
+        self.lookups = 0
+
+    def find_element(self, by, value):
+        self.lookups += 1
+        if f"'{self.element_text}'" not in value:
+            raise NoSuchElementException(value)
+        return self.element
+
+
+def test_text_locators_are_rechecked_when_the_live_element_changes_text():
+    driver = TextDriver("Connected")
+    cache = ElementCache(driver, max_age=60)
+    connected = ("xpath", "//android.widget.TextView[@resource-id='summary' and contains(@text,'Connected')]")
+    assert cache.is_present(connected)
+    assert cache.is_present(connected)
+    # Settings reuses the summary TextView: same live handle, new text
+    driver.element_text = "Disconnected"
+    assert not cache.is_present(connected)
+    assert driver.lookups == 3 and cache.hits == 0
+
+
+def test_locators_without_text_predicates_stay_cached():
+    driver = TextDriver("Wi-Fi")
+    cache = ElementCache(driver)
+    switch = ("xpath", "//android.widget.Switch[@content-desc='Wi-Fi']")
+    assert cache.is_present(switch) and cache.is_present(switch)
+    assert driver.lookups == 1 and cache.hits == 1
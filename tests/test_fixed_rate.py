@@ -0,0 +1,97 @@
+import threading
+import pytest
+import fixed_rate
+from fixed_rate import COALESCE, SKIP, FixedRateSampler
+
+
+class FakeClock:
+    """Stands in for the time module; sleep() and work() advance the clock instantly."""
+
+    def __init__(self, start=1000.0):
+        self.now = start
+        self.wall_offset = 1_700_000_000.0 - start
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now + self.wall_offset
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def work(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(fixed_rate, "time", clock)
+    return clock
+
+
+def test_no_drift_with_variable_work(clock):
+    sampler = FixedRateSampler(0.5)
+    start, started = clock.time(), clock.monotonic()
+    ticks = []
+    for n, tick in enumerate(sampler):
+        ticks.append(tick)
+        clock.work(0.01 + (n % 5) * 0.09)
+        if len(ticks) == 1000:
+            break
+    assert ticks == pytest.approx([start + n * 0.5 for n in range(1000)])
+    # The 1000th tick fires on its deadline, not 1000 iterations of work later
+    assert clock.monotonic() - started == pytest.approx(999 * 0.5 + 0.37)
+    stats = sampler.stats()
+    assert stats["ticks"] == 1000 and stats["skipped"] == 0 and stats["coalesced"] == 0
+    assert stats["achieved_hz"] == pytest.approx(2.0)
+    assert stats["jitter_max_ms"] == 0
+
+
+@pytest.mark.parametrize("on_overrun, ticks, skipped, coalesced", [(SKIP, 3, 2, 0), (COALESCE, 4, 0, 1)])
+def test_overrun_skips_or_coalesces_missed_ticks(clock, on_overrun, ticks, skipped, coalesced):
+    sampler = FixedRateSampler(1.0, on_overrun=on_overrun)
+    start = clock.time()
+    seen = []
+    for tick in sampler:
+        seen.append(tick - start)
+        if len(seen) == 2:
+            clock.work(2.5)  # Overruns the ticks due at 2 and 3
+        if len(seen) == ticks:
+            break
+    assert (sampler.ticks, sampler.skipped, sampler.coalesced) == (ticks, skipped, coalesced)
+    if on_overrun == SKIP:
+        assert seen == [0, 1, 4]
+    else:
+        assert seen == [0, 1, 3, 4]
+        assert sampler.stats()["jitter_max_ms"] == pytest.approx(500)
+
+
+def test_stop_event_ends_iteration():
+    stop = threading.Event()
+    sampler = FixedRateSampler(0.01, stop=stop)
+    calls = []
+
+    def callback(tick):
+        calls.append(tick)
+        if len(calls) == 5:
+            stop.set()
+
+    stats = sampler.run(callback)
+    assert len(calls) == 5 and stats["ticks"] == 5
+    assert list(FixedRateSampler(0.01, stop=stop)) == []
+
+
+def test_callback_returning_false_stops_run(clock):
+    sampler = FixedRateSampler(1.0)
+    assert sampler.run(lambda tick: False)["ticks"] == 1
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        FixedRateSampler(0)
+    with pytest.raises(ValueError):
+        FixedRateSampler(1, on_overrun="drop")
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from net_timeline import COUNTER_WRAP, NetDevTimeline, counter_deltas
+
+NET_DEV = """Inter-|   Receive                                                |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed
+    lo: {lo} 10 0 0 0 0 0 0 {lo} 10 0 0 0 0 0 0
+ wlan0: {rx} 100 0 0 0 0 0 0 {tx} 50 0 0 0 0 0 0
+"""
+
+
+def sample(rx, tx, lo=0):
+    return NET_DEV.format(rx=rx, tx=tx, lo=lo)
+
+
+def test_counter_deltas_wrap_reset_and_gaps():
+    deltas = counter_deltas([100, 300, COUNTER_WRAP - 50, 150, 1000, 200, np.nan, 500, 700])
+    assert deltas[:5].tolist() == [200, COUNTER_WRAP - 350, 200, 850, 200]
+    assert np.isnan(deltas[5]) and np.isnan(deltas[6])
+    assert deltas[7] == 200
+
+
+def test_counter_deltas_reset_from_upper_half_of_32_bit_range():
+    # Dropping less than half the range cannot be a wrap of a counter that advanced normally
+    assert counter_deltas([3_000_000_000, 2_000_000_000]).tolist() == [2_000_000_000]
+    # Dropping to near zero looks like a wrap, unless the implied rate is impossible for the interval
+    assert counter_deltas([3_000_000_000, 100]).tolist() == [COUNTER_WRAP - 3_000_000_000 + 100]
+    assert counter_deltas([3_000_000_000, 100], [1.0]).tolist() == [100]
+    assert counter_deltas([COUNTER_WRAP - 1_000, 100], [1.0]).tolist() == [1_100]
+
+
+def test_reset_from_upper_half_does_not_spike_throughput():
+    timeline = NetDevTimeline()
+    timeline.add(sample(3_000_000_000, 0), timestamp=0.0)
+    timeline.add(sample(1_000_000, 0), timestamp=1.0)
+    _, _, _, _, _, rx_mbps, _ = timeline.throughput("wlan0")
+    assert rx_mbps.tolist() == pytest.approx([8.0])
+
+
+def test_counter_deltas_reset_from_upper_half_of_64_bit_counter():
+    # A 64-bit counter above the 32-bit range that drops was reset, not wrapped
+    deltas = counter_deltas([COUNTER_WRAP * 3, 4000])
+    assert deltas.tolist() == [4000]
+
+
+def test_throughput_and_summary_per_state():
+    timeline = NetDevTimeline()
+    timeline.add(sample(0, 0, lo=0), timestamp=0.0, state="buffering")
+    timeline.add(sample(1_000_000, 100_000, lo=9_000_000), timestamp=1.0, state="buffering")
+    timeline.add(sample(3_500_000, 200_000, lo=9_000_000), timestamp=2.0, state="playing")
+    timeline.add(sample(6_000_000, 300_000, lo=9_000_000), timestamp=3.0, state="playing")
+    assert timeline.busiest_interface() == "wlan0"
+    elapsed, interval, states, rx_bytes, _, rx_mbps, tx_mbps = timeline.throughput()
+    assert elapsed.tolist() == [1.0, 2.0, 3.0]
+    assert states.tolist() == ["buffering", "playing", "playing"]
+    assert rx_mbps.tolist() == pytest.approx([8.0, 20.0, 20.0])
+    assert tx_mbps.tolist() == pytest.approx([0.8, 0.8, 0.8])
+    rows = {row[0]: row for row in timeline.summary()}
+    assert rows["all"][1:6] == [3, 3.0, 16.0, 20.0, 0.8]
+    assert rows["playing"][1:5] == [2, 2.0, 20.0, 20.0]
+    assert rows["buffering"][7] == 1.0
+
+
+def test_interface_missing_from_some_samples_is_a_gap():
+    timeline = NetDevTimeline()
+    timeline.add("Inter-|\n face |\n    lo: 0 0 0 0 0 0 0 0 0 0\n", timestamp=0.0)
+    timeline.add(sample(1_000_000, 0), timestamp=1.0)
+    timeline.add(sample(2_000_000, 0), timestamp=2.0)
+    _, _, _, rx_bytes, _, _, _ = timeline.throughput("wlan0")
+    assert np.isnan(rx_bytes[0]) and rx_bytes[1] == 1_000_000
+    assert timeline.summary("wlan0")[0][2:4] == [1.0, 8.0]
@@ -0,0 +1,112 @@
+import threading
+import pytest
+from result_sinks import CsvSink, WriteBehindSink
+
+
+class FailingSink(WriteBehindSink):
+    """Accepts rows until fail is set, then every batch write raises."""
+
+    def __init__(self, *args, **kwargs):
+        self.fail = threading.Event()
+        self.batches = []
+        super().__init__(*args, **kwargs)
+
+    def _open(self):
+        pass
+
+    def _write_batch(self, rows):
+        if self.fail.is_set():
+            raise OSError("disk full")
+        self.batches.append(rows)
+
+    def _close(self):
+        pass
+
+    def rows(self):
+        for batch in self.batches:
+            yield from batch
+
+
+def run_with_timeout(function, timeout=5):
+    """Runs function on a thread and fails the test if it blocks."""
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = function()
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "call blocked"
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome.get("result")
+
+
+def test_csv_sink_round_trip(tmp_path):
+    path = str(tmp_path / "results.csv")
+    with CsvSink(path, ["a", "b"]) as sink:
+        sink.write([1, 2])
+        sink.write([3, 4])
+    with CsvSink(path, ["a", "b"]) as sink:
+        sink.write([5, 6])
+        sink.flush()
+        assert list(sink.rows()) == [["1", "2"], ["3", "4"], ["5", "6"]]
+    with open(path) as csv_file:
+        assert csv_file.read().count("a,b") == 1
+
+
+def test_writer_error_is_raised_by_flush_and_close():
+    sink = FailingSink("failing", ["a"], flush_interval=60)
+    sink.fail.set()
+    sink.write([1])
+    with pytest.raises(OSError):
+        run_with_timeout(sink.flush)
+    with pytest.raises(OSError):
+        sink.write([2])
+    for _ in range(2):
+        with pytest.raises(OSError):
+            run_with_timeout(sink.close)
+    assert not sink._thread.is_alive()
+
+
+def test_row_queued_after_writer_failed_does_not_block_flush():
+    sink = FailingSink("failing", ["a"], flush_interval=60)
+    sink.fail.set()
+    sink.write([1])
+    with pytest.raises(OSError):
+        run_with_timeout(sink.flush)
+    # A write that passed the closed check just before the writer failed
+    sink._queue.put([2])
+    with pytest.raises(OSError):
+        run_with_timeout(sink.flush)
+    with pytest.raises(OSError):
+        run_with_timeout(lambda: sink.export_excel("unused.xlsx"))
+
+
+def test_open_error_is_raised_by_constructor(tmp_path):
+    with pytest.raises(OSError):
+        CsvSink(str(tmp_path / "missing" / "results.csv"), ["a"])
+
+
+def test_close_error_is_raised():
+    class CloseFails(FailingSink):
+        def _close(self):
+            raise OSError("close failed")
+
+    sink = CloseFails("closing", ["a"])
+    sink.write([1])
+    with pytest.raises(OSError, match="close failed"):
+        run_with_timeout(sink.close)
+
+
+def test_sink_without_storage_methods_cannot_be_created():
+    class Incomplete(WriteBehindSink):
+        def _open(self):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", ["a"])
@@ -0,0 +1,78 @@
+import math
+import numpy as np
+import pytest
+from speed_test_stats import AdaptiveTrialPlan, group_statistics, t_critical
+
+# Published two-sided t critical values beyond the table (df 40, 60, 120)
+T_TABLE_LARGE_DF = {
+    0.90: [1.684, 1.671, 1.658],
+    0.95: [2.021, 2.000, 1.980],
+    0.99: [2.704, 2.660, 2.617],
+}
+
+
+def test_t_critical_table_and_expansion():
+    assert t_critical([4, 9], 0.95) == pytest.approx([2.776, 2.262])
+    assert math.isnan(t_critical(0)) and math.isnan(t_critical(-1))
+    for confidence, expected in T_TABLE_LARGE_DF.items():
+        assert t_critical([40, 60, 120], confidence) == pytest.approx(expected, abs=1e-3)
+    with pytest.raises(ValueError):
+        t_critical(5, 0.8)
+
+
+@pytest.mark.parametrize("confidence", [0.90, 0.95, 0.99])
+def test_t_critical_matches_scipy(confidence):
+    stats = pytest.importorskip("scipy.stats")
+    df = np.arange(1, 200)
+    expected = stats.t.ppf(0.5 + confidence / 2, df)
+    assert t_critical(df, confidence) == pytest.approx(expected, rel=1e-3)
+
+
+def test_group_statistics_match_numpy():
+    rng = np.random.default_rng(7)
+    groups = rng.choice(["a", "b", "c"], size=60)
+    values = rng.normal(50, 10, size=(60, 2))
+    values[::7, 1] = np.nan
+    keys, counts, stats = group_statistics(groups, values)
+    assert list(keys) == ["a", "b", "c"]
+    for g, key in enumerate(keys):
+        for column in range(2):
+            samples = values[groups == key, column]
+            samples = samples[~np.isnan(samples)]
+            n = len(samples)
+            half_width = t_critical(n - 1) * np.std(samples, ddof=1) / math.sqrt(n)
+            assert counts[g, column] == n
+            assert stats["mean"][g, column] == pytest.approx(np.mean(samples))
+            assert stats["median"][g, column] == pytest.approx(np.median(samples))
+            assert stats["p5"][g, column] == pytest.approx(np.percentile(samples, 5))
+            assert stats["p95"][g, column] == pytest.approx(np.percentile(samples, 95))
+            assert stats["std"][g, column] == pytest.approx(np.std(samples, ddof=1))
+            assert stats["ci_low"][g, column] == pytest.approx(np.mean(samples) - half_width)
+            assert stats["ci_high"][g, column] == pytest.approx(np.mean(samples) + half_width)
+
+
+def test_group_statistics_small_and_empty_groups():
+    keys, counts, stats = group_statistics(["x", "y", "y"], [[3.0], [np.nan], [np.nan]])
+    assert counts[:, 0].tolist() == [1, 0]
+    assert stats["mean"][0, 0] == 3.0 and stats["median"][0, 0] == 3.0
+    assert math.isnan(stats["std"][0, 0]) and math.isnan(stats["ci_low"][0, 0])
+    assert all(math.isnan(stats[name][1, 0]) for name in ("mean", "median", "p5", "std"))
+    keys, counts, stats = group_statistics([], np.empty((0, 2)))
+    assert len(keys) == 0 and counts.shape == (0, 2)
+
+
+def run_plan(plan, speeds):
+    trials = 0
+    for trial in plan:
+        plan.record(*speeds[trial])
+        trials += 1
+    return trials
+
+
+def test_adaptive_plan_stops_early_on_typical_wifi_variance():
+    # Download and upload vary by about 5%, which the default tolerance accepts at 3 trials
+    speeds = [(100, 40), (95, 42), (105, 38), (100, 40)]
+    assert run_plan(AdaptiveTrialPlan(3, 4), speeds) == 3
+    assert run_plan(AdaptiveTrialPlan(3, 4, adaptive=False), speeds) == 4
+    # Widely varying speeds run to the cap
+    assert run_plan(AdaptiveTrialPlan(3, 4), [(100, 40), (60, 20), (140, 60), (90, 45)]) == 4
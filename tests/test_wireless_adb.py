@@ -0,0 +1,72 @@
+import threading
+import time
+from wireless_adb import WirelessAdbManager
+
+ADDRESS = "10.0.0.5:5555"
+
+
+class FakeAdb:
+    """AdbClient stand-in whose probe blocks for delay seconds, then answers or raises error."""
+
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.connects = 0
+        self.probes = 0
+        self._lock = threading.Lock()
+
+    def connect(self, address):
+        with self._lock:
+            self.connects += 1
+
+    def run(self, serial, command, timeout=30):
+        with self._lock:
+            self.probes += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return "ok\n"
+
+    def close(self):
+        pass
+
+
+def manager(client):
+    return WirelessAdbManager([dict(deviceName="phone", ipAddress=ADDRESS)], client=client, interval=60)
+
+
+def test_ensure_and_keepalive_do_not_reconnect_concurrently():
+    client = FakeAdb(delay=0.2)
+    wireless = manager(client)
+    threads = [threading.Thread(target=wireless.ensure, args=(ADDRESS,)) for _ in range(3)]
+    threads.append(threading.Thread(target=wireless.check_all))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert client.connects == 1
+    assert wireless.connections[ADDRESS].connected
+    assert wireless.connections[ADDRESS].reconnects == 0
+
+
+def test_timed_out_probe_is_waited_on_once():
+    client = FakeAdb(delay=0.2)
+    wireless = manager(client)
+    assert wireless.ensure(ADDRESS, timeout=1)
+    client.error = TimeoutError("timed out")
+    start = time.monotonic()
+    assert not wireless.ensure(ADDRESS, timeout=0.3)
+    assert time.monotonic() - start < 0.35
+    assert client.probes == 2
+    assert client.connects == 1
+    assert wireless.connections[ADDRESS].probe_timed_out
+
+
+def test_broken_probe_reconnects_inline():
+    client = FakeAdb()
+    wireless = manager(client)
+    assert wireless.ensure(ADDRESS, timeout=1)
+    client.error = ConnectionResetError("closed")
+    assert not wireless.ensure(ADDRESS, timeout=0)
+    assert client.connects == 2
+    assert client.probes == 3
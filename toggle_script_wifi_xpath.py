@@ -3,12 +3,15 @@ import logging
 import os
 import time
 from datetime import datetime
-import openpyxl
 from appium import webdriver
 from appium.options.android import UiAutomator2Options
 from appium.webdriver.common.appiumby import AppiumBy
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
+from element_cache import ElementCache
+from command_metrics import maybe_instrument
+from result_sinks import open_sink
+from wifi_toggle import run_device_toggles
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -17,19 +20,23 @@ logging.basicConfig(level=logging.INFO)
 with open('device_configs.json') as config_file:
     config_data = json.load(config_file)
 
+# Toggle with cmd/svc wifi over adb and time associate/IP/validated instead of clicking the
+# Settings switch and sleeping; the next toggle starts as soon as the link is stable
+adb_toggle_mode = True
+
 
 def toggle_wifi(device_config, num_toggles):
     logging.info(f"Starting Wi-Fi automation on {device_config['deviceName']} with {num_toggles} toggles.")
 
+    if adb_toggle_mode:
+        run_device_toggles(device_config, num_toggles,
+                           f"C:\\Users\\actio\\Documents\\SSID-RSSI-VALUES\\{device_config['deviceUniqueId']}_wifi_reconnect.csv")
+        return
+
     # Excel file setup
     excel_file_path = f"C:\\Users\\actio\\Documents\\SSID-RSSI-VALUES\\{device_config['deviceUniqueId']}_wifi_stats.xlsx"
-    if os.path.exists(excel_file_path):
-        workbook = openpyxl.load_workbook(excel_file_path)
-        sheet = workbook.active
-    else:
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        sheet.append(["Timestamp", "SSID", "Wi-Fi Status"])
+    csv_file_path = os.path.splitext(excel_file_path)[0] + ".csv"
+    sink = open_sink(csv_file_path, ["Timestamp", "SSID", "Wi-Fi Status"], excel_path=excel_file_path)
 
     # Initialize the Appium driver
     options = UiAutomator2Options()
@@ -41,34 +48,40 @@ def toggle_wifi(device_config, num_toggles):
     options.app_activity = device_config['appActivity']
     options.no_reset = True
     driver = webdriver.Remote("http://localhost:4723/wd/hub", options=options)
+    maybe_instrument(driver)
+
+    cache = ElementCache(driver, device_config['deviceName'])
+    wifi_switch = (AppiumBy.XPATH, "//android.widget.Switch[@content-desc='Wi-Fi']")
 
     try:
-        wifi_toggle = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((AppiumBy.XPATH, "//android.widget.Switch[@content-desc='Wi-Fi']"))
-        )
+        cache.wait(wifi_switch, 10)
 
         for i in range(num_toggles):
             logging.info(f"Toggle {i + 1}/{num_toggles}: Turning Wi-Fi off.")
-            wifi_toggle.click()
+            cache.click(wifi_switch)
             time.sleep(2)
 
             logging.info(f"Toggle {i + 1}/{num_toggles}: Turning Wi-Fi on.")
-            wifi_toggle.click()
+            cache.click(wifi_switch)
             time.sleep(20)  # Wait for connection to stabilize
 
             ssid_element = WebDriverWait(driver, 10).until(
                 EC.presence_of_element_located((AppiumBy.XPATH, "//androidx.recyclerview.widget.RecyclerView[@resource-id='com.android.settings:id/connected_list']//android.widget.TextView[@resource-id='com.android.settings:id/title']"))
             )
             ssid = ssid_element.text if ssid_element else "N/A"
-            wifi_status = "ON" if wifi_toggle.get_attribute("checked") == "true" else "OFF"
+            wifi_status = "ON" if cache.attribute(wifi_switch, "checked") == "true" else "OFF"
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            sheet.append([timestamp, ssid, wifi_status])
+            sink.write([timestamp, ssid, wifi_status])
             logging.info(f"Recorded: {timestamp}, {ssid}, {wifi_status}")
 
     finally:
-        workbook.save(excel_file_path)
-        logging.info(f"Results saved to {excel_file_path}")
-        driver.quit()
+        cache.log_stats()
+        try:
+            driver.quit()
+        finally:
+            sink.close()
+            sink.export_excel(excel_file_path)
+            logging.info(f"Results saved to {excel_file_path}")
 
 
 num_toggles = int(input("Enter the number of Wi-Fi toggles: "))
@@ -3,13 +3,15 @@ import logging
 import os
 import time
 from datetime import datetime
-import openpyxl
 from appium import webdriver
 from appium.options.android import UiAutomator2Options
 from appium.webdriver.common.appiumby import AppiumBy
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from command_metrics import maybe_instrument
+from result_sinks import open_sink
+from wifi_toggle import run_device_toggles
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -18,13 +20,22 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 with open('device_configs.json') as config_file:
     config_data = json.load(config_file)
 
+# Toggle with cmd/svc wifi over adb and time associate/IP/validated instead of clicking the
+# Settings switch and sleeping; the next toggle starts as soon as the link is stable
+adb_toggle_mode = True
+
 
 def toggle_wifi(device_config, num_toggles):
     logging.info(f"Starting Wi-Fi automation on {device_config['deviceName']} with {num_toggles} toggles.")
 
+    if adb_toggle_mode:
+        run_device_toggles(device_config, num_toggles,
+                           f"C:\\Users\\actio\\Documents\\SSID-RSSI-VALUES\\{device_config['deviceUniqueId']}_wifi_reconnect.csv")
+        return
+
     # Set up the Excel file for storing results
     excel_file_path = f"C:\\Users\\actio\\Documents\\SSID-RSSI-VALUES\\{device_config['deviceUniqueId']}_wifi_stats.xlsx"
-    workbook, sheet = prepare_excel_file(excel_file_path)
+    sink = prepare_results_sink(excel_file_path)
 
     # Initialize the Appium driver with device configurations
     driver = initialize_driver(device_config)
@@ -45,7 +56,7 @@ def toggle_wifi(device_config, num_toggles):
 
             ssid, connection_detail = fetch_connection_details(driver)
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            sheet.append([timestamp, ssid, connection_detail])
+            sink.write([timestamp, ssid, connection_detail])
             logging.info(f"Recorded: {timestamp}, {ssid}, {connection_detail}")
 
             time.sleep(40)  # Additional sleep after each run to ensure stability and proper intervals
@@ -54,18 +65,18 @@ def toggle_wifi(device_config, num_toggles):
         logging.error(f"Error occurred on {device_config['deviceName']}: {str(e)}")
 
     finally:
-        workbook.save(excel_file_path)
-        logging.info(f"Results saved to {excel_file_path}")
-        driver.quit()
+        try:
+            driver.quit()
+        finally:
+            sink.close()
+            sink.export_excel(excel_file_path)
+            logging.info(f"Results saved to {excel_file_path}")
 
 
-def prepare_excel_file(path):
-    if os.path.exists(path):
-        workbook = openpyxl.load_workbook(path)
-    else:
-        workbook = openpyxl.Workbook()
-        workbook.active.append(["Timestamp", "SSID", "Connection Detail"])
-    return workbook, workbook.active
+def prepare_results_sink(path):
+    # Rows are checkpointed to a CSV next to the workbook, which is exported at the end
+    csv_path = os.path.splitext(path)[0] + ".csv"
+    return open_sink(csv_path, ["Timestamp", "SSID", "Connection Detail"], excel_path=path)
 
 
 def initialize_driver(config):
@@ -77,7 +88,9 @@ def initialize_driver(config):
     options.app_package = config['appPackage']
     options.app_activity = config['appActivity']
     options.no_reset = True
-    return webdriver.Remote("http://localhost:4723/wd/hub", options=options)
+    driver = webdriver.Remote("http://localhost:4723/wd/hub", options=options)
+    maybe_instrument(driver)
+    return driver
 
 
 def fetch_connection_details(driver):
@@ -0,0 +1,82 @@
+import logging
+
+# UiAutomator2 server defaults, restored between benchmark runs
+DEFAULT_SETTINGS = {
+    "waitForIdleTimeout": 10000,
+    "waitForSelectorTimeout": 10000,
+    "ignoreUnimportantViews": False,
+}
+
+# Per-scenario settings profiles. "settings" go through update_settings once the
+# session is up; "disable_animations" is a capability and must be set before it starts.
+# Screens with video never go idle, so waiting for idle only adds latency there.
+# ignoreUnimportantViews (compressed layout hierarchy) drops layout-only containers,
+# which breaks XPaths that step through them, so it is only on for id-based locators.
+SETTINGS_PROFILES = {
+    "default": {
+        "settings": dict(DEFAULT_SETTINGS),
+        "disable_animations": False,
+    },
+    "video": {
+        "settings": {
+            "waitForIdleTimeout": 0,
+            "waitForSelectorTimeout": 0,
+            "ignoreUnimportantViews": False,
+        },
+        "disable_animations": True,
+    },
+    "video_stats": {
+        "settings": {
+            "waitForIdleTimeout": 0,
+            "waitForSelectorTimeout": 0,
+            "ignoreUnimportantViews": True,
+        },
+        "disable_animations": True,
+    },
+    "live_camera": {
+        "settings": {
+            "waitForIdleTimeout": 0,
+            "waitForSelectorTimeout": 0,
+            "ignoreUnimportantViews": False,
+        },
+        "disable_animations": True,
+    },
+    "settings_screen": {
+        "settings": {
+            "waitForIdleTimeout": 100,
+            "waitForSelectorTimeout": 0,
+            "ignoreUnimportantViews": False,
+        },
+        "disable_animations": True,
+    },
+    "speed_test": {
+        "settings": {
+            "waitForIdleTimeout": 100,
+            "waitForSelectorTimeout": 0,
+            "ignoreUnimportantViews": False,
+        },
+        "disable_animations": True,
+    },
+}
+
+
+def get_profile(name):
+    """Returns a settings profile by name."""
+    if name not in SETTINGS_PROFILES:
+        raise ValueError(f"Unknown settings profile '{name}'. Available: {', '.join(SETTINGS_PROFILES)}")
+    return SETTINGS_PROFILES[name]
+
+
+def apply_profile_options(options, name):
+    """Sets the capabilities a profile needs before the session starts."""
+    if get_profile(name)["disable_animations"]:
+        options.disable_window_animation = True
+    return options
+
+
+def apply_profile(driver, name):
+    """Applies a profile's UiAutomator2 settings to a running session."""
+    settings = get_profile(name)["settings"]
+    driver.update_settings(settings)
+    logging.info(f"Applied UiAutomator2 settings profile '{name}': {settings}")
+    return settings
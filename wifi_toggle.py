@@ -0,0 +1,166 @@
+import argparse
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from adb_client import AdbClient, AdbError
+from appium_session import device_name, device_udid, load_devices
+from result_sinks import open_sink
+
+# Seconds between link state polls
+POLL_INTERVAL = 0.1
+# Seconds to wait for Wi-Fi to go down, or to come back and validate
+TOGGLE_TIMEOUT = 60
+# Seconds the link must stay validated before the next toggle starts
+STABLE_FOR = 2.0
+
+# Android 11+ toggling; svc wifi is used on devices without cmd wifi
+CMD_WIFI = {True: "cmd wifi set-wifi-enabled enabled", False: "cmd wifi set-wifi-enabled disabled"}
+SVC_WIFI = {True: "svc wifi enable", False: "svc wifi disable"}
+
+# One round trip reads association, the wlan0 address and the Wi-Fi network agent
+LINK_STATE_COMMAND = ("{ cmd wifi status 2>/dev/null || dumpsys wifi; } | grep -m1 -E 'Wifi is connected to|mWifiInfo'; "
+                      "ip -4 addr show wlan0 | grep inet; "
+                      "dumpsys connectivity | grep -m1 'NetworkAgentInfo.*WIFI'")
+
+ASSOCIATED_PATTERN = re.compile(r'Wifi is connected to "?([^"\n]*)"?|SSID: "?([^",]*)"?,.*Supplicant state: COMPLETED')
+IP_PATTERN = re.compile(r"inet (\d+\.\d+\.\d+\.\d+)")
+VALIDATED_PATTERN = re.compile(r"&VALIDATED|lastValidated\{true\}")
+
+TOGGLE_HEADERS = ["Timestamp", "Toggle", "Method", "Off (ms)", "Associated (ms)", "IP (ms)", "Validated (ms)",
+                  "SSID", "IP Address"]
+
+
+def parse_link_state(output):
+    """Returns {"associated", "ssid", "ip", "validated"} from LINK_STATE_COMMAND output."""
+    associated = ASSOCIATED_PATTERN.search(output)
+    ip_address = IP_PATTERN.search(output)
+    agent = next((line for line in output.splitlines() if "NetworkAgentInfo" in line), "")
+    return {
+        "associated": associated is not None,
+        "ssid": (associated.group(1) or associated.group(2)) if associated else None,
+        "ip": ip_address.group(1) if ip_address else None,
+        "validated": bool(agent and VALIDATED_PATTERN.search(agent)),
+    }
+
+
+class WifiToggler:
+    """Toggles Wi-Fi on one device over its persistent adb shell and times the reconnect."""
+
+    def __init__(self, serial, client=None, poll_interval=POLL_INTERVAL):
+        self.serial = serial
+        self.client = client or AdbClient()
+        self.poll_interval = poll_interval
+        self.method = None
+
+    def link_state(self):
+        return parse_link_state(self.client.run(self.serial, LINK_STATE_COMMAND))
+
+    def set_wifi(self, enabled):
+        """Turns Wi-Fi on or off with cmd wifi, falling back to svc wifi on older devices."""
+        if self.method in (None, "cmd wifi"):
+            output = self.client.run(self.serial, CMD_WIFI[enabled])
+            if self.client.persistent_shell(self.serial).last_status == 0 and "Unknown" not in output:
+                self.method = "cmd wifi"
+                return
+            if self.method is None:
+                logging.info(f"[{self.serial}] cmd wifi unavailable ({output.strip()}), using svc wifi.")
+        self.client.run(self.serial, SVC_WIFI[enabled])
+        if self.client.persistent_shell(self.serial).last_status != 0:
+            raise AdbError(f"Could not turn Wi-Fi {'on' if enabled else 'off'} on {self.serial}")
+        self.method = "svc wifi"
+
+    def _poll_until(self, done, timeout):
+        """Polls the link state until done(state) holds; returns (ms waited, state) or (None, state)."""
+        start = time.perf_counter()
+        while True:
+            state = self.link_state()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if done(state):
+                return round(elapsed_ms), state
+            if elapsed_ms > timeout * 1000:
+                return None, state
+            time.sleep(self.poll_interval)
+
+    def toggle(self, timeout=TOGGLE_TIMEOUT, stable_for=STABLE_FOR):
+        """Turns Wi-Fi off and on again and returns the off/associate/IP/validated times in ms."""
+        self.set_wifi(False)
+        off_ms, _ = self._poll_until(lambda state: not state["associated"] and not state["ip"], timeout)
+
+        self.set_wifi(True)
+        start = time.perf_counter()
+        milestones = {"associated": None, "ip": None, "validated": None}
+        state = {}
+        stable_since = None
+        while (time.perf_counter() - start) < timeout:
+            state = self.link_state()
+            now = time.perf_counter()
+            for name in milestones:
+                if milestones[name] is None and state[name]:
+                    milestones[name] = round((now - start) * 1000)
+            if state["associated"] and state["ip"] and state["validated"]:
+                stable_since = stable_since or now
+                if now - stable_since >= stable_for:
+                    break
+            else:
+                stable_since = None
+            time.sleep(self.poll_interval)
+        else:
+            logging.warning(f"[{self.serial}] Wi-Fi did not come back and validate within {timeout}s.")
+
+        return {"method": self.method, "off_ms": off_ms, "associated_ms": milestones["associated"],
+                "ip_ms": milestones["ip"], "validated_ms": milestones["validated"],
+                "ssid": state.get("ssid"), "ip": state.get("ip")}
+
+
+def run_device_toggles(device_config, num_toggles, output_path, client=None):
+    """Runs num_toggles adb toggles on one device and writes one row per toggle (see TOGGLE_HEADERS)."""
+    name = device_name(device_config)
+    toggler = WifiToggler(device_udid(device_config), client)
+    sink = open_sink(output_path, TOGGLE_HEADERS)
+    results = []
+    try:
+        for i in range(num_toggles):
+            result = toggler.toggle()
+            results.append(result)
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            sink.write([timestamp, i + 1, result["method"], result["off_ms"], result["associated_ms"],
+                        result["ip_ms"], result["validated_ms"], result["ssid"], result["ip"]])
+            logging.info(f"[{name}] Toggle {i + 1}/{num_toggles}: associated {result['associated_ms']} ms, "
+                         f"IP {result['ip_ms']} ms, validated {result['validated_ms']} ms ({result['ssid']})")
+    finally:
+        sink.close()
+        if output_path.endswith(".csv"):
+            sink.export_excel(os.path.splitext(output_path)[0] + ".xlsx", sheet_title="Wi-Fi Reconnect")
+    return results
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Toggle Wi-Fi over adb and time the reconnect.")
+    parser.add_argument("--config", default="device_configs.json", help="Device config JSON file")
+    parser.add_argument("--toggles", type=int, default=10)
+    parser.add_argument("--device", help="Only toggle this deviceName")
+    parser.add_argument("--results-dir", default=".", help="Where the per-device CSV/xlsx files go")
+    args = parser.parse_args()
+
+    devices = [device for device in load_devices(args.config) if args.device in (None, device_name(device))]
+    client = AdbClient()
+    try:
+        with ThreadPoolExecutor(max_workers=max(len(devices), 1)) as executor:
+            futures = {}
+            for device in devices:
+                output_path = os.path.join(args.results_dir, f"{device.get('deviceUniqueId', device_name(device))}"
+                                                             f"_wifi_reconnect.csv")
+                futures[executor.submit(run_device_toggles, device, args.toggles, output_path, client)] = device
+            for future, device in futures.items():
+                if future.exception() is not None:
+                    logging.error(f"Wi-Fi toggles failed on {device_name(device)}: {future.exception()}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+import argparse
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from adb_client import AdbClient, AdbError
+from appium_session import device_name, load_devices
+
+# Port adb tcpip listens on
+WIRELESS_ADB_PORT = 5555
+# Seconds between keepalive probes
+KEEPALIVE_INTERVAL = 15
+# Seconds a probe may take before the connection counts as dropped
+PROBE_TIMEOUT = 5
+# Command run over the persistent shell to check the connection end to end
+PROBE_COMMAND = "echo ok"
+# Probes slower than this are logged as a degraded Wi-Fi ADB link
+SLOW_PROBE_MS = 250
+# Reconnect backoff (seconds), doubling after every failed attempt
+RECONNECT_DELAY = 2
+RECONNECT_DELAY_MAX = 60
+# Probe latencies kept per connection
+LATENCY_HISTORY = 50
+
+STATS_HEADERS = ["Device", "Address", "State", "Connect (ms)", "Last Probe (ms)", "Median Probe (ms)",
+                 "Max Probe (ms)", "Probes", "Failed Probes", "Reconnects"]
+
+
+def wireless_address(config):
+    """Returns host:port for a device config's ipAddress, or None if it has none."""
+    ip_address = config.get('ipAddress')
+    if not ip_address:
+        return None
+    return ip_address if ":" in ip_address else f"{ip_address}:{WIRELESS_ADB_PORT}"
+
+
+class WirelessConnection:
+    """Health of one wireless adb connection."""
+
+    def __init__(self, address, name=None):
+        self.address = address
+        self.name = name or address
+        self.connected = False
+        self.connect_ms = None
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+        self.probes = 0
+        self.failed_probes = 0
+        self.reconnects = 0
+        self.last_error = None
+        self.retry_delay = RECONNECT_DELAY
+        self.next_attempt = 0.0
+        self.probe_timed_out = False
+        self.ready = threading.Event()
+        # Serializes probe/reconnect sequences between ensure() and the keepalive thread
+        self.lock = threading.Lock()
+
+    @property
+    def last_latency_ms(self):
+        return self.latencies[-1] if self.latencies else None
+
+    def median_latency_ms(self):
+        return round(statistics.median(self.latencies), 1) if self.latencies else None
+
+    def describe(self):
+        state = "connected" if self.connected else f"down ({self.last_error})"
+        return (f"{state}, connect {self.connect_ms} ms, probe last {self.last_latency_ms} ms / "
+                f"median {self.median_latency_ms()} ms, {self.reconnects} reconnects")
+
+
+class WirelessAdbManager:
+    """Connects every ipAddress device in parallel and keeps the connections healthy across runs.
+
+    A background thread probes each connection over its persistent shell every interval
+    seconds and reconnects dropped ones with exponential backoff. Probe latency is kept per
+    connection so a slow Wi-Fi ADB link shows up as such instead of as a slow test.
+    """
+
+    def __init__(self, devices, client=None, interval=KEEPALIVE_INTERVAL, registry=None):
+        self.client = client or AdbClient()
+        self.interval = interval
+        self.connections = {}
+        for config in devices:
+            address = wireless_address(config)
+            if address:
+                self.connections[address] = WirelessConnection(address, device_name(config))
+        self._stopped = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        if registry is not None:
+            registry.on_change(self._on_device_change)
+
+    def _on_device_change(self, serial, old_state, new_state):
+        # The adb server noticed the drop before our next probe would have
+        if serial in self.connections and old_state == "device":
+            self._wake.set()
+
+    def _connect(self, connection):
+        start = time.perf_counter()
+        try:
+            self.client.connect(connection.address)
+            connection.connect_ms = round((time.perf_counter() - start) * 1000, 1)
+            return self._probe(connection)
+        except (AdbError, OSError) as e:
+            self._mark_down(connection, e)
+            return False
+
+    def _connect_serialized(self, connection):
+        with connection.lock:
+            return self._connect(connection)
+
+    def _probe(self, connection):
+        start = time.perf_counter()
+        connection.probe_timed_out = False
+        try:
+            output = self.client.run(connection.address, PROBE_COMMAND, timeout=PROBE_TIMEOUT)
+            if "ok" not in output:
+                raise AdbError(output.strip() or "empty probe reply")
+        except (AdbError, OSError) as e:
+            connection.probe_timed_out = isinstance(e, TimeoutError)
+            connection.probes += 1
+            connection.failed_probes += 1
+            self._mark_down(connection, e)
+            return False
+        latency_ms = round((time.perf_counter() - start) * 1000, 1)
+        connection.probes += 1
+        connection.latencies.append(latency_ms)
+        if latency_ms > SLOW_PROBE_MS:
+            logging.warning(f"Wireless ADB {connection.name} ({connection.address}) is slow: {latency_ms} ms probe")
+        if not connection.connected:
+            logging.info(f"Wireless ADB {connection.name} ({connection.address}) connected, probe {latency_ms} ms")
+        connection.connected = True
+        connection.last_error = None
+        connection.retry_delay = RECONNECT_DELAY
+        connection.ready.set()
+        return True
+
+    def _mark_down(self, connection, error):
+        if connection.connected:
+            logging.warning(f"Wireless ADB {connection.name} ({connection.address}) dropped: {error}")
+        connection.connected = False
+        connection.last_error = str(error)
+        connection.ready.clear()
+        connection.next_attempt = time.monotonic() + connection.retry_delay
+        connection.retry_delay = min(connection.retry_delay * 2, RECONNECT_DELAY_MAX)
+
+    def _check(self, connection):
+        # If ensure() holds the lock it is already probing or reconnecting this device
+        if not connection.lock.acquire(blocking=False):
+            return
+        try:
+            if connection.connected:
+                if self._probe(connection):
+                    return
+            if time.monotonic() < connection.next_attempt:
+                return
+            connection.reconnects += 1
+            logging.info(f"Reconnecting wireless ADB {connection.name} ({connection.address})...")
+            self._connect(connection)
+        finally:
+            connection.lock.release()
+
+    def connect_all(self):
+        """Connects every device in parallel; returns {address: connected}."""
+        if not self.connections:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(self.connections)) as executor:
+            results = dict(zip(self.connections, executor.map(self._connect_serialized, self.connections.values())))
+        for address, connected in results.items():
+            if not connected:
+                logging.warning(f"Wireless ADB {self.connections[address].name} ({address}) "
+                                f"failed to connect: {self.connections[address].last_error}")
+        return results
+
+    def check_all(self):
+        """Probes every connection in parallel, reconnecting the ones that are due."""
+        if not self.connections:
+            return
+        with ThreadPoolExecutor(max_workers=len(self.connections)) as executor:
+            list(executor.map(self._check, self.connections.values()))
+
+    def _keepalive(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not self._stopped.is_set():
+                self.check_all()
+
+    def start(self):
+        """Connects everything and starts the keepalive thread."""
+        self.connect_all()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._keepalive, name="wireless-adb-keepalive", daemon=True)
+            self._thread.start()
+        return self
+
+    def ensure(self, address, timeout=30):
+        """Returns True once address passes a probe, reconnecting it now if it is down.
+
+        A probe that timed out has already waited PROBE_TIMEOUT on an unresponsive link, so it
+        is not followed by an inline reconnect (and a second probe timeout); the keepalive
+        thread reconnects it with backoff while this waits for the rest of timeout.
+        """
+        deadline = time.monotonic() + timeout
+        connection = self.connections.get(address)
+        if connection is None:
+            connection = self.connections[address] = WirelessConnection(address)
+        if not connection.lock.acquire(timeout=timeout):
+            return connection.ready.is_set()
+        try:
+            probed = connection.connected
+            if probed and self._probe(connection):
+                return True
+            if not (probed and connection.probe_timed_out) and self._connect(connection):
+                return True
+        finally:
+            connection.lock.release()
+        self._wake.set()
+        return connection.ready.wait(max(0.0, deadline - time.monotonic()))
+
+    def latency_ms(self, address):
+        """Returns the median probe latency for address, or None before the first probe."""
+        connection = self.connections.get(address)
+        return connection.median_latency_ms() if connection else None
+
+    def describe(self, address):
+        connection = self.connections.get(address)
+        return connection.describe() if connection else "not managed"
+
+    def stats(self):
+        """Returns one row per connection (see STATS_HEADERS)."""
+        return [[c.name, c.address, "connected" if c.connected else "down", c.connect_ms, c.last_latency_ms,
+                 c.median_latency_ms(), max(c.latencies, default=None), c.probes, c.failed_probes, c.reconnects]
+                for c in self.connections.values()]
+
+    def log_stats(self):
+        for connection in self.connections.values():
+            logging.info(f"Wireless ADB {connection.name} ({connection.address}): {connection.describe()}")
+
+    def stop(self, disconnect=False):
+        """Stops the keepalive thread; connections stay up for the next run unless disconnect is set."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + PROBE_TIMEOUT)
+            self._thread = None
+        self.client.close()
+        if disconnect:
+            for address in self.connections:
+                try:
+                    self.client.disconnect(address)
+                except (AdbError, OSError) as e:
+                    logging.warning(f"Could not disconnect {address}: {e}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Connect and monitor wireless adb devices.")
+    parser.add_argument("--config", default="adb_devices.json", help="Device config JSON file")
+    parser.add_argument("--interval", type=float, default=KEEPALIVE_INTERVAL, help="Seconds between probes")
+    parser.add_argument("--once", action="store_true", help="Connect, print the stats and exit")
+    args = parser.parse_args()
+
+    manager = WirelessAdbManager(load_devices(args.config), interval=args.interval).start()
+    try:
+        while not args.once:
+            time.sleep(args.interval)
+            manager.log_stats()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.stop()
+    print(" | ".join(STATS_HEADERS))
+    for row in manager.stats():
+        print(" | ".join("" if value is None else str(value) for value in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,19 @@
 import json
 from appium import webdriver
 from appium.options.android import UiAutomator2Options
-from appium.webdriver.common.appiumby import AppiumBy
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import openpyxl
-from openpyxl.styles import Font
 import logging
 import time
-import os
 from datetime import datetime
+from locator_registry import default_registry
+from uia2_profiles import apply_profile, apply_profile_options
+from command_metrics import maybe_instrument
+from results_store import open_results
+from speed_test_stats import AdaptiveTrialPlan
+from campaign_scheduler import run_campaign
+from aggregate_capacity import run_aggregate_capacity
+from wireless_adb import WirelessAdbManager, wireless_address
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,39 +22,50 @@ logging.basicConfig(level=logging.INFO)
 with open('adb_devices.json') as config_file:
     config_data = json.load(config_file)
 
-# Define the number of trials
+# Shared locator registry (locators.json)
+locators = default_registry()
+
+# Wireless ADB connections, opened in parallel once and kept alive across device runs
+wireless = WirelessAdbManager(config_data['devices'])
+
+# Define the number of trials (used when adaptive_trials is off)
 num_trials = 4
 
+# Adaptive trial count (opt-in): run between min_trials and max_trials, stopping once the 95%
+# confidence interval of the download and upload speeds is within ci_tolerance of the mean.
+# Capped at num_trials so it can only shorten a run; 15% stops at 3 trials when the speeds
+# vary by up to about 6% and at 4 trials by up to about 9%
+adaptive_trials = False
+min_trials = 3
+max_trials = num_trials
+ci_tolerance = 0.15
+
+# Aggregate-capacity mode: start every device at the same instant and sum their throughputs
+aggregate_capacity_mode = False
+aggregate_rounds = 3
+
 
 # Function to run tests on a device
 def run_device_tests(device_config):
     logging.info(f"Starting tests on {device_config['deviceName']} with UID {device_config['deviceUID']}")
 
+    # Make sure the wireless ADB connection is up before spending time on an Appium session
+    address = wireless_address(device_config)
+    if address and not wireless.ensure(address):
+        logging.error(f"Wireless ADB {address} is down ({wireless.describe(address)}), skipping device.")
+        return
+    if address:
+        logging.info(f"Wireless ADB {address}: {wireless.describe(address)}")
+
     # Excel file setup
     excel_file = f"C:\\Users\\actio\\Documents\\Ookla_automation_results_andriod\\{device_config['deviceUniqueId']}_results.xlsx"
 
-    # Load or create workbook and select the active sheet
-    if os.path.exists(excel_file):
-        workbook = openpyxl.load_workbook(excel_file)
-        sheet = workbook.active
-    else:
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        sheet.title = 'Speed Test Results'
-        sheet.append(["Timestamp", "Download Speed (Mbps)", "Upload Speed (Mbps)", "Avg Download Speed", "Avg Upload Speed", "Test Run ID"])
-
-    # Determine the next Test Run ID
-    last_run_id = 0
-    for value in sheet['F']:
-        if value.value and value.value.startswith("TR-"):
-            last_run_id = max(last_run_id, int(value.value.split('-')[1]))
-    test_run_id = f"TR-{last_run_id + 1}"
-
-    # Get IP address for wireless ADB connection
-    ip_address = device_config.get('ipAddress')
+    # Results database next to the workbook (existing workbook history is imported on first use)
+    device_id = device_config['deviceUniqueId']
+    results = open_results(excel_file, device_id, "ookla")
 
-    # Connect to the device via wireless ADB
-    os.system(f"adb connect {ip_address}:5555")
+    # Allocate the next Test Run ID
+    test_run_id = results.next_run_id(device_id, "ookla")
 
     # Initialize the driver using UiAutomator2Options
     options = UiAutomator2Options()
@@ -62,31 +77,35 @@ def run_device_tests(device_config):
     options.no_reset = True
     options.full_reset = False
 
+    apply_profile_options(options, "speed_test")
     driver = webdriver.Remote("http://localhost:4723/wd/hub", options=options)
+    apply_profile(driver, "speed_test")
+    maybe_instrument(driver)
     logging.info(f"Driver initialized successfully for {device_config['deviceName']}.")
 
     try:
-        for i in range(num_trials):  # Use the defined number of trials
+        trials = AdaptiveTrialPlan(min_trials, max_trials if adaptive_trials else num_trials, ci_tolerance,
+                                   adaptive=adaptive_trials)
+        for i in trials:
             logging.info(f"Starting trial {i + 1} for {device_config['deviceName']}...")
             trial_start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
             # Wait for the "GO" button and click
-            WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((AppiumBy.ID, "org.zwanoo.android.speedtest:id/go_button"))
+            go_button = WebDriverWait(driver, 20).until(
+                EC.presence_of_element_located(locators["ooklaGoButton"])
             )
-            go_button = driver.find_element(AppiumBy.ID, "org.zwanoo.android.speedtest:id/go_button")
             go_button.click()
 
             # Wait for results
             WebDriverWait(driver, 60).until(
-                EC.presence_of_element_located((AppiumBy.XPATH, '//android.widget.FrameLayout[@content-desc="DOWNLOAD"]/android.view.ViewGroup'))
+                EC.presence_of_element_located(locators["ooklaDownloadPanel"])
             )
 
             download_speed_element = WebDriverWait(driver, 45).until(
-                EC.presence_of_element_located((AppiumBy.XPATH, '//android.widget.FrameLayout[@content-desc="DOWNLOAD"]/android.view.ViewGroup/android.widget.TextView[@resource-id="org.zwanoo.android.speedtest:id/txt_test_result_value"]'))
+                EC.presence_of_element_located(locators["ooklaDownloadSpeed"])
             )
             upload_speed_element = WebDriverWait(driver, 45).until(
-                EC.presence_of_element_located((AppiumBy.XPATH, '//android.widget.FrameLayout[@content-desc="UPLOAD"]/android.view.ViewGroup/android.widget.TextView[@resource-id="org.zwanoo.android.speedtest:id/txt_test_result_value"]'))
+                EC.presence_of_element_located(locators["ooklaUploadSpeed"])
             )
 
             download_speed = float(download_speed_element.text.split()[0])
@@ -95,34 +114,34 @@ def run_device_tests(device_config):
             logging.info(f"Download Speed: {download_speed} Mbps")
             logging.info(f"Upload Speed: {upload_speed} Mbps")
 
-            sheet.append([trial_start_time, download_speed, upload_speed, None, None, test_run_id])
+            results.add_trial(device_id, "ookla", test_run_id, trial_start_time, download_speed, upload_speed)
+            trials.record(download_speed, upload_speed)
 
             time.sleep(2)
             close_icon = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((AppiumBy.ID, "org.zwanoo.android.speedtest:id/closeIcon"))
+                EC.element_to_be_clickable(locators["ooklaCloseIcon"])
             )
             close_icon.click()
             time.sleep(3)
 
-        # Calculate averages at the end of the sheet
-        last_row = sheet.max_row
-        avg_download_formula = f"=AVERAGE(B2:B{last_row})"
-        avg_upload_formula = f"=AVERAGE(C2:C{last_row})"
-        sheet.cell(row=last_row + 1, column=4, value=avg_download_formula)
-        sheet.cell(row=last_row + 1, column=5, value=avg_upload_formula)
-        for col in range(4, 6):  # Apply bold formatting to average cells
-            cell = sheet.cell(row=last_row + 1, column=col)
-            cell.font = Font(bold=True)
-
-        workbook.save(excel_file)
-        logging.info(f"Results saved to {excel_file}")
+        # Export the workbook view from the database
+        results.export_excel(excel_file, device_id, "ookla")
+        results.log_run_statistics(device_id, "ookla", test_run_id)
 
     finally:
         driver.quit()
-        # Disconnect wireless ADB connection
-        os.system(f"adb disconnect {ip_address}:5555")
+        results.close()
+        if address:
+            logging.info(f"Wireless ADB {address} after the run: {wireless.describe(address)}")
 
 
-# Iterate over each device configuration and run tests
-for device in config_data['devices']:
-    run_device_tests(device)
\ No newline at end of file
+wireless.start()
+try:
+    if aggregate_capacity_mode:
+        run_aggregate_capacity(config_data['devices'], "ookla", aggregate_rounds)
+    else:
+        # Run every device, serializing those that share an access point
+        run_campaign(config_data['devices'], run_device_tests)
+finally:
+    wireless.log_stats()
+    wireless.stop()
\ No newline at end of file
@@ -1,13 +1,20 @@
 import pytest
 import random
 import time
-import subprocess
 import pandas as pd
 from appium import webdriver
 from appium.options.android import UiAutomator2Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from uia2_profiles import apply_profile, apply_profile_options
+from command_metrics import maybe_instrument
+from adb_client import AdbClient
+from net_timeline import NetDevTimeline, SUMMARY_HEADERS, TIME_SERIES_HEADERS
+
+# Device under test, and an adb server client that keeps one shell open for network sampling
+DEVICE_UDID = "R5CX33PG3KA"
+adb = AdbClient()
 
 
 # Pytest fixture for setting up the Appium driver
@@ -17,7 +24,7 @@ def driver():
     options.platform_name = "Android"
     options.platform_version = "14"  # Ensure this matches your actual Android version
     options.device_name = "Galaxy A55"  # Make sure this matches the device name
-    options.udid = "R5CX33PG3KA"  # Verify the UDID is correct
+    options.udid = DEVICE_UDID  # Verify the UDID is correct
     options.app_package = "com.google.android.youtube"
     options.app_activity = "com.google.android.youtube.HomeActivity"
     options.no_reset = True
@@ -25,7 +32,10 @@ def driver():
     try:
         # Debugging: Print the options to see the configuration
         print("Initializing Appium driver with options:", options)
+        apply_profile_options(options, "video")
         driver = webdriver.Remote("http://127.0.0.1:4723/wd/hub", options=options)
+        apply_profile(driver, "video")
+        maybe_instrument(driver)
         return driver
     except Exception as e:
         print(f"Error initializing Appium driver: {e}")
@@ -34,7 +44,7 @@ def driver():
 
 # Helper function to monitor network activity using adb
 def monitor_network_activity():
-    result = subprocess.check_output("adb shell cat /proc/net/dev", shell=True).decode('utf-8')
+    result = adb.run(DEVICE_UDID, "cat /proc/net/dev")
     print("Network activity:", result)
     return result
 
@@ -158,7 +168,7 @@ def test_youtube_video_playback_and_resolution(driver):
     print(f"Total video playback time: {total_time_playback} seconds")
 
     # Initialize data storage for network activity and buffering
-    network_data = []
+    network_timeline = NetDevTimeline()
     buffer_times = []
 
     # Monitor playback and network activity
@@ -166,7 +176,7 @@ def test_youtube_video_playback_and_resolution(driver):
     while not video_complete:
         # Monitor network activity
         network_stats = monitor_network_activity()
-        network_data.append(network_stats)
+        sample_time = time.time()
 
         # Check for buffering or ad elements
         try:
@@ -174,9 +184,11 @@ def test_youtube_video_playback_and_resolution(driver):
             current_time = current_time_element.get_attribute("text")
             if "elapsed" in current_time:
                 video_complete = True
+            network_timeline.add(network_stats, sample_time, "playing")
             time.sleep(10)
         except Exception as e:
             buffer_times.append(time.time())
+            network_timeline.add(network_stats, sample_time, "buffering")
             print("Buffering or ad detected")
 
     end_time = time.time()
@@ -206,8 +218,12 @@ def test_youtube_video_playback_and_resolution(driver):
     )
     highest_resolution_option.click()
 
-    # Export network data and buffering events to Excel
-    df = pd.DataFrame({'Network Stats': network_data, 'Buffer Times': buffer_times})
-    df.to_excel('test_report.xlsx', index=False)
+    # Export the throughput timeline, its summary and buffering events to Excel
+    with pd.ExcelWriter('test_report.xlsx') as writer:
+        pd.DataFrame(network_timeline.time_series(), columns=TIME_SERIES_HEADERS).to_excel(
+            writer, sheet_name='Network Throughput', index=False)
+        pd.DataFrame(network_timeline.summary(), columns=SUMMARY_HEADERS).to_excel(
+            writer, sheet_name='Network Summary', index=False)
+        pd.DataFrame({'Buffer Times': buffer_times}).to_excel(writer, sheet_name='Buffer Times', index=False)
 
     print("Test completed successfully and data exported to Excel!")